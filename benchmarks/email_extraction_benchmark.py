@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+# 이메일(EML/MHT) 본문 추출 벤치마크
+# 기존 방식(파트별 인코딩 순차 시도 + BeautifulSoup html.parser)과 email_extractor의 빠른 경로를 비교한다.
+#
+# 사용법:
+#   python benchmarks/email_extraction_benchmark.py                 # 샘플 3,000개를 임시 폴더에 생성해서 측정
+#   python benchmarks/email_extraction_benchmark.py --count 5000
+#   python benchmarks/email_extraction_benchmark.py D:\mail_export   # 폴더 안의 .eml/.mht 파일로 측정
+
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from email import policy
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.parser import BytesParser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from email_extractor import extract_email  # noqa: E402
+
+DEFAULT_SAMPLE_COUNT = 3000
+LEGACY_ENCODINGS = ['utf-8', 'cp949', 'euc-kr', 'latin1', 'cp1252']
+
+_PARAGRAPHS = [
+    "안녕하세요. 지난 회의에서 논의한 배포 일정 관련하여 공유드립니다.",
+    "빌드 서버 점검으로 인해 금요일 오후에는 CI가 중단될 예정입니다.",
+    "Please review the attached release notes before the sync meeting.",
+    "성능 측정 결과 인덱싱 속도가 약 30% 개선되었습니다. 세부 수치는 아래 표를 참고해 주세요.",
+    "The regression was caused by an unbounded cache in the session layer.",
+]
+
+
+def _html_body(rng: random.Random) -> str:
+    rows = "".join(f"<tr><td>항목 {i}</td><td>{rng.randint(0, 1000)}</td></tr>" for i in range(rng.randint(3, 30)))
+    paragraphs = "".join(f"<p>{rng.choice(_PARAGRAPHS)}</p>" for _ in range(rng.randint(5, 40)))
+    return (f"<html><head><style>p {{ margin: 0 }}</style><script>var x = 1;</script></head>"
+            f"<body><div class='header'>사내 메일</div><div class='content'>{paragraphs}"
+            f"<table>{rows}</table><img src='cid:logo'></div><!-- footer --></body></html>")
+
+
+def _make_sample(rng: random.Random, index: int) -> bytes:
+    charset = rng.choice(["utf-8", "euc-kr"])
+    plain = "\n".join(rng.choice(_PARAGRAPHS) for _ in range(rng.randint(5, 40)))
+    msg = MIMEMultipart("mixed")
+    msg["Subject"] = f"[공지] 주간 보고 {index}"
+    msg["From"] = "홍길동 <gildong@example.com>"
+    msg["To"] = "dev-team@example.com"
+    msg["Date"] = "Mon, 06 Jan 2025 09:00:00 +0900"
+
+    alternative = MIMEMultipart("alternative")
+    alternative.attach(MIMEText(plain, "plain", charset))
+    alternative.attach(MIMEText(_html_body(rng), "html", charset))
+    msg.attach(alternative)
+
+    if index % 5 == 0:
+        attachment = MIMEText("이름,값\n" + "\n".join(f"row{i},{i}" for i in range(200)), "csv", "utf-8")
+        attachment.add_header("Content-Disposition", "attachment", filename="data.csv")
+        msg.attach(attachment)
+    if index % 7 == 0:
+        binary = MIMEApplication(os.urandom(4096), Name="logo.png")
+        binary.add_header("Content-Disposition", "attachment", filename="logo.png")
+        msg.attach(binary)
+    return msg.as_bytes()
+
+
+def generate_samples(target_dir: str, count: int) -> list:
+    rng = random.Random(0)
+    paths = []
+    for index in range(count):
+        path = os.path.join(target_dir, f"sample_{index:05d}.{'mht' if index % 4 == 0 else 'eml'}")
+        with open(path, "wb") as f:
+            f.write(_make_sample(rng, index))
+        paths.append(path)
+    return paths
+
+
+def _legacy_decode(payload: bytes) -> str:
+    for encoding in LEGACY_ENCODINGS:
+        try:
+            return payload.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return payload.decode("utf-8", errors="replace")
+
+
+def legacy_extract(filepath: str) -> str:
+    """변경 전 DocumentReader.get_eml_contents의 본문 처리 방식 (비교용)"""
+    from bs4 import BeautifulSoup
+
+    with open(filepath, "rb") as f:
+        msg = BytesParser(policy=policy.default).parse(f)
+    _ = (msg["Subject"], msg["From"], msg["To"], msg["Date"])
+
+    html_content, plain_text = "", ""
+    for part in msg.walk():
+        if part.is_multipart() or part.get_filename():
+            continue
+        payload = part.get_payload(decode=True) or b""
+        if part.get_content_type() == "text/html":
+            html_content += _legacy_decode(payload)
+        elif part.get_content_type() == "text/plain":
+            plain_text += _legacy_decode(payload)
+
+    if not html_content:
+        return plain_text
+    soup = BeautifulSoup(html_content, "html.parser")
+    for tag in soup(["script", "style", "iframe", "meta", "link", "img"]):
+        tag.extract()
+    main_content = soup.select_one("div.content") or soup.body or soup
+    text = main_content.get_text(separator="\n", strip=True)
+    return re.sub(r"\n{3,}", "\n\n", re.sub(r"\n\s*\n", "\n\n", text))
+
+
+def _measure(name: str, paths: list, extract) -> float:
+    started = time.perf_counter()
+    total_chars = 0
+    for path in paths:
+        total_chars += len(extract(path))
+    elapsed = time.perf_counter() - started
+    print(f"{name:<8} {len(paths):>6} files  {elapsed:8.2f}s  {len(paths) / elapsed:8.1f} files/s  ({total_chars:,} chars)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EML/MHT 본문 추출 속도 비교")
+    parser.add_argument("directory", nargs="?", help=".eml/.mht 파일이 있는 폴더 (없으면 샘플 생성)")
+    parser.add_argument("--count", type=int, default=DEFAULT_SAMPLE_COUNT, help="생성할 샘플 수")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="devbot_email_bench_") as temp_dir:
+        if args.directory:
+            paths = [os.path.join(root, name) for root, _, names in os.walk(args.directory)
+                     for name in names if name.lower().endswith((".eml", ".mht"))]
+        else:
+            paths = generate_samples(temp_dir, args.count)
+
+        legacy = _measure("legacy", paths, legacy_extract)
+        fast = _measure("fast", paths, lambda path: extract_email(path, contents_type="EML")["contents"])
+        print(f"speedup  {legacy / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+# 텍스트 분할기 마이크로벤치마크
+# langchain RecursiveCharacterTextSplitter와 FastTextSplitter의 분할 속도를 비교하고 결과가 같은지 확인한다.
+#
+# 사용법:
+#   python benchmarks/text_splitter_benchmark.py                    # 생성한 문서로 측정
+#   python benchmarks/text_splitter_benchmark.py --size-mb 20 --repeat 3
+#   python benchmarks/text_splitter_benchmark.py D:\notes\big.md    # 파일 내용으로 측정
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter  # noqa: E402
+
+from fast_text_splitter import FastTextSplitter  # noqa: E402
+
+DEFAULT_SIZE_MB = 5
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 100
+
+_SENTENCES = [
+    "빌드 서버 점검으로 인해 금요일 오후에는 CI가 중단될 예정입니다.",
+    "The regression was caused by an unbounded cache in the session layer.",
+    "성능 측정 결과 인덱싱 속도가 약 30% 개선되었습니다.",
+    "def load_config(path):\n    return json.load(open(path))",
+    "- TODO: 회의록 정리 및 공유",
+]
+
+
+def generate_text(size_mb: float) -> str:
+    rng = random.Random(0)
+    target = int(size_mb * 1024 * 1024)
+    parts = []
+    length = 0
+    while length < target:
+        paragraph = " ".join(rng.choice(_SENTENCES) for _ in range(rng.randint(1, 12)))
+        if rng.random() < 0.05:
+            paragraph += " " + "x" * rng.randint(600, 2000)  # 공백 없는 긴 줄 (base64, 로그 덤프 등)
+        parts.append(paragraph)
+        parts.append(rng.choice(["\n", "\n\n", "\n\n\n"]))
+        length += len(paragraph) + 2
+    return "".join(parts)
+
+
+def _measure(name: str, text: str, split, repeat: int):
+    best = None
+    chunks = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        chunks = split(text)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    size_mb = len(text) / (1024 * 1024)
+    print(f"{name:<10} {best:8.3f}s  {size_mb / best:8.2f} MB/s  {len(chunks):,} chunks")
+    return best, chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="텍스트 분할 속도 비교")
+    parser.add_argument("file", nargs="?", help="분할할 텍스트 파일 (없으면 문서 생성)")
+    parser.add_argument("--size-mb", type=float, default=DEFAULT_SIZE_MB, help="생성할 문서 크기(MB)")
+    parser.add_argument("--repeat", type=int, default=3, help="반복 횟수 (가장 빠른 시간 사용)")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, encoding="utf-8", errors="replace") as f:
+            text = f.read()
+    else:
+        text = generate_text(args.size_mb)
+
+    langchain_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    fast_splitter = FastTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+    langchain_time, expected = _measure("langchain", text, langchain_splitter.split_text, args.repeat)
+    fast_time, actual = _measure("fast", text, fast_splitter.split_text, args.repeat)
+    print(f"speedup    {langchain_time / fast_time:.1f}x  (identical output: {actual == expected})")
+
+
+if __name__ == "__main__":
+    main()
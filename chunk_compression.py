@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+# 청크 본문 압축 (zstd + 저장소별 학습 사전)
+# 한국어 청크 본문과 반복되는 머리말(문서명, 메일 헤더)이 store.pkl과 메모리 docstore의 큰 부분을 차지하므로,
+# 저장소의 청크가 CHUNK_TEXT_DICT_TRAIN_MIN_CHUNKS개 이상 모이면 그 청크들로 zstd 사전을 학습하고
+# 이후 청크 본문은 사전으로 압축하여 보관한다. 사전은 저장소 폴더에 파일로 저장되며 한 번 학습하면 바꾸지 않는다.
+# (사전을 바꾸면 기존 압축 본문을 모두 다시 압축해야 하므로)
+
+import os
+import random
+import tempfile
+import threading
+from typing import Iterable, Optional
+
+import config
+import logger_util
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logger_util.get_logger()
+
+DICTIONARY_FILE_NAME = "chunk_text.zdict"
+
+
+class ChunkTextCodec:
+    def __init__(self, store_path: str):
+        self.store_path = store_path
+        self.enabled = config.CHUNK_TEXT_COMPRESSION and zstandard is not None
+        if config.CHUNK_TEXT_COMPRESSION and zstandard is None:
+            logger.warning("[ChunkTextCodec] zstandard is not installed, chunk text is stored uncompressed")
+        self._dictionary = None
+        self._compressor = None
+        self._decompressor = None
+        # 표본이 부족해 학습에 실패하면 청크 수가 두 배가 될 때까지 다시 학습하지 않는다
+        self._next_train_count = config.CHUNK_TEXT_DICT_TRAIN_MIN_CHUNKS
+        # zstandard 압축기/해제기 객체는 여러 스레드에서 동시에 사용할 수 없다
+        self._lock = threading.Lock()
+        if self.enabled:
+            self._load_dictionary()
+
+    @property
+    def ready(self) -> bool:
+        """사전이 있어 압축할 수 있는 상태인지"""
+        return self._dictionary is not None
+
+    def _dictionary_path(self) -> str:
+        return os.path.join(self.store_path, DICTIONARY_FILE_NAME)
+
+    def _load_dictionary(self):
+        path = self._dictionary_path()
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            self._set_dictionary(zstandard.ZstdCompressionDict(f.read()))
+
+    def _set_dictionary(self, dictionary):
+        self._dictionary = dictionary
+        self._compressor = zstandard.ZstdCompressor(level=config.CHUNK_TEXT_COMPRESSION_LEVEL, dict_data=dictionary)
+        self._decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+
+    def should_train(self, chunk_count: int) -> bool:
+        return self.enabled and not self.ready and chunk_count >= self._next_train_count
+
+    def train(self, texts: Iterable[str]) -> bool:
+        """청크 본문 표본으로 사전을 학습하고 저장소 폴더에 저장한다. 표본이 부족해 학습에 실패하면 False."""
+        samples = [text.encode("utf-8") for text in texts if text]
+        if len(samples) > config.CHUNK_TEXT_DICT_MAX_SAMPLES:
+            samples = random.Random(0).sample(samples, config.CHUNK_TEXT_DICT_MAX_SAMPLES)
+        try:
+            dictionary = zstandard.train_dictionary(config.CHUNK_TEXT_DICT_SIZE, samples,
+                                                    level=config.CHUNK_TEXT_COMPRESSION_LEVEL)
+        except zstandard.ZstdError as e:
+            logger.warning(f"[ChunkTextCodec] Failed to train dictionary from {len(samples)} chunks: {e}")
+            self._next_train_count = max(self._next_train_count, len(samples)) * 2
+            return False
+
+        # 압축된 본문은 사전 없이 읽을 수 없으므로 사전 파일을 먼저 안전하게 저장한다
+        os.makedirs(self.store_path, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.store_path, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(dictionary.as_bytes())
+        os.replace(temp_path, self._dictionary_path())
+
+        with self._lock:
+            self._set_dictionary(dictionary)
+        logger.info(f"[ChunkTextCodec] Trained {len(dictionary.as_bytes()):,} byte dictionary from {len(samples)} chunks")
+        return True
+
+    def compress(self, text: str) -> bytes:
+        with self._lock:
+            return self._compressor.compress(text.encode("utf-8"))
+
+    def decompress(self, data: bytes) -> str:
+        with self._lock:
+            return self._decompressor.decompress(data).decode("utf-8")
+
+    def dictionary_size(self) -> Optional[int]:
+        return len(self._dictionary.as_bytes()) if self._dictionary is not None else None
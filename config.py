@@ -25,4 +25,74 @@ EMBEDDING_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
 ALLOWED_EXTENSIONS = {
     "txt", "pdf", "png", "jpg", "jpeg", "gif", "csv", "md", 
     "html", "pptx", "docx", "epub", "odt"
-}
\ No newline at end of file
+}
+# OCR 설정
+OCR_MAX_IMAGE_SIDE = 2048  # 긴 변이 이 픽셀 수보다 큰 이미지는 비율을 유지하며 축소 후 OCR (0이면 축소하지 않음)
+OCR_BATCH_SIZE = 8  # 배치 OCR 시 reader 1회 호출로 처리하는 이미지 수
+OCR_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "store", "ocr_cache")
+OCR_CACHE_MAX_BYTES = 256 * 1024 * 1024  # 256MB를 넘으면 오래 사용하지 않은 항목부터 삭제
+
+# 문서 추출 결과 캐시 설정
+EXTRACTION_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "store", "extraction_cache")
+EXTRACTION_CACHE_MAX_BYTES = 1024 * 1024 * 1024  # 1GB를 넘으면 오래 사용하지 않은 항목부터 삭제
+
+# 감독 추출 워커 설정 (PDF/Office/Excel/이메일은 별도 프로세스에서 추출)
+EXTRACTION_WORKERS = 4  # 동시에 추출하는 워커 프로세스 수 (형식별 동시 실행 수는 EXTRACTOR_CONCURRENCY로 제한)
+EXTRACTION_WORKER_MAX_TASKS = 50  # 워커 프로세스 하나가 이 개수의 파일을 처리하면 새 프로세스로 교체
+EXTRACTION_TIMEOUTS = {"pdf": 300, "office": 180, "excel": 300, "email": 60}  # 형식별 제한 시간(초)
+EXTRACTION_MEMORY_CLASS_LIMITS_MB = {"light": 512, "medium": 1024, "heavy": 2048}  # 추출기 메모리 등급별 한도(MB, 하위 프로세스 포함)
+EXTRACTOR_CONCURRENCY = {"text": 8, "pdf": 2, "office": 2, "excel": 2, "email": 4, "mbox": 1, "image": 1}  # 형식별 동시 추출 작업 수
+UPLOAD_QUEUE_WORKERS = 4  # 업로드 큐를 처리하는 스레드 수
+
+# 청크 분할 설정
+CHUNK_LENGTH_UNIT = "token"  # "token": 임베딩 모델 토큰 수로 분할 (헤더 포함 max_seq_length 이내), "char": 글자 수로 분할
+CHUNK_MAX_TOKENS = 256  # 토큰 모드의 청크 최대 토큰 수 (모델 max_seq_length보다 크면 max_seq_length 사용)
+CHUNK_OVERLAP_TOKENS = 50  # 토큰 모드의 청크 간 겹침 토큰 수
+
+# 청크 본문 압축 설정 (zstandard 필요, 없으면 압축하지 않음)
+CHUNK_TEXT_COMPRESSION = True
+CHUNK_TEXT_COMPRESSION_LEVEL = 9
+CHUNK_TEXT_DICT_TRAIN_MIN_CHUNKS = 1000  # 저장소의 청크가 이 개수 이상이면 사전을 학습하고 이후 청크를 압축
+CHUNK_TEXT_DICT_MAX_SAMPLES = 5000  # 사전 학습에 사용하는 최대 청크 수
+CHUNK_TEXT_DICT_SIZE = 64 * 1024  # 학습하는 사전 크기(바이트)
+
+# 같은 내용의 파일 중복 인덱싱 방지 (여러 폴더에 복사된 첨부/사양서 등은 한 번만 추출/임베딩하고 나머지 경로는 참조로 등록)
+FILE_DEDUPE_ENABLED = True
+
+# 근사 중복 청크 억제 설정 (메일 인용문, 반복되는 머리말 등)
+NEAR_DUPLICATE_ENABLED = True
+NEAR_DUPLICATE_THRESHOLD = 0.9  # 본문 SimHash 유사도(1 - 해밍 거리/64)가 이 값 이상이면 기존 청크에 출처만 추가
+NEAR_DUPLICATE_MIN_CHARS = 64  # 이보다 짧은 청크는 서명이 불안정하므로 중복 검사를 하지 않음
+
+# 원본 임베딩 보관 설정 (인덱스 종류/양자화를 바꿀 때 다시 임베딩하지 않도록 저장소 폴더에 벡터를 보관)
+RAW_EMBEDDINGS_ENABLED = True
+RAW_EMBEDDINGS_DTYPE = "float32"  # "float16"이면 파일 크기가 절반 (정밀도 약간 손실)
+INDEX_IVF_NPROBE = 32  # IVF 계열 인덱스로 재구성할 때 검색하는 클러스터 수 (기본값 1은 재현율이 매우 낮음)
+
+# 인덱스 압축 설정 (삭제는 논리 삭제로 처리하고, 삭제된 벡터는 백그라운드에서 인덱스를 다시 만들며 제거)
+INDEX_COMPACTION_CHECK_INTERVAL = 60  # 압축이 필요한지 확인하는 주기(초)
+INDEX_COMPACTION_IDLE_SECONDS = 300  # 업로드 큐가 비어 있고 이 시간 동안 쓰기가 없으면 삭제된 벡터가 있을 때 압축
+INDEX_COMPACTION_TOMBSTONE_RATIO = 0.2  # 삭제된 벡터 비율이 이 값 이상이면 유휴 상태가 아니어도 압축
+
+# 임베딩 모델 교체 설정 (검색을 멈추지 않고 백그라운드에서 저장된 청크를 새 모델로 다시 임베딩한 뒤 인덱스를 교체)
+EMBEDDING_MODELS = {  # 교체할 수 있는 임베딩 모델 (이 목록 밖의 모델은 내려받거나 로드하지 않는다)
+    MODEL_NAME,
+    "nlpai-lab/KURE-v1",
+    "sentence-transformers/distiluse-base-multilingual-cased-v2",
+    "intfloat/multilingual-e5-large-instruct",
+    "jhgan/ko-sbert-multitask",
+    "upskyy/bge-m3-korean",
+}
+EMBEDDING_MODEL_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "embedding_model")  # 모델 이름(조직/모델)별 저장 폴더
+EMBEDDING_MIGRATION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "store", "embedding_migration")  # RAG별 새 임베딩 임시 폴더
+EMBEDDING_MIGRATION_BATCH_SIZE = 64  # 한 번에 다시 임베딩하는 청크 수
+EMBEDDING_MIGRATION_DUTY_CYCLE = 0.5  # 임베딩 계산에 쓰는 시간 비율 (배치마다 처리 시간의 (1 - 비율) / 비율 배만큼 쉰다)
+EMBEDDING_MIGRATION_BUSY_WAIT = 5  # 업로드 처리 중이면 이 시간(초)마다 다시 확인하며 기다린다
+
+# 이어 쓰기 증분 인덱싱 설정 (로그, 회의록 등 뒤에만 내용이 추가되는 텍스트 파일)
+APPEND_INDEX_EXTENSIONS = {".log", ".md", ".txt", ".devbot"}  # 인덱싱된 앞부분이 그대로면 새로 추가된 뒷부분만 인덱싱
+APPEND_OVERLAP_BYTES = 2048  # 뒷부분 앞에 함께 다시 인덱싱하는 기존 내용 크기 (청크 경계에서 문맥이 끊기지 않도록)
+
+# 이메일(EML/MHT) 추출 설정
+EMAIL_EXTRACT_TEXT_ATTACHMENTS = True  # 텍스트 첨부 파일(.txt, .csv 등)도 함께 인덱싱
+EMAIL_ATTACHMENT_MAX_BYTES = 1024 * 1024  # 이보다 큰 첨부 파일은 건너뜀
@@ -1,292 +1,187 @@
 # -*- coding: utf-8 -*-
 
-from email import policy
-from email.parser import BytesParser
-import base64
-from bs4 import BeautifulSoup
 from fastapi import UploadFile
-import chardet 
+from encoding_detector import encoding_detector
 
-import textract
 import io
 import codecs
-from PyPDF2 import PdfReader
+import tempfile
+from typing import Iterable, Iterator, Optional
 import pandas as pd
+from openpyxl import load_workbook
+from pdf_extractor import extract_pdf_pages
+from ocr_util import ocr_pdf_pages
+from office_extractor import extract_office_file
+from email_extractor import extract_email, iter_mbox_segments
 import sys
 import os
 import json
-import re
 from pathlib import Path
 
-# TODO: 다형성 적용 필요
+# 업로드 스풀/텍스트 스트리밍 디코딩 시 한 번에 처리하는 바이트 수
+STREAM_CHUNK_SIZE = 1024 * 1024
+# 엑셀 행 묶음(segment) 하나에 담는 행 텍스트의 최대 글자 수 (헤더 제외)
+EXCEL_WINDOW_MAX_CHARS = 2000
+
 class DocumentReader:
+    """형식별 추출 메서드 모음. 확장자에 따른 선택과 동시 실행 제한은 extractor_registry가 담당한다."""
+
     async def get_contents(self, file: UploadFile, file_path:str):
-        filename = file.filename.lower()
-        if filename.endswith("eml"):
-            return self.get_eml_contents(filepath=file_path, type="EML")
-        elif filename.endswith("mht"):
-            return self.get_eml_contents(filepath=file_path, type="MHT")
-        elif filename.endswith("doc") or filename.endswith("docx"):
-            return self.get_msoffice_contents(filepath=file_path, contents_type="MSWORD")
-        elif filename.endswith("ppt") or filename.endswith("pptx"):
-            return self.get_msoffice_contents(filepath=file_path, contents_type="MSPOWERPOINT")
-        elif file_path.endswith("xls") or file_path.endswith("xlsx"):
-            return self.get_excel_contents(filepath=file_path, contents_type="MSEXCEL")
-        elif filename.endswith("pdf"):
-            return self.get_pdf_contents(filepath=file_path, contents_type="PDF")
-        else:
+        from extractor_registry import extractor_registry
+        if extractor_registry.get(file.filename).name == "text":
             return await self.get_text_contents(file=file, file_path=file_path)
+        return extractor_registry.extract_in_process(file_path)
     
+    async def spool_upload(self, file: UploadFile) -> str:
+        """업로드 파일을 STREAM_CHUNK_SIZE 단위로 임시 파일에 저장하고 경로를 반환한다. 삭제는 호출자가 한다."""
+        suffix = Path(file.filename).suffix.lower()
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+            while True:
+                block = await file.read(STREAM_CHUNK_SIZE)
+                if not block:
+                    break
+                tmp.write(block)
+        return tmp.name
+
     def get_contents_on_pc(self, file_path:str):
-        filename = Path(file_path).name
-        if filename.endswith("eml"):
-            return self.get_eml_contents(filepath=file_path, type="EML")
-        elif filename.endswith("mht"):
-            return self.get_eml_contents(filepath=file_path, type="MHT")
-        elif filename.endswith("doc") or filename.endswith("docx"):
-            return self.get_msoffice_contents(filepath=file_path, contents_type="MSWORD")
-        elif filename.endswith("ppt") or filename.endswith("pptx"):
-            return self.get_msoffice_contents(filepath=file_path, contents_type="MSPOWERPOINT")
-        elif file_path.endswith("xls") or file_path.endswith("xlsx"):
-            return self.get_excel_contents(filepath=file_path, contents_type="MSEXCEL")
-        elif filename.endswith("pdf"):
-            return self.get_pdf_contents(filepath=file_path, contents_type="PDF")
-        else:
-            return self.get_text_contents_on_pc(file_path=file_path)
+        from extractor_registry import extractor_registry
+        return extractor_registry.extract_in_process(file_path)
 
     def get_msoffice_contents(self, filepath:str, contents_type:str):
+        """docx/pptx는 워커 프로세스에서 직접 파싱하고, 레거시 형식만 textract를 사용한다.
+
+        segments에는 슬라이드(slide, title) 또는 섹션(section) 단위 텍스트가 담겨 분할기로 바로 전달된다.
+        """
         try:
-            text = textract.process(filepath).decode('utf-8')
+            segments = extract_office_file(filepath)
             contents = {
                 "contents_type": contents_type,
-                "contents": text
+                "contents": "\n".join(segment["text"] for segment in segments),
+                "segments": segments
             }
             return contents
         except Exception as e:
             raise Exception(e)
         
-    # TODO: 이미지 처리를 위해 PDF 전용 패키지 사용 필요
     def get_pdf_contents(self, filepath: str, contents_type:str):
+        """페이지 텍스트를 병렬로 추출한다. 텍스트 레이어가 없는 스캔 페이지만 OCR한다.
+
+        segments에는 페이지별 텍스트와 페이지 번호가 담기며, 분할기는 이를 기준으로 페이지 경계를 넘지 않게 청크를 만든다.
+        contents는 None이다 (전체 텍스트가 필요하면 segments의 text를 이어 붙인다).
+        """
         try:
-            with open(filepath, 'rb') as f:
-                pdf_data = f.read()
-                
-            pdf_stream = io.BytesIO(pdf_data)
-            reader = PdfReader(pdf_stream)
-            text = ""
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text
+            pages = extract_pdf_pages(filepath)
+
+            scanned_pages = [page_no for page_no, page_text in pages if not page_text.strip()]
+            if scanned_pages:
+                ocr_texts = ocr_pdf_pages(filepath, scanned_pages)
+                pages = [(page_no, ocr_texts.get(page_no, page_text)) for page_no, page_text in pages]
+            pages = [(page_no, page_text) for page_no, page_text in pages if page_text.strip()]
 
+            # 분할기는 segments만 사용하므로 페이지를 이어 붙인 전체 문자열은 만들지 않는다
+            # (대용량 PDF에서 본문이 두 벌로 메모리에 올라가고 워커 경계 전송과 추출 캐시에도 두 번 기록되지 않도록)
             contents = {
                 "contents_type": contents_type,
-                "contents": text
+                "contents": None,
+                "segments": [
+                    {"text": page_text, "metadata": {"page": page_no}}
+                    for page_no, page_text in pages
+                ]
             }
             return contents
         except Exception as e:
             raise Exception(e)
 
     def get_eml_contents(self, filepath: str, type: str):
-        with open(filepath, 'rb') as f:
-            msg = BytesParser(policy=policy.default).parse(f)
+        """헤더 charset으로 디코딩하고 HTML 본문은 lxml로 추출한다. 텍스트 첨부는 segments로 함께 담긴다."""
+        return extract_email(filepath, contents_type=type)
 
-        contents = {
-            "contents_type": type,
-            "title": msg['Subject'],
-            "from": msg['From'],
-            "to": msg['To'],
-            "date": msg['Date'] 
+    def get_mbox_contents(self, filepath: str):
+        """mbox 아카이브는 메시지 단위 segment를 스트리밍으로 돌려준다 (각 segment metadata에 메시지 헤더 포함)."""
+        return {
+            "contents_type": "MBOX",
+            "contents": None,
+            "segments": iter_mbox_segments(filepath)
         }
-
-        body = ""
-        html_content = ""
-        plain_text = ""
-        
-        # HTML과 TEXT 컨텐츠를 따로 저장
-        if msg.is_multipart():
-            for part in msg.iter_parts():
-                content_type = part.get_content_type()
-                if content_type == 'text/plain':
-                    try:
-                        decoded_payload = part.get_payload(decode=True)
-                        # 인코딩 추정 및 디코딩 시도
-                        encodings_to_try = ['utf-8', 'cp949', 'euc-kr', 'latin1', 'cp1252']
-                        for encoding in encodings_to_try:
-                            try:
-                                plain_text += decoded_payload.decode(encoding)
-                                break
-                            except UnicodeDecodeError:
-                                continue
-                        # 모든 인코딩 실패 시 대체 문자 사용
-                        if not plain_text:
-                            plain_text += decoded_payload.decode('utf-8', errors='replace')
-                    except Exception as e:
-                        print(f"텍스트 디코딩 오류: {e}")
-                        plain_text += part.get_payload(decode=True).decode('utf-8', errors='replace')
-                elif content_type == "text/html":
-                    try:
-                        # base64로 디코딩 시도, 실패하면 일반 payload 사용
-                        try:
-                            part_html = base64.b64decode(part.get_payload())
-                        except:
-                            part_html = part.get_payload(decode=True)
-                            
-                        # 인코딩 추정 및 디코딩
-                        html_text = ""
-                        encodings_to_try = ['utf-8', 'cp949', 'euc-kr', 'latin1', 'cp1252']
-                        for encoding in encodings_to_try:
-                            try:
-                                if isinstance(part_html, bytes):
-                                    html_text = part_html.decode(encoding)
-                                else:
-                                    html_text = part_html
-                                break
-                            except UnicodeDecodeError:
-                                continue
-                                
-                        # 모든 인코딩 실패 시
-                        if not html_text and isinstance(part_html, bytes):
-                            html_text = part_html.decode('utf-8', errors='replace')
-                        
-                        html_content += html_text
-                    except Exception as e:
-                        print(f"HTML 파싱 오류: {e}")
-                elif content_type == 'multipart/related':
-                    for related_part in part.iter_parts():
-                        related_content_type = related_part.get_content_type()
-                        if related_content_type == 'text/html':
-                            try:
-                                related_part_html = related_part.get_payload(decode=True)
-                                # 인코딩 추정 및 디코딩
-                                related_html_text = ""
-                                encodings_to_try = ['utf-8', 'cp949', 'euc-kr', 'latin1', 'cp1252']
-                                
-                                if isinstance(related_part_html, bytes):
-                                    for encoding in encodings_to_try:
-                                        try:
-                                            related_html_text = related_part_html.decode(encoding)
-                                            break
-                                        except UnicodeDecodeError:
-                                            continue
-                                    
-                                    # 모든 인코딩 실패 시
-                                    if not related_html_text:
-                                        related_html_text = related_part_html.decode('utf-8', errors='replace')
-                                else:
-                                    related_html_text = related_part_html
-                                    
-                                html_content += related_html_text
-                            except Exception as e:
-                                print(f"HTML 파싱 오류: {e}")
-        else:
-            try:
-                decoded_payload = msg.get_payload(decode=True)
-                content_type = msg.get_content_type()
-                
-                # 인코딩 추정 및 디코딩 시도
-                encodings_to_try = ['utf-8', 'cp949', 'euc-kr', 'latin1', 'cp1252']
-                decoded_text = ""
-                
-                for encoding in encodings_to_try:
-                    try:
-                        decoded_text = decoded_payload.decode(encoding)
-                        break
-                    except UnicodeDecodeError:
-                        continue
-                
-                # 모든 인코딩 실패 시
-                if not decoded_text:
-                    decoded_text = decoded_payload.decode('utf-8', errors='replace')
-                    
-                if content_type == 'text/html':
-                    html_content += decoded_text
-                else:
-                    plain_text += decoded_text
-            except Exception as e:
-                print(f"이메일 본문 디코딩 오류: {e}")
-                # 오류 발생 시 대체 문자 사용
-                try:
-                    decoded_text = msg.get_payload(decode=True).decode('utf-8', errors='replace')
-                    if msg.get_content_type() == 'text/html':
-                        html_content += decoded_text
-                    else:
-                        plain_text += decoded_text
-                except:
-                    plain_text += "이메일 내용을 디코딩할 수 없습니다."
-        
-        # HTML 내용이 있으면 BeautifulSoup으로 깔끔하게 텍스트만 추출
-        if html_content:
-            try:
-                soup = BeautifulSoup(html_content, "html.parser")
-                
-                # 불필요한 태그 제거
-                for script in soup(["script", "style", "iframe", "meta", "link", "img"]):
-                    script.extract()
-                
-                # 본문 내용에 해당하는 태그만 선택적으로 추출하기
-                main_content = None
-                
-                # 1. 일반적인 메일 본문 컨테이너 찾기
-                for container in ['div#content', 'div#main', 'div.content', 'div.main', 'div#body', 'div.body']:
-                    if main_content is None:
-                        main_content = soup.select_one(container)
-                
-                # 2. 아직 못 찾았으면 가장 텍스트가 많은 div 찾기
-                if main_content is None:
-                    max_text_len = 0
-                    for div in soup.find_all('div'):
-                        text_len = len(div.get_text(strip=True))
-                        if text_len > max_text_len and text_len > 50:  # 최소 길이 조건
-                            max_text_len = text_len
-                            main_content = div
-                
-                # 3. 여전히 못 찾았으면 body 또는 전체 HTML 사용
-                if main_content is None:
-                    main_content = soup.body or soup
-                
-                # 추출된 내용의 텍스트만 가져오기
-                extracted_text = main_content.get_text(separator='\n', strip=True)
-                
-                # 여러 줄 공백 제거
-                extracted_text = re.sub(r'\n\s*\n', '\n\n', extracted_text)
-                
-                # 공백 라인이 3개 이상 연속되면 2개로 제한
-                extracted_text = re.sub(r'\n{3,}', '\n\n', extracted_text)
-                
-                body = extracted_text
-            except Exception as e:
-                print(f"HTML 파싱 중 오류 발생: {e}")
-                # HTML 파싱에 실패하면 일반 텍스트 사용
-                if plain_text:
-                    body = plain_text
-                else:
-                    # 간단한 HTML 태그 제거 시도
-                    body = re.sub(r'<[^>]*>', ' ', html_content)
-                    body = re.sub(r'\s+', ' ', body).strip()
-        else:
-            # HTML이 없으면 일반 텍스트만 사용
-            body = plain_text
-                
-        contents['contents'] = body
-        return contents
     
+    def get_image_contents(self, filepath: str):
+        """이미지를 OCR하여 segment 하나로 돌려준다. 분할기는 다시 OCR하지 않고 이 텍스트를 분할한다."""
+        from document_splitter import ImageLoader
+
+        documents = ImageLoader(filepath).load()
+        return {
+            "contents_type": "IMAGE",
+            "contents": "\n".join(doc.page_content for doc in documents),
+            "segments": [
+                {"text": doc.page_content, "metadata": {"ocr_confidence": doc.metadata.get("ocr_confidence")}}
+                for doc in documents
+            ]
+        }
+
     async def get_text_contents(self, file: UploadFile, file_path: str):
         contents = await file.read()
         return self._make_text_contents(contents)
     
     def get_text_contents_on_pc(self, file_path: str):
+        # 파일 전체를 읽지 않고 조각 단위로 디코딩하여 분할기에 흘려보낸다
+        return {
+            "contents_type": "TEXT",
+            "contents": self.iter_text_contents(file_path)
+        }
+
+    def get_text_tail_contents(self, file_path: str, start: int, end: Optional[int] = None,
+                               max_start: Optional[int] = None):
+        """이어 쓰기된 텍스트 파일의 start 바이트 이후(end 바이트까지)만 읽는다.
+
+        start는 다음 줄 시작으로 맞추되 max_start(이어 쓰기 시작 위치)를 넘지 않는다.
+        """
+        return {
+            "contents_type": "TEXT",
+            "contents": self.iter_text_contents(file_path, start=start, end=end, max_start=max_start)
+        }
+
+    def iter_text_contents(self, file_path: str, start: int = 0, end: Optional[int] = None,
+                           max_start: Optional[int] = None) -> Iterator[str]:
+        """텍스트 파일을 STREAM_CHUNK_SIZE 단위로 디코딩하여 돌려준다.
+
+        인코딩은 파일 일부 구간만 샘플링하여 감지한다. start가 있으면 그 위치 다음 줄부터,
+        end가 있으면 end 바이트까지만 읽는다. 다음 줄 시작이 max_start보다 뒤이면 max_start부터 읽는다
+        (max_start는 글자 경계여야 한다. 이어 쓰기 시작 위치는 이전 파일 끝이므로 글자 경계이다).
+        """
+        encoding = encoding_detector.detect_file(file_path)
         with open(file_path, "rb") as f:
-            contents = f.read()
+            if start > 0:
+                f.seek(start)
+                if "utf-16" in encoding.lower() or "utf_16" in encoding.lower():
+                    # UTF-16은 줄바꿈 바이트가 글자 중간에 올 수 있으므로 2바이트 경계로만 맞춘다
+                    f.seek(start - start % 2)
+                else:
+                    # 멀티바이트 글자 중간에서 시작하지 않도록 다음 줄 시작으로 이동
+                    f.readline()
+                    # 겹침 구간에 줄바꿈이 없거나 이전 내용이 줄바꿈 없이 끝났으면 다음 줄 시작이 이어 쓰기 시작 위치를 넘는다.
+                    # 그 사이의 새 내용이 빠지지 않도록 이어 쓰기 시작 위치부터 읽는다
+                    if max_start is not None and f.tell() > max_start:
+                        f.seek(max_start)
+            remaining = None if end is None else max(0, end - f.tell())
+            decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+            while remaining is None or remaining > 0:
+                block = f.read(STREAM_CHUNK_SIZE if remaining is None else min(STREAM_CHUNK_SIZE, remaining))
+                if not block:
+                    break
+                if remaining is not None:
+                    remaining -= len(block)
+                text = decoder.decode(block)
+                if text:
+                    yield text
+            text = decoder.decode(b"", final=True)
+            if text:
+                yield text
 
-        return self._make_text_contents(contents)
+    def _detect_text_encoding(self, contents: bytes) -> str:
+        return encoding_detector.detect_bytes(contents)
 
     def _make_text_contents(self, contents: bytes):        
-        detection = chardet.detect(contents)
-        encoding = detection.get('encoding')
-
-        if encoding is None or encoding == 'Windows-1254':
-            encoding = 'utf-8'
+        encoding = self._detect_text_encoding(contents)
 
         # codecs.iterdecode를 사용하여 파일 읽기
         try:
@@ -318,25 +213,90 @@ class DocumentReader:
         return markdown_table
 
     def get_excel_contents(self, filepath: str, contents_type:str):
-        excel_data = self.read_excel_file(filepath)
+        """시트를 행 묶음(row window) 단위 segment로 스트리밍한다.
 
-        contents_text = ""
+        각 segment는 시트 이름과 헤더 행을 반복해서 포함하므로 청크 하나만으로도 열 의미를 알 수 있다.
+        segments는 generator이며 contents는 None이다.
+        """
+        return {
+            "contents_type": contents_type,
+            "contents": None,
+            "segments": self.iter_excel_segments(filepath)
+        }
 
-        if isinstance(excel_data, dict):
-            for sheet_name, df in excel_data.items():
-                markdown_table = self.dataframe_to_markdown(df)
-                contents_text += f"## Sheet: {sheet_name}\n"
-                contents_text += markdown_table + "\n\n"
-        else:
-            markdown_table = self.dataframe_to_markdown(excel_data)
-            contents_text += markdown_table
+    def iter_excel_segments(self, filepath: str) -> Iterator[dict]:
+        if filepath.lower().endswith("xls"):
+            # 레거시 xls는 openpyxl이 읽지 못하므로 pandas(xlrd)로 읽은 뒤 같은 방식으로 나눈다
+            excel_data = pd.ExcelFile(filepath)
+            for sheet_name in excel_data.sheet_names:
+                df = excel_data.parse(sheet_name, header=None).fillna("")
+                yield from self._iter_row_windows(sheet_name, (list(row) for row in df.itertuples(index=False)))
+            return
 
-        contents = {
-                "contents_type": contents_type,
-                "contents": contents_text
+        workbook = load_workbook(filepath, read_only=True, data_only=True)
+        try:
+            for sheet in workbook.worksheets:
+                # 일부 프로그램이 만든 파일은 dimension 정보가 잘못되어 있어 행이 잘리므로 초기화 후 읽는다
+                sheet.reset_dimensions()
+                yield from self._iter_row_windows(sheet.title, sheet.iter_rows(values_only=True))
+        finally:
+            workbook.close()
+
+    def _iter_row_windows(self, sheet_name: str, rows: Iterable) -> Iterator[dict]:
+        """행을 EXCEL_WINDOW_MAX_CHARS 이내로 묶어 헤더를 반복한 마크다운 표 segment로 만든다."""
+        header = None
+        title = f"## Sheet: {sheet_name}\n"
+        window = []
+        window_chars = 0
+        row_start = None
+
+        def _make_segment(row_end: int) -> dict:
+            return {
+                "text": title + "\n".join(header + window),
+                "metadata": {"sheet_name": sheet_name, "row_start": row_start, "row_end": row_end}
             }
 
-        return contents
+        last_row_no = 0
+        for row_no, row in enumerate(rows, start=1):
+            cells = [self._format_cell(value) for value in row]
+            while cells and not cells[-1]:
+                cells.pop()
+            if not cells:
+                continue
+
+            if header is None:
+                header_cells = cells
+                header = ["| " + " | ".join(header_cells) + " |",
+                          "|" + "---|" * len(header_cells)]
+                continue
+
+            line = "| " + " | ".join(cells) + " |"
+            if window and window_chars + len(line) > EXCEL_WINDOW_MAX_CHARS:
+                yield _make_segment(last_row_no)
+                window = []
+                window_chars = 0
+
+            if not window:
+                row_start = row_no
+            window.append(line)
+            window_chars += len(line) + 1
+            last_row_no = row_no
+
+        if window:
+            yield _make_segment(last_row_no)
+        elif header is not None:
+            # 헤더만 있는 시트
+            window = []
+            row_start = 1
+            yield _make_segment(1)
+
+    @staticmethod
+    def _format_cell(value) -> str:
+        if value is None:
+            return ""
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        return str(value).replace("|", "\\|").replace("\r", " ").replace("\n", " ").strip()
 
 if __name__ == "__main__":
     if len(sys.argv) != 2:
@@ -349,64 +309,16 @@ if __name__ == "__main__":
     document_reader = DocumentReader()
     
     try:
-        with open(file_path, 'rb') as f:
-            # UploadFile 객체 대신 파일 경로를 기반으로 처리
-            if file_path.lower().endswith("eml"):
-                result = document_reader.get_eml_contents(filepath=file_path, type="EML")
-            elif file_path.lower().endswith("mht"):
-                result = document_reader.get_eml_contents(filepath=file_path, type="MHT")
-            elif file_path.lower().endswith("doc") or file_path.lower().endswith("docx"):
-                result = document_reader.get_msoffice_contents(filepath=file_path, contents_type="MSWORD")
-            elif file_path.lower().endswith("ppt") or file_path.lower().endswith("pptx"):
-                result = document_reader.get_msoffice_contents(filepath=file_path, contents_type="MSPOWERPOINT")
-            elif file_path.lower().endswith("xls") or file_path.lower().endswith("xlsx"):
-                result = document_reader.get_excel_contents(filepath=file_path, contents_type="MSEXCEL")
-            elif file_path.lower().endswith("pdf"):
-                result = document_reader.get_pdf_contents(filepath=file_path, contents_type="PDF")
-            else:
-                # 텍스트 파일 처리
-                contents = f.read()
-                
-                # 인코딩 감지 및 다양한 인코딩 시도
-                text_contents = ""
-                try:
-                    # 먼저 chardet로 인코딩 감지 시도
-                    detection = chardet.detect(contents)
-                    encoding = detection.get('encoding')
-                    
-                    # 감지된 인코딩이 신뢰할 수 있는지 확인
-                    if encoding is None or detection.get('confidence', 0) < 0.6:
-                        # 일반적인 인코딩 순서대로 시도
-                        encodings_to_try = ['utf-8', 'cp949', 'euc-kr', 'latin1', 'cp1252']
-                    else:
-                        # 감지된 인코딩을 우선 시도하고 실패 시 다른 인코딩 시도
-                        encodings_to_try = [encoding, 'utf-8', 'cp949', 'euc-kr', 'latin1', 'cp1252']
-                    
-                    # 여러 인코딩 시도
-                    for encoding in encodings_to_try:
-                        try:
-                            text_contents = contents.decode(encoding, errors='replace')
-                            break  # 성공하면 루프 종료
-                        except (UnicodeDecodeError, LookupError):
-                            continue
-                    
-                    # 모든 인코딩이 실패하면 latin1으로 강제 디코딩 (항상 성공)
-                    if not text_contents:
-                        text_contents = contents.decode('latin1', errors='replace')
-                
-                except Exception as e:
-                    print(f"디코딩 오류: {e}")
-                    # 최후의 수단으로 errors='replace'를 사용하여 latin1으로 디코딩
-                    text_contents = contents.decode('latin1', errors='replace')
-                
-                result = {
-                    "contents_type": "TEXT",
-                    "contents": text_contents
-                }
-                
+        result = document_reader.get_contents_on_pc(file_path)
+        if result.get("contents") is not None and not isinstance(result["contents"], str):
+            # 스트리밍 형식(텍스트)은 조각을 모두 이어 붙여 출력
+            result["contents"] = "".join(result["contents"])
+
         # 모든 출력을 일관된 JSON 형식으로 변환
         if isinstance(result, dict):
-            if "contents" in result:
+            if result.get("contents") is None and "segments" in result:
+                print(json.dumps({"text": "\n\n".join(segment["text"] for segment in result["segments"])}, ensure_ascii=False))
+            elif "contents" in result:
                 print(json.dumps({"text": result["contents"]}, ensure_ascii=False))
             elif "contents_type" in result and "contents" in result:
                 print(json.dumps({"text": result["contents"]}, ensure_ascii=False))
@@ -1,30 +1,18 @@
 import os
 import unittest
-from typing import List, Optional
-import easyocr
-from PIL import Image
-# Pillow 10.0부터 Image.ANTIALIAS 상수가 제거되었으므로, 하위 호환을 위해 존재하지 않으면 추가
-if not hasattr(Image, "ANTIALIAS"):
-    # Resampling 대체 상수를 사용하여 ANTIALIAS 이름으로 재지정
-    try:
-        from PIL import Image as _PIL_Image
-        Image.ANTIALIAS = _PIL_Image.Resampling.LANCZOS  # type: ignore
-    except Exception:
-        # Resampling 모듈이 없는 구버전 Pillow 환경 등 예외는 무시
-        pass
-import cv2
-import numpy as np
+from typing import Callable, Dict, List, Optional, Iterable, Iterator, Union
 import chardet
 from io import StringIO
 import re
 
 from langchain.docstore.document import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import (
     TextLoader, PDFMinerLoader, Docx2txtLoader, UnstructuredPowerPointLoader,
     UnstructuredEmailLoader
 )
 from langchain_community.document_loaders.base import BaseLoader
+from ocr_util import ocr_image_file
+from fast_text_splitter import FastTextSplitter
 
 #from search_util import extract_keywords
 
@@ -38,9 +26,6 @@ class StringLoader(BaseLoader):
 class ImageLoader:
     def __init__(self, file_path: str):
         self.file_path = file_path
-        # 한번만 reader를 초기화하도록 클래스 변수로 설정
-        if not hasattr(ImageLoader, 'reader'):
-            ImageLoader.reader = easyocr.Reader(['ko', 'en'])  # 한글, 영어 지원
 
     def _validate_text(self, text: str) -> bool:
         """추출된 텍스트의 유효성을 검사합니다."""
@@ -78,65 +63,115 @@ class ImageLoader:
     def load(self) -> List[Document]:
 
         try:
-            # PIL로 이미지 열기 및 검증
-            with Image.open(self.file_path) as img:
-                # PIL 이미지를 numpy 배열로 변환
-                img_np = np.array(img)
-                
-                # RGB가 아닌 경우 변환
-                if len(img_np.shape) == 2:  # 흑백 이미지
-                    img_np = cv2.cvtColor(img_np, cv2.COLOR_GRAY2RGB)
-                elif len(img_np.shape) == 3 and img_np.shape[2] == 4:  # RGBA 이미지
-                    img_np = cv2.cvtColor(img_np, cv2.COLOR_RGBA2RGB)
-                
-                # OCR 수행
-                result = self.reader.readtext(img_np)
-                
-                # 텍스트가 추출되지 않은 경우
-                if not result:
-                    raise ValueError("텍스트를 추출할 수 없는 이미지입니다.")
-                
-                # 추출된 텍스트 결합 및 검증
-                text = '\n'.join([text for _, text, conf in result if conf > 0.5]) 
-                
-                if not self._validate_text(text):
-                    raise ValueError("추출된 텍스트가 유효하지 않습니다.")
-                
-                # Document 객체 생성
-                return [Document(
-                    page_content=text,
-                    metadata={
-                        "source": self.file_path,
-                        "ocr_confidence": sum(conf for _, _, conf in result) / len(result)  # 평균 신뢰도 추가
-                    }
-                )]
+            # OCR 수행 (같은 내용의 이미지는 캐시된 결과 사용, 큰 이미지는 축소 후 인식)
+            result = ocr_image_file(self.file_path)
+
+            # 텍스트가 추출되지 않은 경우
+            if not result["count"]:
+                raise ValueError("텍스트를 추출할 수 없는 이미지입니다.")
+
+            # 추출된 텍스트 검증
+            text = result["text"]
+            if not self._validate_text(text):
+                raise ValueError("추출된 텍스트가 유효하지 않습니다.")
+
+            # Document 객체 생성
+            return [Document(
+                page_content=text,
+                metadata={
+                    "source": self.file_path,
+                    "ocr_confidence": result["confidence"]  # 평균 신뢰도 추가
+                }
+            )]
         except Exception as e:
             raise ValueError(f"이미지 처리 중 오류 발생: {str(e)}")
 
+# 토큰 모드에서 헤더를 빼고 남는 청크 예산의 최소값 (헤더가 지나치게 길어도 본문이 들어갈 자리를 남긴다)
+MIN_TOKEN_BUDGET = 32
+# 문자 모드에서 표 segment(엑셀 행 묶음) 청크의 최대 길이. 문서명 헤더를 붙여도 vector_store의 5,000자 제한에 걸리지 않게 한다
+TABLE_SEGMENT_MAX_CHARS = 4000
+
 class DocumentSplitter:
-    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 100, chunk_separators: Optional[List[str]] = None):
+    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 100, chunk_separators: Optional[List[str]] = None,
+                 stream_window_size: Optional[int] = None):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
         self.chunk_separators = chunk_separators or ["\n\n", "\n", " ", ""]
+        # 스트리밍 분할 시 한 번에 분할하는 텍스트 크기(문자 수)
+        self.stream_window_size = stream_window_size or chunk_size * 64
+        # 청크 길이 측정 함수. 토큰 모드(use_token_budget)에서는 임베딩 모델 토크나이저의 토큰 수
+        self.length_function: Callable[[str], int] = len
+        self.tokenizer = None
+        self.max_tokens = None
+
+    def use_token_budget(self, tokenizer, max_seq_length: int, max_chunk_tokens: Optional[int] = None,
+                         chunk_overlap_tokens: int = 0):
+        """청크 길이를 임베딩 모델의 토큰 수로 측정한다.
+
+        청크(앞에 붙는 헤더 포함)는 max_seq_length에서 특수 토큰을 뺀 길이를 넘지 않으며,
+        max_chunk_tokens가 주어지면 그보다 작은 값으로 제한한다.
+        """
+        self.tokenizer = tokenizer
+        self.max_tokens = max_seq_length - tokenizer.num_special_tokens_to_add()
+        self.chunk_size = min(self.max_tokens, max_chunk_tokens) if max_chunk_tokens else self.max_tokens
+        self.chunk_overlap = chunk_overlap_tokens
+        self.length_function = self.count_tokens
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    def fit_to_token_limit(self, text: str, max_tokens: Optional[int] = None) -> str:
+        """토큰 모드에서 text가 max_tokens(기본: 모델 최대 길이)를 넘으면 넘는 부분을 잘라낸다."""
+        max_tokens = max_tokens or self.max_tokens
+        if self.tokenizer is None or max_tokens is None:
+            return text
+        encoding = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+        if len(encoding["input_ids"]) <= max_tokens:
+            return text
+        return text[:encoding["offset_mapping"][max_tokens - 1][1]]
+
+    def _chunk_budget(self, header_for: Optional[Callable[[Dict], str]], metadata: Dict) -> int:
+        """청크 본문에 쓸 수 있는 길이. 토큰 모드에서는 청크 앞에 붙을 헤더의 토큰 수를 뺀다."""
+        if self.tokenizer is None or header_for is None:
+            return self.chunk_size
+        return max(self.chunk_size - self.count_tokens(header_for(metadata)), MIN_TOKEN_BUDGET)
+
+    def _make_text_splitter(self, chunk_size: int) -> FastTextSplitter:
+        # langchain RecursiveCharacterTextSplitter와 같은 결과를 내는 빠른 분할기
+        return FastTextSplitter(
+            chunk_size=chunk_size,
+            # 헤더를 뺀 토큰 예산이 작아져도 겹침이 청크보다 커지지 않도록 제한
+            chunk_overlap=min(self.chunk_overlap, chunk_size // 2) if self.tokenizer is not None else self.chunk_overlap,
+            separators=self.chunk_separators,
+            length_function=self.length_function,
+        )
+
+    def split_document(self, file_extension: str, contents: Union[str, Iterable[str]], file_path: str,
+                       segments: Optional[List[dict]] = None,
+                       header_for: Optional[Callable[[Dict], str]] = None) -> Iterable[Document]:
+        """contents가 문자열이 아닌 텍스트 조각 iterable이면 청크를 generator로 돌려준다.
+
+        segments({"text", "metadata"} 목록, 예: PDF 페이지)가 주어지면 segment별로 분할하여
+        청크가 segment 경계를 넘지 않고, segment의 metadata가 각 청크에 복사된다.
+        header_for(metadata)는 청크 앞에 붙을 헤더를 돌려주며, 토큰 모드에서는 그만큼 청크 예산을 줄인다.
+        """
+        if file_extension in ['.txt', '.py', '.java', '.cpp', '.md', '.pdf', '.doc', '.docx', '.ppt', '.pptx', '.eml', '.mht', '.mbox',
+        '.c', 'cpp', '.h', '.hpp', '.cs', '.yaml', '.yml', '.java', 'js', 'ts', 'dart', '.dart', '.devbot', '.log']:
+            if segments is not None:
+                return self._split_segments(segments, file_path, header_for)
 
-    def split_document(self, file_extension: str, contents: str, file_path: str) -> List[Document]:
-        if file_extension in ['.txt', '.py', '.java', '.cpp', '.md', '.pdf', '.doc', '.docx', '.ppt', '.pptx', '.eml', '.mht',
-        '.c', 'cpp', '.h', '.hpp', '.cs', '.yaml', '.yml', '.java', 'js', 'ts', 'dart', '.dart', '.devbot']:
-            loader = StringLoader(contents)
-            
-            documents = loader.load()
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=self.chunk_size,
-                chunk_overlap=self.chunk_overlap,
-                separators=self.chunk_separators,
-                length_function=len,
-            )
-            for doc in documents:
-                doc.metadata['source'] = file_path
+            if not isinstance(contents, str):
+                return self._split_text_stream(contents, file_path, header_for)
 
-            docs = text_splitter.split_documents(documents)
+            text_splitter = self._make_text_splitter(self._chunk_budget(header_for, {}))
+            docs = [Document(page_content=text, metadata={'source': file_path})
+                    for text in text_splitter.split_text(contents)]
             
         elif file_extension in ['.xls', '.xlsx']:
+            if segments is not None:
+                # 행 묶음 segment는 헤더가 반복된 완결된 표이므로 더 나누지 않고 그대로 청크로 사용
+                return self._segments_as_documents(segments, file_path, {'file_type': 'excel'}, header_for)
+
             # 엑셀 파일의 경우 "## Sheet" 문자열을 기준으로 분할
             docs = []
             
@@ -167,15 +202,14 @@ class DocumentSplitter:
                 docs.append(doc)
             
         elif file_extension in ['.png', '.jpg', '.jpeg', '.gif', '.bmp', 'webp']:
+            if segments is not None:
+                # 추출 단계(DocumentReader.get_image_contents)에서 이미 OCR한 텍스트
+                return self._split_segments(segments, file_path, header_for)
+
             loader = ImageLoader(file_path)
             
             documents = loader.load()
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=self.chunk_size,
-                chunk_overlap=self.chunk_overlap,
-                separators=self.chunk_separators,
-                length_function=len,
-            )
+            text_splitter = self._make_text_splitter(self._chunk_budget(header_for, {}))
             for doc in documents:
                 doc.metadata['source'] = file_path
 
@@ -185,6 +219,102 @@ class DocumentSplitter:
             raise ValueError(f"Unsupported file type: {file_extension}")
 
         return docs
+
+    def _split_segments(self, segments: Iterable[dict], file_path: str,
+                        header_for: Optional[Callable[[Dict], str]] = None) -> Iterator[Document]:
+        text_splitters = {}  # 청크 예산별 분할기 (segment마다 헤더 길이가 다를 수 있다)
+        for segment in segments:
+            budget = self._chunk_budget(header_for, segment.get("metadata") or {})
+            if budget not in text_splitters:
+                text_splitters[budget] = self._make_text_splitter(budget)
+            for text in text_splitters[budget].split_text(segment["text"]):
+                metadata = dict(segment.get("metadata") or {})
+                metadata['source'] = file_path
+                yield Document(page_content=text, metadata=metadata)
+
+    def _segments_as_documents(self, segments: Iterable[dict], file_path: str, extra_metadata: dict,
+                               header_for: Optional[Callable[[Dict], str]] = None) -> Iterator[Document]:
+        for segment in segments:
+            metadata = dict(segment.get("metadata") or {})
+            metadata.update(extra_metadata)
+            metadata['source'] = file_path
+            for text in self._fit_table_segment(segment["text"], self._chunk_budget(header_for, metadata)):
+                yield Document(page_content=text, metadata=dict(metadata))
+
+    def _fit_table_segment(self, text: str, budget: int) -> Iterator[str]:
+        """표 segment(시트 제목, 헤더 2줄, 행들)가 예산을 넘으면 헤더를 반복하며 행 단위로 나눈다.
+
+        문자 모드에서는 TABLE_SEGMENT_MAX_CHARS를 예산으로 쓴다.
+        행 하나만으로 예산을 넘는 경우는 행을 예산 크기로 나누고, 나눈 조각마다 헤더를 붙인다.
+        """
+        if self.tokenizer is None:
+            budget, measure = TABLE_SEGMENT_MAX_CHARS, len
+        else:
+            measure = self.count_tokens
+        if measure(text) <= budget:
+            yield text
+            return
+
+        lines = text.split("\n")
+        prefix, rows = "\n".join(lines[:3]), lines[3:]
+        if not rows:
+            yield self.fit_to_token_limit(text, budget) if self.tokenizer is not None else text[:budget]
+            return
+
+        prefix_size = measure(prefix) + 1
+        row_budget = max(budget - prefix_size, MIN_TOKEN_BUDGET)
+        window, window_size = [], prefix_size
+        for row in rows:
+            for piece in self._split_long_row(row, row_budget):
+                piece_size = measure(piece) + 1
+                if window and window_size + piece_size > budget:
+                    yield self.fit_to_token_limit(prefix + "\n" + "\n".join(window), budget)
+                    window, window_size = [], prefix_size
+                window.append(piece)
+                window_size += piece_size
+        if window:
+            yield self.fit_to_token_limit(prefix + "\n" + "\n".join(window), budget)
+
+    def _split_long_row(self, row: str, budget: int) -> List[str]:
+        """행을 budget(문자 모드는 문자 수, 토큰 모드는 토큰 수) 이하의 조각으로 나눈다."""
+        if self.tokenizer is None:
+            return [row[start:start + budget] for start in range(0, len(row), budget)] or [row]
+
+        offsets = self.tokenizer(row, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+        if len(offsets) <= budget:
+            return [row]
+        pieces, start = [], 0
+        for index in range(budget, len(offsets), budget):
+            end = offsets[index - 1][1]
+            pieces.append(row[start:end])
+            start = end
+        pieces.append(row[start:])
+        return pieces
+
+    def _split_text_stream(self, pieces: Iterable[str], file_path: str,
+                           header_for: Optional[Callable[[Dict], str]] = None) -> Iterator[Document]:
+        """텍스트 조각을 stream_window_size 만큼 모아 분할한다.
+
+        윈도우의 마지막 청크는 확정하지 않고 다음 조각과 이어 붙여 다시 분할하므로
+        조각 경계에서 청크가 잘리지 않는다.
+        """
+        text_splitter = self._make_text_splitter(self._chunk_budget(header_for, {}))
+        buffer = ""
+        for piece in pieces:
+            buffer += piece
+            if len(buffer) < self.stream_window_size:
+                continue
+
+            chunks = text_splitter.split_chunks(buffer)
+            if len(chunks) <= 1:
+                continue
+            for chunk in chunks[:-1]:
+                yield Document(page_content=chunk.text, metadata={'source': file_path})
+            buffer = buffer[chunks[-1].start:]
+
+        if buffer:
+            for text in text_splitter.split_text(buffer):
+                yield Document(page_content=text, metadata={'source': file_path})
     
     def _detect_encoding(self, file_path: str) -> str:
         """
@@ -219,7 +349,8 @@ class DocumentSplitter:
         """
         supported_type = [
             '.txt', '.py', '.java', '.cpp', '.md', '.c', 'cpp', '.h', '.hpp', '.cs', '.yaml', '.yml', '.java', 'js', 'ts', 'dart', '.dart',
-            '.png', '.jpg', '.jpeg', '.gif', '.bmp', 'webp', '.devbot', '.eml', '.doc', '.docx', '.ppt', '.pptx', '.xls', '.xlsx', '.pdf', '.mht'
+            '.png', '.jpg', '.jpeg', '.gif', '.bmp', 'webp', '.devbot', '.eml', '.doc', '.docx', '.ppt', '.pptx', '.xls', '.xlsx', '.pdf', '.mht',
+            '.log', '.mbox'
         ]
         
         return file_extension in supported_type
@@ -288,5 +419,35 @@ class TestDocumentSplitter(unittest.TestCase):
         # 테스트 파일 삭제
         os.remove('test_separators.txt')
 
+class TestFastTextSplitter(unittest.TestCase):
+    """FastTextSplitter가 langchain RecursiveCharacterTextSplitter와 같은 청크를 만드는지 확인한다."""
+
+    def assertSameAsLangchain(self, text: str, chunk_size: int, chunk_overlap: int, separators=None):
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+        expected = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                                                  separators=separators).split_text(text)
+        chunks = FastTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                                  separators=separators).split_chunks(text)
+        self.assertEqual([chunk.text for chunk in chunks], expected)
+        for chunk in chunks:
+            self.assertEqual(text[chunk.start:chunk.end], chunk.text)
+
+    def test_split_text_file(self):
+        self.assertSameAsLangchain("This is a test document.\n" * 100, 500, 100)
+
+    def test_custom_chunk_size(self):
+        self.assertSameAsLangchain("This is a test document.\n" * 10, 50, 0)
+
+    def test_custom_separators(self):
+        text = "Short sentence one. Longer sentence two. Even longer sentence three. The end."
+        self.assertSameAsLangchain(text, 30, 0, [". "])
+        self.assertEqual(len(FastTextSplitter(chunk_size=30, chunk_overlap=0, separators=[". "]).split_text(text)), 4)
+
+    def test_mixed_text(self):
+        text = "제목\n\n첫 번째 문단입니다. " * 20 + "\n\n" + "x" * 700 + "\n  \n" + "마지막 줄\n" * 30
+        self.assertSameAsLangchain(text, 100, 20)
+        self.assertSameAsLangchain(text, 500, 100)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
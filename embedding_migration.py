@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+# 무중단 임베딩 모델 교체
+# 모델을 바꾸려면 저장소를 지우고 모든 파일을 다시 업로드해야 했고 그동안 검색을 할 수 없었다.
+# RAG별 백그라운드 작업으로 다음과 같이 교체한다.
+#   1) 저장된 청크 본문(압축된 본문은 해제)을 새 모델로 다시 임베딩하여 임시 폴더의 원본 벡터 파일에 이어 붙인다
+#      (파일 추출/분할을 다시 하지 않으며, 중단된 작업을 같은 모델로 다시 시작하면 이미 임베딩한 청크는 건너뛴다)
+#   2) 그동안 검색과 업로드는 기존 모델/인덱스로 계속된다
+#   3) 끝나면 쓰기 락 안에서 그사이 추가된 청크만 마저 임베딩하고, 새 인덱스를 만들어 저장소를 한 번에 교체한다
+# 실시간 요청이 밀리지 않도록 업로드 처리 중에는 기다리고, 배치마다 EMBEDDING_MIGRATION_DUTY_CYCLE에 맞춰 쉰다.
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import config
+import logger_util
+from vector_store import get_max_seq_length, load_embedding_model, release_embedding_model
+
+logger = logger_util.get_logger()
+
+
+class EmbeddingMigrator:
+    def __init__(self, get_stores: Callable[[], Dict[str, Any]], is_busy: Callable[[], bool]):
+        """
+        :param get_stores: 로드된 RAG 이름 -> VectorStore를 반환하는 함수
+        :param is_busy: 업로드 처리 중이면 True를 반환하는 함수
+        """
+        self.get_stores = get_stores
+        self.is_busy = is_busy
+        self._lock = threading.Lock()
+        # RAG 이름 -> 작업 스레드 / 취소 이벤트 / 진행 상태
+        self._threads: Dict[str, threading.Thread] = {}
+        self._cancel_events: Dict[str, threading.Event] = {}
+        self._progress: Dict[str, Dict[str, Any]] = {}
+
+    def start(self, rag_name: Optional[str], store, model_name: str, index_factory: str = "Flat",
+              allow_truncation: bool = False) -> Dict[str, Any]:
+        """해당 RAG(store)의 임베딩 모델 교체 작업을 시작한다.
+
+        저장된 청크는 기존 모델의 최대 길이(max_seq_length)에 맞춰 나뉘어 있으므로, 새 모델의 최대 길이가 더 짧으면
+        긴 청크의 뒷부분이 임베딩되지 않는다. 이 경우 allow_truncation이 아니면 교체하지 않는다.
+        """
+        name = rag_name or "default"
+        if model_name not in config.EMBEDDING_MODELS:
+            return {"status": "fail", "message": f"Unknown embedding model: {model_name}"}
+        if store.vector_store is None:
+            return {"status": "fail", "message": f"Vector store of {name} is not initialised"}
+        if model_name == store.embedding_model_name:
+            return {"status": "fail", "message": f"{name} already uses {model_name}"}
+
+        with self._lock:
+            thread = self._threads.get(name)
+            if thread and thread.is_alive():
+                return {"status": "fail", "message": f"Embedding migration of {name} is already running"}
+            cancel_event = threading.Event()
+            self._cancel_events[name] = cancel_event
+            self._progress[name] = {"state": "loading_model", "from_model": store.embedding_model_name,
+                                    "to_model": model_name, "index_factory": index_factory,
+                                    "started_at": int(time.time()), "processed": 0, "total": None}
+            thread = threading.Thread(target=self._run,
+                                      args=(name, store, model_name, index_factory, allow_truncation, cancel_event),
+                                      name=f"embedding-migration-{name}", daemon=True)
+            self._threads[name] = thread
+        thread.start()
+        return {"status": "success", "message": f"Embedding migration of {name} to {model_name} started"}
+
+    def cancel(self, rag_name: Optional[str] = None) -> bool:
+        """진행 중인 작업을 멈춘다. 이미 임베딩한 벡터는 남겨 두어 같은 모델로 다시 시작하면 이어서 진행한다."""
+        with self._lock:
+            cancel_event = self._cancel_events.get(rag_name or "default")
+        if cancel_event is None:
+            return False
+        cancel_event.set()
+        return True
+
+    def stop(self):
+        with self._lock:
+            threads = list(self._threads.values())
+            for cancel_event in self._cancel_events.values():
+                cancel_event.set()
+        for thread in threads:
+            thread.join(timeout=5.0)
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            progress = {name: dict(state) for name, state in self._progress.items()}
+        stores = {}
+        for name, store in self.get_stores().items():
+            stores[name] = dict(progress.get(name, {"state": "idle"}), embedding_model=store.embedding_model_name)
+        return {"default_model": config.MODEL_NAME, "stores": stores}
+
+    def _run(self, name: str, store, model_name: str, index_factory: str, allow_truncation: bool,
+             cancel_event: threading.Event):
+        started = time.time()
+        try:
+            embeddings, dimension = load_embedding_model(model_name)
+            old_max_length, new_max_length = get_max_seq_length(store.embeddings), get_max_seq_length(embeddings)
+            if old_max_length and new_max_length and new_max_length < old_max_length:
+                message = (f"{model_name} max_seq_length {new_max_length} is shorter than "
+                           f"{store.embedding_model_name} max_seq_length {old_max_length}; chunks longer than "
+                           f"{new_max_length} tokens will be truncated by the encoder")
+                if not allow_truncation:
+                    logger.error(f"[EmbeddingMigrator] {name}: refused, {message} (re-upload the files or allow truncation)")
+                    self._set_progress(name, state="failed", error=f"Refused: {message}", finished_at=int(time.time()))
+                    return
+                logger.warning(f"[EmbeddingMigrator] {name}: {message}")
+                self._set_progress(name, warning=message)
+            shadow = store.open_migration_shadow(model_name)
+
+            doc_ids = store.get_live_chunk_ids()
+            pending = [doc_id for doc_id in doc_ids if doc_id not in shadow]
+            processed = len(doc_ids) - len(pending)
+            self._set_progress(name, state="embedding", processed=processed, total=len(doc_ids))
+            logger.info(f"[EmbeddingMigrator] {name}: re-embedding {len(pending)} of {len(doc_ids)} chunks with {model_name}")
+
+            batch_size = config.EMBEDDING_MIGRATION_BATCH_SIZE
+            for start in range(0, len(pending), batch_size):
+                if not self._wait_until_idle(name, cancel_event):
+                    self._set_progress(name, state="cancelled", finished_at=int(time.time()))
+                    logger.info(f"[EmbeddingMigrator] {name}: cancelled at {processed}/{len(doc_ids)}")
+                    return
+                batch_started = time.time()
+                # 그사이 삭제된 청크는 건너뛴다 (추가된 청크는 교체할 때 마저 임베딩)
+                batch_ids, texts = store.vector_store.get_chunk_texts(pending[start:start + batch_size])
+                if batch_ids:
+                    shadow.append(batch_ids, embeddings.embed_documents(texts))
+                processed += len(pending[start:start + batch_size])
+                self._set_progress(name, processed=processed)
+                self._throttle(time.time() - batch_started, cancel_event)
+
+            self._set_progress(name, state="swapping")
+            old_model_name = store.embedding_model_name
+            count = store.swap_embedding_model(model_name, embeddings, dimension, shadow, index_factory)
+            # 이전 모델을 쓰는 저장소가 더 없으면 캐시에서 내려 모델 메모리가 두 배로 남지 않게 한다
+            if all(other.embedding_model_name != old_model_name for other in self.get_stores().values()):
+                release_embedding_model(old_model_name)
+            duration = round(time.time() - started, 2)
+            self._set_progress(name, state="done", vector_count=count, finished_at=int(time.time()),
+                               duration_sec=duration)
+            logger.info(f"[EmbeddingMigrator] {name}: switched to {model_name} ({count} vectors) in {duration}s")
+        except Exception as e:
+            logger.exception(f"[EmbeddingMigrator] Migration failed for {name}: {e}")
+            self._set_progress(name, state="failed", error=str(e), finished_at=int(time.time()))
+
+    def _wait_until_idle(self, name: str, cancel_event: threading.Event) -> bool:
+        """업로드 처리 중이면 끝날 때까지 기다린다. 취소되면 False."""
+        while not cancel_event.is_set() and self.is_busy():
+            self._set_progress(name, state="waiting")
+            cancel_event.wait(config.EMBEDDING_MIGRATION_BUSY_WAIT)
+        self._set_progress(name, state="embedding")
+        return not cancel_event.is_set()
+
+    @staticmethod
+    def _throttle(elapsed: float, cancel_event: threading.Event):
+        duty_cycle = config.EMBEDDING_MIGRATION_DUTY_CYCLE
+        if 0 < duty_cycle < 1:
+            cancel_event.wait(elapsed * (1 - duty_cycle) / duty_cycle)
+
+    def _set_progress(self, name: str, **values):
+        with self._lock:
+            self._progress.setdefault(name, {}).update(values)
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+# 원본 임베딩 벡터 보관 파일
+# FAISS 인덱스 종류/양자화/차원을 바꿀 때 말뭉치 전체를 다시 임베딩하지 않도록, 임베딩 모델이 만든 벡터를
+# 저장소 폴더의 별도 파일에 그대로 보관한다. 파일은 행 단위로 이어 붙이며 np.memmap으로 필요한 행만 읽는다.
+#   - embeddings.{세대}.bin : 벡터 행렬 (float32 또는 float16, 행 순서대로)
+#   - embeddings.{세대}.ids : 각 행의 docstore id (한 줄에 하나)
+#   - embeddings.json       : 차원, 자료형, 현재 세대
+# 이어 붙이다 중간에 프로세스가 종료되어 두 파일의 행 수가 다르면 짧은 쪽에 맞춘다.
+# 삭제된 행을 빼고 다시 쓸 때는 다음 세대 파일을 만든 뒤 embeddings.json을 교체하는 것으로 확정한다.
+
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+import config
+import logger_util
+
+logger = logger_util.get_logger()
+
+META_FILE_NAME = "embeddings.json"
+
+
+class RawEmbeddingStore:
+    def __init__(self, store_path: str):
+        self.store_path = store_path
+        self.dimension: Optional[int] = None
+        self.dtype = np.dtype(config.RAW_EMBEDDINGS_DTYPE)
+        self.generation = 0
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._load()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._rows
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.store_path, name)
+
+    def _vectors_path(self, generation: Optional[int] = None) -> str:
+        return self._path(f"embeddings.{self.generation if generation is None else generation}.bin")
+
+    def _ids_path(self, generation: Optional[int] = None) -> str:
+        return self._path(f"embeddings.{self.generation if generation is None else generation}.ids")
+
+    def _load(self):
+        meta_path = self._path(META_FILE_NAME)
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        # 이미 저장된 파일은 설정과 관계없이 저장할 때의 자료형으로 읽는다
+        self.dimension = meta["dimension"]
+        self.dtype = np.dtype(meta["dtype"])
+        self.generation = meta.get("generation", 0)
+
+        ids = []
+        if os.path.exists(self._ids_path()):
+            with open(self._ids_path(), "r", encoding="utf-8") as f:
+                ids = [line.rstrip("\n") for line in f]
+        row_bytes = self.dimension * self.dtype.itemsize
+        vectors_path = self._vectors_path()
+        vectors_size = os.path.getsize(vectors_path) if os.path.exists(vectors_path) else 0
+        count = min(vectors_size // row_bytes, len(ids))
+        if vectors_size != count * row_bytes or len(ids) != count:
+            # 이어 붙이는 위치가 어긋나지 않도록 두 파일을 온전한 행 수에 맞춰 자른다
+            logger.warning(f"[RawEmbeddingStore] {len(ids)} ids but {vectors_size / row_bytes:.1f} vectors, truncating to {count}")
+            if os.path.exists(vectors_path):
+                os.truncate(vectors_path, count * row_bytes)
+            with open(self._ids_path(), "w", encoding="utf-8") as f:
+                f.write("".join(f"{doc_id}\n" for doc_id in ids[:count]))
+        self._ids = ids[:count]
+        self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+
+    def _write_meta(self, generation: Optional[int] = None):
+        os.makedirs(self.store_path, exist_ok=True)
+        temp_path = self._path(META_FILE_NAME + ".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"dimension": self.dimension, "dtype": self.dtype.name,
+                       "generation": self.generation if generation is None else generation}, f)
+        os.replace(temp_path, self._path(META_FILE_NAME))
+
+    def append(self, doc_ids: List[str], vectors):
+        """벡터 행을 이어 붙인다. vectors는 doc_ids와 같은 순서의 (n, dimension) 배열이다."""
+        if not doc_ids:
+            return
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if self.dimension is None:
+            self.dimension = matrix.shape[1]
+            self._write_meta()
+        elif matrix.shape[1] != self.dimension:
+            raise ValueError(f"Embedding dimension {matrix.shape[1]} does not match stored {self.dimension}")
+
+        # 벡터를 먼저 쓰고 id를 쓴다 (id가 있는 행은 항상 벡터가 있다)
+        with open(self._vectors_path(), "ab") as f:
+            f.write(matrix.astype(self.dtype).tobytes())
+        with open(self._ids_path(), "a", encoding="utf-8") as f:
+            f.write("".join(f"{doc_id}\n" for doc_id in doc_ids))
+        for doc_id in doc_ids:
+            self._rows[doc_id] = len(self._ids)
+            self._ids.append(doc_id)
+
+    def get(self, doc_ids: List[str]) -> np.ndarray:
+        """doc_ids 순서대로 float32 벡터 행렬을 반환한다. 없는 id가 있으면 KeyError."""
+        if not doc_ids:
+            return np.zeros((0, self.dimension or 0), dtype=np.float32)
+        rows = np.fromiter((self._rows[doc_id] for doc_id in doc_ids), dtype=np.int64, count=len(doc_ids))
+        matrix = np.memmap(self._vectors_path(), dtype=self.dtype, mode="r",
+                           shape=(len(self._ids), self.dimension))
+        try:
+            return np.asarray(matrix[rows], dtype=np.float32)
+        finally:
+            # Windows에서는 열린 memmap이 있으면 파일을 교체할 수 없으므로 바로 닫는다
+            del matrix
+
+    def rewrite(self, doc_ids: Iterable[str], batch_size: int = 10000):
+        """doc_ids의 행만 그 순서대로 남기도록 파일을 다시 쓴다. (삭제된 청크의 벡터 제거)"""
+        doc_ids = [doc_id for doc_id in doc_ids if doc_id in self._rows]
+        if self.dimension is None:
+            return
+        new_generation = self.generation + 1
+        with open(self._vectors_path(new_generation), "wb") as vectors_file, \
+                open(self._ids_path(new_generation), "w", encoding="utf-8") as ids_file:
+            for start in range(0, len(doc_ids), batch_size):
+                batch = doc_ids[start:start + batch_size]
+                vectors_file.write(self.get(batch).astype(self.dtype).tobytes())
+                ids_file.write("".join(f"{doc_id}\n" for doc_id in batch))
+        # 메타 파일 교체가 확정 시점이다 (그 전에 종료되면 이전 세대 파일을 그대로 사용)
+        self._write_meta(new_generation)
+        old_generation, self.generation = self.generation, new_generation
+        self._ids = doc_ids
+        self._rows = {doc_id: row for row, doc_id in enumerate(doc_ids)}
+        self._remove_generation(old_generation)
+
+    def _remove_generation(self, generation: int):
+        for path in (self._vectors_path(generation), self._ids_path(generation)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def clear(self):
+        self._remove_generation(self.generation)
+        if os.path.exists(self._path(META_FILE_NAME)):
+            os.remove(self._path(META_FILE_NAME))
+        self.generation = 0
+        self.dimension = None
+        self.dtype = np.dtype(config.RAW_EMBEDDINGS_DTYPE)
+        self._ids = []
+        self._rows = {}
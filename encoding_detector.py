@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+# 텍스트 인코딩 감지
+# 파일 전체에 chardet을 돌리지 않고, 앞/중간/끝 일부 구간만 샘플링해서 판별한다.
+#   1) BOM 확인  2) UTF-8 엄격 디코딩  3) CP949(EUC-KR 포함) 엄격 디코딩
+#   4) 같은 폴더/확장자에서 이전에 감지된 인코딩  5) 마지막으로 첫 구간에만 chardet
+
+import os
+import codecs
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import chardet
+
+# 샘플 구간 하나의 크기
+SAMPLE_WINDOW_SIZE = 64 * 1024
+# 파일이 이보다 크면 앞/중간/끝 구간만 샘플링한다
+SAMPLE_WINDOW_COUNT = 3
+# (폴더, 확장자)별로 기억하는 인코딩 항목 수
+PATTERN_CACHE_MAX_ENTRIES = 1024
+
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+class EncodingDetector:
+    def __init__(self, window_size: int = SAMPLE_WINDOW_SIZE, window_count: int = SAMPLE_WINDOW_COUNT,
+                 max_cache_entries: int = PATTERN_CACHE_MAX_ENTRIES):
+        self.window_size = window_size
+        self.window_count = window_count
+        self.max_cache_entries = max_cache_entries
+        self._pattern_cache = OrderedDict()  # type: OrderedDict[Tuple[str, str], str]
+        self._lock = threading.Lock()
+
+    def detect_file(self, file_path: str) -> str:
+        """파일 일부 구간만 읽어 인코딩을 감지한다."""
+        file_size = os.path.getsize(file_path)
+        with open(file_path, 'rb') as f:
+            samples = []
+            for offset in self._window_offsets(file_size):
+                f.seek(offset)
+                samples.append((offset, f.read(self.window_size)))
+        return self._detect(samples, self._pattern_key(file_path))
+
+    def detect_bytes(self, data: bytes, file_path: Optional[str] = None) -> str:
+        """메모리에 있는 바이트열의 인코딩을 감지한다. file_path를 주면 폴더/확장자 캐시를 사용한다."""
+        samples = [(offset, data[offset:offset + self.window_size]) for offset in self._window_offsets(len(data))]
+        return self._detect(samples, self._pattern_key(file_path) if file_path else None)
+
+    def _window_offsets(self, size: int) -> List[int]:
+        if size <= self.window_size * self.window_count:
+            return [0]
+        last = size - self.window_size
+        return [last * i // (self.window_count - 1) for i in range(self.window_count)]
+
+    @staticmethod
+    def _pattern_key(file_path: str) -> Tuple[str, str]:
+        return os.path.dirname(os.path.abspath(file_path)), os.path.splitext(file_path)[1].lower()
+
+    def _detect(self, samples: List[Tuple[int, bytes]], pattern_key: Optional[Tuple[str, str]]) -> str:
+        head = samples[0][1] if samples else b""
+        for bom, encoding in _BOMS:
+            if head.startswith(bom):
+                return encoding
+
+        for encoding in ('utf-8', 'cp949'):
+            if self._decodes_strictly(samples, encoding):
+                return encoding
+
+        if pattern_key is not None:
+            with self._lock:
+                cached = self._pattern_cache.get(pattern_key)
+            if cached and self._decodes_strictly(samples, cached):
+                return cached
+
+        detection = chardet.detect(head)
+        encoding = detection.get('encoding')
+        if encoding is None or encoding == 'Windows-1254':
+            encoding = 'utf-8'
+
+        if pattern_key is not None:
+            with self._lock:
+                self._pattern_cache[pattern_key] = encoding
+                self._pattern_cache.move_to_end(pattern_key)
+                while len(self._pattern_cache) > self.max_cache_entries:
+                    self._pattern_cache.popitem(last=False)
+        return encoding
+
+    @staticmethod
+    def _decodes_strictly(samples: List[Tuple[int, bytes]], encoding: str) -> bool:
+        """모든 샘플 구간이 오류 없이 디코딩되는지 확인한다.
+
+        구간 경계에서 잘린 멀티바이트 문자는 오류로 보지 않도록, 파일 중간에서 시작하는 구간은
+        앞쪽 몇 바이트를 건너뛰어 보고 구간 끝은 미완성 문자를 허용한다.
+        """
+        for offset, sample in samples:
+            starts = (0,) if offset == 0 else (0, 1, 2, 3)
+            if not any(EncodingDetector._decodes_from(sample, start, encoding) for start in starts):
+                return False
+        return True
+
+    @staticmethod
+    def _decodes_from(sample: bytes, start: int, encoding: str) -> bool:
+        try:
+            codecs.getincrementaldecoder(encoding)(errors='strict').decode(sample[start:], final=False)
+            return True
+        except UnicodeDecodeError:
+            return False
+
+
+encoding_detector = EncodingDetector()
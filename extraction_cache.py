@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+
+# 문서 추출 결과(contents dict) 디스크 캐시
+# 청크 설정 변경, 임베딩 모델 교체, RAG 재구축 등으로 같은 파일을 다시 인덱싱할 때 추출 단계를 건너뛰기 위해 사용한다.
+# 파일 경로별로 gzip JSON Lines 파일 하나를 두고, 파일 지문(크기, 수정 시각, 내용 해시)이 맞을 때만 사용한다.
+#   1번째 줄: {"fingerprint": ..., "contents": segments를 제외한 contents dict}
+#   2번째 줄부터: segment 한 개씩 (segments가 없는 형식은 1번째 줄만 있다)
+# 전체 크기가 max_bytes를 넘으면 가장 오래 사용하지 않은 항목부터 삭제한다.
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import uuid
+import weakref
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+import config
+import logger_util
+
+logger = logger_util.get_logger()
+
+# 추출 비용이 큰 형식만 캐시한다 (텍스트는 디코딩만 하므로 캐시보다 다시 읽는 편이 빠르다)
+CACHEABLE_CONTENTS_TYPES = {"PDF", "MSWORD", "MSPOWERPOINT", "MSEXCEL", "EML", "MHT"}
+# 삭제를 시작하면 전체 크기를 max_bytes의 이 비율까지 줄인다
+EVICTION_TARGET_RATIO = 0.9
+
+
+class ExtractionCache:
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._total_bytes = None  # 최초 사용 시 디렉터리를 스캔해서 계산
+        self._lock = threading.Lock()
+
+    def _entry_path(self, file_path: str) -> str:
+        key = hashlib.blake2b(os.path.abspath(file_path).encode('utf-8'), digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], f"{key}.jsonl.gz")
+
+    @staticmethod
+    def _matches(cached: Dict, fingerprint: Dict) -> bool:
+        if cached.get("file_size") != fingerprint.get("file_size"):
+            return False
+        if cached.get("file_mtime") == fingerprint.get("file_mtime"):
+            return True
+        return bool(cached.get("content_hash")) and cached.get("content_hash") == fingerprint.get("content_hash")
+
+    def get(self, file_path: str, fingerprint: Dict) -> Optional[Dict]:
+        """지문이 일치하는 캐시가 있으면 contents dict를 반환한다. segments는 캐시 파일에서 차례로 읽는 generator이다."""
+        entry_path = self._entry_path(file_path)
+        try:
+            with gzip.open(entry_path, 'rt', encoding='utf-8') as f:
+                header = json.loads(f.readline())
+        except (OSError, ValueError, EOFError):
+            return None
+
+        if not self._matches(header.get("fingerprint") or {}, fingerprint):
+            return None
+
+        try:
+            # 최근 사용 시각을 갱신하여 삭제 순서에 반영
+            os.utime(entry_path)
+        except OSError:
+            pass
+
+        contents = header["contents"]
+        if header.get("has_segments"):
+            contents["segments"] = self._iter_segments(entry_path)
+        return contents
+
+    @staticmethod
+    def _iter_segments(entry_path: str) -> Iterator[Dict]:
+        with gzip.open(entry_path, 'rt', encoding='utf-8') as f:
+            f.readline()  # header
+            for line in f:
+                yield json.loads(line)
+
+    def wrap(self, file_path: str, fingerprint: Dict, contents: Dict) -> Dict:
+        """추출 결과를 캐시에 기록한다.
+
+        segments가 generator이면 소비되는 대로 기록하고, 끝까지 소비된 경우에만 캐시 항목으로 확정한다.
+        """
+        if contents.get("contents_type") not in CACHEABLE_CONTENTS_TYPES:
+            return contents
+
+        entry_path = self._entry_path(file_path)
+        # 버려진 스트림의 정리(_discard)가 나중에 실행되어도 다른 기록의 임시 파일을 지우지 않도록 고유한 이름을 쓴다
+        temp_path = f"{entry_path}.{uuid.uuid4().hex}.tmp"
+        segments = contents.get("segments")
+        header = {
+            "fingerprint": fingerprint,
+            "has_segments": segments is not None,
+            "contents": {key: value for key, value in contents.items() if key != "segments"},
+        }
+
+        try:
+            os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+            f = gzip.open(temp_path, 'wt', encoding='utf-8')
+            f.write(json.dumps(header, ensure_ascii=False, default=str) + "\n")
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"[ExtractionCache] Failed to write cache for {file_path}: {e}")
+            return contents
+
+        if segments is None:
+            self._commit(f, temp_path, entry_path)
+            return contents
+
+        if isinstance(segments, list):
+            for segment in segments:
+                f.write(json.dumps(segment, ensure_ascii=False, default=str) + "\n")
+            self._commit(f, temp_path, entry_path)
+            return contents
+
+        wrapped = dict(contents)
+        wrapped["segments"] = self._write_through(segments, f, temp_path, entry_path)
+        # 한 번도 읽지 않고 버려진 generator는 finally가 실행되지 않으므로 수거 시에도 임시 파일을 지운다
+        weakref.finalize(wrapped["segments"], self._discard, segments, f, temp_path)
+        return wrapped
+
+    def _write_through(self, segments: Iterable[Dict], f, temp_path: str, entry_path: str) -> Iterator[Dict]:
+        completed = False
+        try:
+            for segment in segments:
+                f.write(json.dumps(segment, ensure_ascii=False, default=str) + "\n")
+                yield segment
+            completed = True
+        finally:
+            if completed:
+                self._commit(f, temp_path, entry_path)
+            else:
+                # 중간에 실패하거나 소비가 중단된(GeneratorExit) 결과는 캐시하지 않는다
+                self._discard(segments, f, temp_path)
+
+    def _discard(self, segments: Iterable[Dict], f, temp_path: str):
+        """기록 중이던 임시 파일을 지우고, 원본 스트림도 닫아 그쪽 임시 파일이 남지 않게 한다."""
+        f.close()
+        self._remove(temp_path)
+        close = getattr(segments, "close", None)
+        if close is not None:
+            close()
+
+    def _commit(self, f, temp_path: str, entry_path: str):
+        try:
+            f.close()
+            old_size = os.path.getsize(entry_path) if os.path.exists(entry_path) else 0
+            os.replace(temp_path, entry_path)
+            new_size = os.path.getsize(entry_path)
+        except OSError as e:
+            logger.error(f"[ExtractionCache] Failed to commit cache entry {entry_path}: {e}")
+            self._remove(temp_path)
+            return
+
+        with self._lock:
+            total = self._get_total_bytes_locked() + new_size - old_size
+            self._total_bytes = total
+            if total > self.max_bytes:
+                self._evict_locked()
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _list_entries(self):
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".jsonl.gz"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _get_total_bytes_locked(self) -> int:
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, size, _ in self._list_entries())
+        return self._total_bytes
+
+    def _evict_locked(self):
+        target = int(self.max_bytes * EVICTION_TARGET_RATIO)
+        entries = self._list_entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            self._remove(path)
+            total -= size
+        self._total_bytes = total
+        logger.info(f"[ExtractionCache] Evicted old entries, cache size is now {total} bytes")
+
+    def get_or_extract(self, file_path: str, fingerprint: Optional[Dict], extract: Callable[[], Dict]) -> Dict:
+        """캐시된 추출 결과를 반환하고, 없으면 extract()로 추출하여 캐시에 기록한다."""
+        if not fingerprint:
+            return extract()
+
+        cached = self.get(file_path, fingerprint)
+        if cached is not None:
+            logger.debug(f"[ExtractionCache] Cache hit: {file_path}")
+            return cached
+        return self.wrap(file_path, fingerprint, extract())
+
+
+extraction_cache = ExtractionCache(config.EXTRACTION_CACHE_PATH, config.EXTRACTION_CACHE_MAX_BYTES)
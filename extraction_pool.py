@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+
+# 문서 추출(PDF 페이지, Office 문서 등)에 공용으로 쓰는 워커 프로세스 풀
+# 감독 워커 프로세스(extraction_worker) 안에서는 풀을 만들지 않고 현재 프로세스에서 추출한다.
+# (워커마다 풀을 만들면 워커 수 x CPU 수만큼 손자 프로세스가 생기고, 그 메모리도 워커의 메모리 한도에 포함된다)
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# 추출 워커 프로세스 수
+EXTRACT_WORKERS = max((os.cpu_count() or 2) - 1, 1)
+
+_pool = None
+_pool_lock = threading.Lock()
+_in_supervised_worker = False
+
+
+def mark_supervised_worker():
+    """감독 워커 프로세스 시작 시 호출한다. 이후 이 프로세스에서는 프로세스 풀을 사용하지 않는다."""
+    global _in_supervised_worker
+    _in_supervised_worker = True
+
+
+def use_extraction_pool() -> bool:
+    return not _in_supervised_worker
+
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS)
+        return _pool
@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+
+# 감독(supervised) 추출 워커
+# PDF, Office, Excel, 이메일처럼 파서가 멈추거나 죽을 수 있는 형식은 별도 워커 프로세스에서 추출한다.
+# 어떤 형식을 감독할지, 제한 시간과 메모리 한도는 extractor_registry의 형식별 추출기가 정한다.
+# 시간/메모리 한도를 넘거나 워커가 죽으면 해당 프로세스 트리를 종료하고 ExtractionError를 발생시키므로,
+# 문제 파일 하나는 자신의 제한 시간만큼만 비용을 치르고 큐의 다른 파일은 계속 처리된다.
+# 워커는 일정 개수의 파일을 처리하면 새 프로세스로 교체(recycle)된다.
+#
+# 워커는 추출 결과를 임시 JSON Lines 파일에 기록하고, 부모는 이를 읽어 contents dict로 복원한다.
+#   1번째 줄: {"contents": 스트리밍 항목을 제외한 contents dict, "stream": "segments" | "contents" | null}
+#   2번째 줄부터: 스트리밍 항목(segment 또는 텍스트 조각) 한 개씩
+
+import atexit
+import json
+import multiprocessing
+import os
+import queue
+import tempfile
+import threading
+import time
+import weakref
+from typing import Dict, Iterator, Optional
+
+import psutil
+
+import config
+import logger_util
+
+logger = logger_util.get_logger()
+
+# 워커 상태 확인 주기(초)
+POLL_INTERVAL = 0.5
+# 재활용 시 워커가 스스로 종료하기를 기다리는 시간(초)
+WORKER_STOP_TIMEOUT = 5
+# 새 워커가 모듈 로드를 마칠 때까지 기다리는 시간(초). 파일별 제한 시간에는 포함하지 않는다
+WORKER_START_TIMEOUT = 180
+# 워커가 준비되었음을 알리는 task_id
+READY_TASK_ID = 0
+
+
+class ExtractionError(Exception):
+    """감독 워커에서 추출이 실패한 경우. error_type은 timeout, memory, crash, error 중 하나이다."""
+
+    def __init__(self, message: str, error_type: str = "error"):
+        super().__init__(message)
+        self.error_type = error_type
+
+
+def _write_contents(contents: Dict, output_path: str):
+    stream = None
+    if contents.get("segments") is not None:
+        stream = "segments"
+    elif contents.get("contents") is not None and not isinstance(contents["contents"], str):
+        stream = "contents"
+
+    header = {"contents": {key: value for key, value in contents.items() if key != stream}, "stream": stream}
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(header, ensure_ascii=False, default=str) + "\n")
+        if stream:
+            for item in contents[stream]:
+                f.write(json.dumps(item, ensure_ascii=False, default=str) + "\n")
+
+
+def _worker_main(task_queue, result_queue):
+    """워커 프로세스 진입점. 작업을 하나씩 받아 추출 결과를 파일로 기록한다."""
+    from extraction_pool import mark_supervised_worker
+    from extractor_registry import extractor_registry
+
+    mark_supervised_worker()
+
+    parent = multiprocessing.parent_process()
+    result_queue.put((READY_TASK_ID, None))
+    while True:
+        try:
+            task = task_queue.get(timeout=1)
+        except queue.Empty:
+            # 부모 프로세스가 사라졌으면 종료
+            if parent is not None and not parent.is_alive():
+                break
+            continue
+        if task is None:
+            break
+
+        task_id, file_path, output_path = task
+        try:
+            _write_contents(extractor_registry.extract_in_process(file_path), output_path)
+            result_queue.put((task_id, None))
+        except Exception as e:
+            result_queue.put((task_id, f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    def __init__(self, context):
+        self.task_queue = context.Queue()
+        self.result_queue = context.Queue()
+        # 워커 안에서 PDF 페이지 추출용 프로세스 풀을 만들 수 있도록 daemon으로 띄우지 않는다
+        self.process = context.Process(target=_worker_main, args=(self.task_queue, self.result_queue),
+                                       name="extraction-worker", daemon=False)
+        self.process.start()
+        self.tasks_done = 0
+        self.ready = False
+
+    def wait_ready(self):
+        started = time.monotonic()
+        while not self.ready:
+            try:
+                task_id, _ = self.result_queue.get(timeout=POLL_INTERVAL)
+                self.ready = task_id == READY_TASK_ID
+            except queue.Empty:
+                if not self.process.is_alive():
+                    raise ExtractionError(f"Extraction worker exited during startup (exit code {self.process.exitcode})", "crash")
+                if time.monotonic() - started > WORKER_START_TIMEOUT:
+                    raise ExtractionError(f"Extraction worker did not start within {WORKER_START_TIMEOUT}s", "timeout")
+
+    def memory_usage(self) -> int:
+        """워커와 그 하위 프로세스의 RSS 합계(바이트)"""
+        try:
+            process = psutil.Process(self.process.pid)
+            processes = [process] + process.children(recursive=True)
+        except psutil.Error:
+            return 0
+
+        total = 0
+        for proc in processes:
+            try:
+                total += proc.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+    def kill(self):
+        """워커와 하위 프로세스를 모두 강제 종료한다."""
+        try:
+            process = psutil.Process(self.process.pid)
+            for child in process.children(recursive=True):
+                child.kill()
+            process.kill()
+        except psutil.Error:
+            pass
+        self.process.join(timeout=WORKER_STOP_TIMEOUT)
+
+    def stop(self):
+        try:
+            self.task_queue.put(None)
+        except Exception:
+            pass
+        self.process.join(timeout=WORKER_STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.kill()
+
+
+class ExtractionSupervisor:
+    def __init__(self, max_workers: int = 1, max_tasks_per_worker: int = 50):
+        self.max_workers = max_workers
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self._context = multiprocessing.get_context("spawn")
+        self._idle_workers = []
+        self._slots = threading.Semaphore(max_workers)
+        self._lock = threading.Lock()
+        self._task_seq = 0
+
+    def run(self, file_path: str, timeout: Optional[int] = None, memory_limit_mb: Optional[int] = None) -> Dict:
+        """워커 프로세스에서 파일 내용을 추출한다. timeout(초)이나 memory_limit_mb를 넘으면 ExtractionError를 발생시킨다."""
+        fd, output_path = tempfile.mkstemp(prefix="devbot_extract_", suffix=".jsonl")
+        os.close(fd)
+        try:
+            with self._slots:
+                worker = self._acquire_worker()
+                try:
+                    error = self._run_task(worker, file_path, output_path, timeout, memory_limit_mb)
+                except Exception:
+                    # 시간/메모리 초과 또는 비정상 종료된 워커는 재사용하지 않는다
+                    worker.kill()
+                    raise
+                # 파서 예외는 워커 상태와 무관하므로 워커는 계속 사용한다
+                self._release_worker(worker)
+
+            if error:
+                raise ExtractionError(f"Extraction failed: {file_path} ({error})", "error")
+            return self._read_contents(output_path)
+        except Exception:
+            self._remove(output_path)
+            raise
+
+    def _acquire_worker(self) -> _Worker:
+        with self._lock:
+            while self._idle_workers:
+                worker = self._idle_workers.pop()
+                if worker.process.is_alive():
+                    return worker
+        return _Worker(self._context)
+
+    def _release_worker(self, worker: _Worker):
+        worker.tasks_done += 1
+        if worker.tasks_done >= self.max_tasks_per_worker:
+            logger.info(f"[ExtractionWorker] Recycling worker {worker.process.pid} after {worker.tasks_done} files")
+            worker.stop()
+            return
+        with self._lock:
+            self._idle_workers.append(worker)
+
+    def _run_task(self, worker: _Worker, file_path: str, output_path: str,
+                  timeout: Optional[int], memory_limit: Optional[int]) -> Optional[str]:
+        """워커에 작업을 맡기고 끝날 때까지 감시한다. 파서 예외 메시지(성공 시 None)를 반환한다."""
+        with self._lock:
+            self._task_seq += 1
+            task_id = self._task_seq
+
+        worker.wait_ready()
+        started = time.monotonic()
+        worker.task_queue.put((task_id, file_path, output_path))
+
+        while True:
+            try:
+                result_id, error = worker.result_queue.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                if not worker.process.is_alive():
+                    raise ExtractionError(
+                        f"Extraction worker crashed (exit code {worker.process.exitcode}): {file_path}", "crash")
+                if timeout and time.monotonic() - started > timeout:
+                    raise ExtractionError(f"Extraction timed out after {timeout}s: {file_path}", "timeout")
+                if memory_limit and worker.memory_usage() > memory_limit * 1024 * 1024:
+                    raise ExtractionError(f"Extraction exceeded memory limit of {memory_limit}MB: {file_path}", "memory")
+                continue
+
+            if result_id != task_id:
+                # 이전에 중단된 작업의 늦은 응답은 무시
+                continue
+            return error
+
+    def _read_contents(self, output_path: str) -> Dict:
+        f = open(output_path, 'r', encoding='utf-8')
+        try:
+            header = json.loads(f.readline())
+        except Exception:
+            f.close()
+            raise
+        contents = header["contents"]
+        stream = header.get("stream")
+        if stream:
+            contents[stream] = self._iter_stream(f, output_path)
+        else:
+            f.close()
+            self._remove(output_path)
+        return contents
+
+    def _iter_stream(self, f, output_path: str) -> Iterator:
+        """임시 파일의 스트리밍 항목을 읽는 generator. 끝까지 읽거나, 중간에 닫히거나(예외, 취소),
+        한 번도 읽지 않고 버려져도 임시 파일을 지운다."""
+        stream = self._read_stream(f, output_path)
+        # 시작하지 않은 generator는 close/GC 때 finally가 실행되지 않으므로 generator 수거 시에도 정리한다
+        weakref.finalize(stream, _close_and_remove, f, output_path)
+        return stream
+
+    @staticmethod
+    def _read_stream(f, output_path: str) -> Iterator:
+        try:
+            for line in f:
+                yield json.loads(line)
+        finally:
+            # GeneratorExit(중간에 close)와 예외도 포함
+            _close_and_remove(f, output_path)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._idle_workers = self._idle_workers, []
+        for worker in workers:
+            worker.stop()
+
+
+def _close_and_remove(f, path: str):
+    f.close()
+    ExtractionSupervisor._remove(path)
+
+
+extraction_supervisor = ExtractionSupervisor(
+    max_workers=config.EXTRACTION_WORKERS,
+    max_tasks_per_worker=config.EXTRACTION_WORKER_MAX_TASKS,
+)
+atexit.register(extraction_supervisor.shutdown)
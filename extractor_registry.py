@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+
+# 형식별 추출기 레지스트리
+# 확장자별 if/elif 분기 대신 형식마다 추출기(FormatExtractor)를 등록하고, 추출기는 다음을 선언한다.
+#   - max_concurrency: 동시에 실행할 수 있는 추출 작업 수 (OCR처럼 무거운 형식은 1~2개로 제한)
+#   - memory_class: light / medium / heavy. 감독 워커의 메모리 한도를 정한다 (config.EXTRACTION_MEMORY_CLASS_LIMITS_MB)
+#   - streaming: 결과를 조각(generator) 단위로 흘려보내는지 여부
+#   - supervised: 시간/메모리 한도가 있는 감독 워커 프로세스에서 실행할지 여부
+# 업로드 큐 워커가 여러 개여도 형식별 한도 안에서만 동시에 추출하므로, 가벼운 텍스트 파일은 병렬로 처리되고 OCR은 제한된다.
+
+import os
+import threading
+from typing import Callable, Dict, Iterator, List, Optional
+
+import config
+
+# 어떤 추출기에도 해당하지 않는 파일은 텍스트로 읽는다
+DEFAULT_EXTRACTOR_NAME = "text"
+
+
+class FormatExtractor:
+    def __init__(self, name: str, extensions: List[str], handler: Callable[[object, str], Dict],
+                 max_concurrency: int = 1, memory_class: str = "light", streaming: bool = False,
+                 supervised: bool = False):
+        """
+        :param handler: (DocumentReader, 파일 경로) -> contents dict
+        """
+        self.name = name
+        self.extensions = [extension.lower() for extension in extensions]
+        self.handler = handler
+        self.max_concurrency = max_concurrency
+        self.memory_class = memory_class
+        self.streaming = streaming
+        self.supervised = supervised
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    @property
+    def timeout(self) -> Optional[int]:
+        return config.EXTRACTION_TIMEOUTS.get(self.name)
+
+    @property
+    def memory_limit_mb(self) -> Optional[int]:
+        return config.EXTRACTION_MEMORY_CLASS_LIMITS_MB.get(self.memory_class)
+
+
+class ExtractorRegistry:
+    def __init__(self):
+        self._extractors: Dict[str, FormatExtractor] = {}
+        self._by_extension: Dict[str, FormatExtractor] = {}
+        self._reader = None
+        self._reader_lock = threading.Lock()
+
+    def register(self, extractor: FormatExtractor):
+        self._extractors[extractor.name] = extractor
+        for extension in extractor.extensions:
+            self._by_extension[extension] = extractor
+
+    def get(self, file_path: str) -> FormatExtractor:
+        extension = os.path.splitext(file_path)[1].lower()
+        return self._by_extension.get(extension) or self._extractors[DEFAULT_EXTRACTOR_NAME]
+
+    def get_extractors(self) -> List[FormatExtractor]:
+        return list(self._extractors.values())
+
+    def _get_reader(self):
+        with self._reader_lock:
+            if self._reader is None:
+                from document_reader import DocumentReader
+                self._reader = DocumentReader()
+            return self._reader
+
+    def extract_in_process(self, file_path: str) -> Dict:
+        """현재 프로세스에서 바로 추출한다. 감독 워커 프로세스 안에서도 이 메서드를 사용한다."""
+        return self.get(file_path).handler(self._get_reader(), file_path)
+
+    def extract(self, file_path: str) -> Dict:
+        """형식별 동시 실행 한도 안에서 추출한다. supervised 형식은 감독 워커 프로세스에서 실행한다.
+
+        현재 프로세스에서 스트리밍하는 형식은 handler가 generator를 바로 반환하고 실제 읽기는 소비할 때 일어나므로,
+        스트림을 끝까지 읽거나 닫을 때까지 슬롯을 잡아 둔다.
+        """
+        extractor = self.get(file_path)
+        if extractor.supervised:
+            with extractor._slots:
+                from extraction_worker import extraction_supervisor
+                return extraction_supervisor.run(file_path, timeout=extractor.timeout,
+                                                 memory_limit_mb=extractor.memory_limit_mb)
+
+        extractor._slots.acquire()
+        try:
+            contents = extractor.handler(self._get_reader(), file_path)
+        except BaseException:
+            extractor._slots.release()
+            raise
+        return _hold_slot_while_streaming(contents, extractor._slots.release)
+
+    def get_status(self) -> List[Dict]:
+        return [{
+            "name": extractor.name,
+            "extensions": extractor.extensions,
+            "max_concurrency": extractor.max_concurrency,
+            "memory_class": extractor.memory_class,
+            "streaming": extractor.streaming,
+            "supervised": extractor.supervised,
+        } for extractor in self._extractors.values()]
+
+
+class _SlotHeldStream:
+    """스트림을 끝까지 읽거나 닫을(또는 버려질) 때 release를 한 번 호출하는 iterator"""
+
+    def __init__(self, stream: Iterator, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._stream)
+        except BaseException:
+            # StopIteration(끝까지 읽음) 또는 추출 예외
+            self.close()
+            raise
+
+    def close(self):
+        release, self._release = self._release, None
+        if release is None:
+            return
+        try:
+            close = getattr(self._stream, "close", None)
+            if close is not None:
+                close()
+        finally:
+            release()
+
+    def __del__(self):
+        self.close()
+
+
+def _hold_slot_while_streaming(contents: Dict, release: Callable[[], None]) -> Dict:
+    """contents 안의 스트림(contents/segments generator)이 모두 닫힐 때까지 release를 미룬다."""
+    stream_keys = [key for key in ("contents", "segments")
+                   if isinstance(contents, dict) and isinstance(contents.get(key), Iterator)]
+    if not stream_keys:
+        release()
+        return contents
+
+    remaining = [len(stream_keys)]
+    lock = threading.Lock()
+
+    def release_one():
+        with lock:
+            remaining[0] -= 1
+            done = remaining[0] == 0
+        if done:
+            release()
+
+    contents = dict(contents)
+    for key in stream_keys:
+        contents[key] = _SlotHeldStream(contents[key], release_one)
+    return contents
+
+
+def _office_contents_type(file_path: str) -> str:
+    return "MSPOWERPOINT" if os.path.splitext(file_path)[1].lower() in (".ppt", ".pptx") else "MSWORD"
+
+
+def _email_contents_type(file_path: str) -> str:
+    return "MHT" if os.path.splitext(file_path)[1].lower() == ".mht" else "EML"
+
+
+def _create_default_registry() -> ExtractorRegistry:
+    registry = ExtractorRegistry()
+    concurrency = config.EXTRACTOR_CONCURRENCY
+
+    registry.register(FormatExtractor(
+        "text", [], lambda reader, path: reader.get_text_contents_on_pc(file_path=path),
+        max_concurrency=concurrency["text"], memory_class="light", streaming=True))
+    registry.register(FormatExtractor(
+        "pdf", [".pdf"], lambda reader, path: reader.get_pdf_contents(filepath=path, contents_type="PDF"),
+        max_concurrency=concurrency["pdf"], memory_class="heavy", supervised=True))
+    registry.register(FormatExtractor(
+        "office", [".doc", ".docx", ".ppt", ".pptx"],
+        lambda reader, path: reader.get_msoffice_contents(filepath=path, contents_type=_office_contents_type(path)),
+        max_concurrency=concurrency["office"], memory_class="medium", supervised=True))
+    registry.register(FormatExtractor(
+        "excel", [".xls", ".xlsx"], lambda reader, path: reader.get_excel_contents(filepath=path, contents_type="MSEXCEL"),
+        max_concurrency=concurrency["excel"], memory_class="medium", streaming=True, supervised=True))
+    registry.register(FormatExtractor(
+        "email", [".eml", ".mht"], lambda reader, path: reader.get_eml_contents(filepath=path, type=_email_contents_type(path)),
+        max_concurrency=concurrency["email"], memory_class="light", supervised=True))
+    # 수 GB 아카이브도 메시지 단위로 흘려보내므로 이메일 제한 시간을 적용하지 않고 현재 프로세스에서 스트리밍한다
+    registry.register(FormatExtractor(
+        "mbox", [".mbox"], lambda reader, path: reader.get_mbox_contents(filepath=path),
+        max_concurrency=concurrency["mbox"], memory_class="light", streaming=True))
+    # OCR은 현재 프로세스의 easyocr reader를 공유하므로 감독 워커 대신 동시 실행 수로만 제한한다
+    registry.register(FormatExtractor(
+        "image", [".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp"], lambda reader, path: reader.get_image_contents(filepath=path),
+        max_concurrency=concurrency["image"], memory_class="heavy"))
+    return registry
+
+
+extractor_registry = _create_default_registry()
@@ -4,8 +4,11 @@ import json
 from typing import List
 import numpy as np
 import unicodedata
-import chardet
+from encoding_detector import encoding_detector
 import pickle
+import random
+import uuid
+from typing import Callable, Dict, Optional
 
 import faiss
 from langchain.docstore.document import Document
@@ -16,9 +19,21 @@ from langchain.embeddings.base import Embeddings
 
 #from search_util import extract_keywords
 from logger_util import get_logger
+import config
+from near_duplicate import NearDuplicateIndex
+from chunk_compression import ChunkTextCodec
+from embedding_store import RawEmbeddingStore
 
 logger = get_logger()
 
+# 압축된 청크 본문을 담는 metadata 키 (page_content는 비워 둔다)
+COMPRESSED_TEXT_KEY = "text_zstd"
+TEXT_BYTES_KEY = "text_bytes"
+# 인덱스 압축(compact)/재구성 시 한 번에 옮기는 벡터 수
+COMPACTION_BATCH_SIZE = 10000
+# 학습이 필요한 인덱스(IVF, PQ 등)를 재구성할 때 학습에 사용하는 최대 벡터 수
+INDEX_TRAIN_SAMPLE_SIZE = 100000
+
 class FAISS_VECTOR_STORE:
     """
     FAISS_VECTOR_STORE는 langchain_community의 FAISS 벡터스토어를 감싸는 클래스입니다.
@@ -28,6 +43,10 @@ class FAISS_VECTOR_STORE:
       - 전체 문서 삭제
       - 유사도 검색
       - 인덱스 저장/로딩
+      - 근사 중복 청크 억제 (metadata의 simhash 서명이 같은 청크는 한 번만 저장하고 duplicate_sources에 출처를 기록)
+      - 청크 본문 압축 (저장소별 학습 사전으로 zstd 압축, 검색 결과와 문서 청크 조회 시에만 해제)
+      - 논리 삭제 (삭제한 청크는 docstore에서만 빼고 tombstones에 기록, 벡터는 compact 때 한꺼번에 제거)
+      - 원본 임베딩 보관 (임베딩 모델이 만든 벡터를 별도 파일에 보관하여, 인덱스 종류를 바꿀 때 다시 임베딩하지 않음)
     """
 
     def __init__(self, embedding: HuggingFaceEmbeddings, store_path, dimension=1536):
@@ -38,6 +57,14 @@ class FAISS_VECTOR_STORE:
         self.embedding = embedding
         self.dimension = dimension
         self.vectorstore = None
+        self.near_duplicates = NearDuplicateIndex(config.NEAR_DUPLICATE_THRESHOLD)
+        self.text_codec = ChunkTextCodec(store_path)
+        # 청크 본문 원문 크기와 실제 보관 크기(압축된 청크는 압축 크기) 합계 (UTF-8 바이트)
+        self._text_raw_bytes = 0
+        self._text_stored_bytes = 0
+        # 논리 삭제된 청크 id (인덱스에는 벡터가 남아 있고 검색 시 건너뜀)
+        self.tombstones = set()
+        self.raw_embeddings = RawEmbeddingStore(store_path)
         self.load_vectorstore(store_path)
 
 
@@ -52,6 +79,7 @@ class FAISS_VECTOR_STORE:
         index_file = os.path.join(store_path, "index.faiss")
         if os.path.exists(index_file):
             index = faiss.read_index(index_file)
+            self._configure_search_params(index)
         else:
             index = faiss.IndexFlatL2(self.dimension)
         
@@ -62,10 +90,12 @@ class FAISS_VECTOR_STORE:
                 store_file_data = pickle.load(f)
                 store_data = store_file_data["docstore"]
                 index_to_docstore_id = store_file_data["index_to_docstore_id"]
+                tombstones = set(store_file_data.get("tombstones", ()))
         else:
             logger.debug("[DEBUG] Creating new Vector Store")
             store_data = InMemoryDocstore()
             index_to_docstore_id = {}
+            tombstones = set()
             
         self.vectorstore = FAISS(
             embedding_function=self.embedding, 
@@ -73,14 +103,175 @@ class FAISS_VECTOR_STORE:
             docstore=store_data, 
             index_to_docstore_id=index_to_docstore_id
         )
+        self.tombstones = tombstones
+        self._rebuild_near_duplicates()
+        self._recount_text_sizes()
+        self._backfill_raw_embeddings()
+
+    def _backfill_raw_embeddings(self):
+        """
+        원본 벡터가 없는 청크는 (Flat 인덱스의 벡터는 원본과 같으므로) 인덱스에서 복원해 둔다.
+        원본 벡터 파일이 없던 저장소, 보관을 끈 동안 추가된 청크, 인덱스 추가 후 보관에 실패한 청크가 대상이다.
+        """
+        vectorstore = self.vectorstore
+        index = vectorstore.index
+        if not config.RAW_EMBEDDINGS_ENABLED or index.ntotal == 0:
+            return
+        docstore = vectorstore.docstore._dict
+        missing = [position for position, doc_id in vectorstore.index_to_docstore_id.items()
+                   if doc_id in docstore and doc_id not in self.raw_embeddings]
+        if not missing:
+            return
+        if not isinstance(index, faiss.IndexFlat):
+            logger.warning(f"[FAISS_VECTOR_STORE] {len(missing)} chunks have no raw embedding and the index is not flat, skipping backfill")
+            return
+        missing = np.array(sorted(missing))
+        for start in range(0, index.ntotal, COMPACTION_BATCH_SIZE):
+            end = min(index.ntotal, start + COMPACTION_BATCH_SIZE)
+            positions = missing[(missing >= start) & (missing < end)]
+            if len(positions) == 0:
+                continue
+            doc_ids = [vectorstore.index_to_docstore_id[int(position)] for position in positions]
+            self.raw_embeddings.append(doc_ids, index.reconstruct_n(start, end - start)[positions - start])
+        logger.info(f"[FAISS_VECTOR_STORE] Backfilled {len(missing)} raw embeddings from the index")
+
+    @staticmethod
+    def _configure_search_params(index):
+        """IVF 계열 인덱스는 기본 nprobe(1)로는 재현율이 매우 낮으므로 INDEX_IVF_NPROBE개의 클러스터를 찾도록 설정한다."""
+        try:
+            ivf = faiss.extract_index_ivf(index)
+        except Exception:
+            return  # IVF가 아닌 인덱스
+        ivf.nprobe = min(ivf.nlist, config.INDEX_IVF_NPROBE)
+
+    def _rebuild_near_duplicates(self):
+        self.near_duplicates = NearDuplicateIndex(config.NEAR_DUPLICATE_THRESHOLD)
+        for doc_id, doc in self.vectorstore.docstore._dict.items():
+            signature = doc.metadata.get("simhash")
+            if signature is not None:
+                self.near_duplicates.add(signature, doc_id)
     
     def add_document(self, doc: Document):
         """문서 1건을 인덱싱합니다."""
-        self.vectorstore.add_documents([doc])
+        self.add_documents([doc])
+
+    def add_documents(self, docs: List[Document]) -> List[str]:
+        """
+        문서 여러 건(리스트)을 인덱싱합니다.
+        metadata에 simhash 서명이 있고 이미 저장된 청크와 근사 중복이면 임베딩/저장하지 않고,
+        저장된 청크의 duplicate_sources에 출처(source)만 추가합니다.
+
+        :return: 실제로 저장된 문서의 id 리스트
+        """
+        new_docs, new_ids = [], []
+        pending = {}
+        for doc in docs:
+            signature = doc.metadata.get("simhash")
+            if signature is not None:
+                duplicate_id = self.near_duplicates.find(signature)
+                if duplicate_id is not None:
+                    original = pending.get(duplicate_id) or self.vectorstore.docstore._dict.get(duplicate_id)
+                    if original is not None:
+                        self._add_duplicate_source(original, doc)
+                        continue
+
+            doc_id = str(uuid.uuid4())
+            if signature is not None:
+                self.near_duplicates.add(signature, doc_id)
+                pending[doc_id] = doc
+            new_docs.append(doc)
+            new_ids.append(doc_id)
+
+        if new_docs:
+            # 원본 벡터를 보관하기 위해 임베딩을 직접 계산한 뒤 인덱스에 추가한다
+            texts = [doc.page_content for doc in new_docs]
+            try:
+                vectors = self.embedding.embed_documents(texts)
+                self.vectorstore.add_embeddings(list(zip(texts, vectors)),
+                                                metadatas=[doc.metadata for doc in new_docs], ids=new_ids)
+            except Exception:
+                for doc_id in pending:
+                    self.near_duplicates.remove(doc_id)
+                raise
+            if config.RAW_EMBEDDINGS_ENABLED:
+                self.raw_embeddings.append(new_ids, vectors)
+            self._store_texts(new_ids)
+        return new_ids
+
+    def _store_texts(self, doc_ids: List[str]):
+        """새로 추가된 청크의 본문을 압축한다. 사전이 아직 없고 청크가 충분히 모였으면 사전을 학습하고 기존 청크도 압축한다."""
+        docstore = self.vectorstore.docstore._dict
+        for doc_id in doc_ids:
+            size = len(docstore[doc_id].page_content.encode("utf-8"))
+            self._text_raw_bytes += size
+            self._text_stored_bytes += size
+
+        if self.text_codec.should_train(len(docstore)):
+            if self.text_codec.train(doc.page_content for doc in docstore.values()
+                                     if COMPRESSED_TEXT_KEY not in doc.metadata):
+                doc_ids = list(docstore.keys())
+        if not self.text_codec.ready:
+            return
 
-    def add_documents(self, docs: List[Document]):
-        """문서 여러 건(리스트)을 인덱싱합니다."""
-        self.vectorstore.add_documents(docs)
+        for doc_id in doc_ids:
+            doc = docstore[doc_id]
+            if COMPRESSED_TEXT_KEY in doc.metadata or not doc.page_content:
+                continue
+            raw = doc.page_content.encode("utf-8")
+            compressed = self.text_codec.compress(doc.page_content)
+            doc.metadata[COMPRESSED_TEXT_KEY] = compressed
+            doc.metadata[TEXT_BYTES_KEY] = len(raw)
+            doc.page_content = ""
+            self._text_stored_bytes += len(compressed) - len(raw)
+
+    def _recount_text_sizes(self):
+        self._text_raw_bytes = 0
+        self._text_stored_bytes = 0
+        for doc in self.vectorstore.docstore._dict.values():
+            raw_size, stored_size = self._text_sizes(doc)
+            self._text_raw_bytes += raw_size
+            self._text_stored_bytes += stored_size
+
+    @staticmethod
+    def _text_sizes(doc: Document):
+        if COMPRESSED_TEXT_KEY in doc.metadata:
+            return doc.metadata[TEXT_BYTES_KEY], len(doc.metadata[COMPRESSED_TEXT_KEY])
+        size = len(doc.page_content.encode("utf-8"))
+        return size, size
+
+    def _chunk_text(self, doc: Document) -> str:
+        """청크 본문. 압축된 청크는 여기서 해제한다."""
+        if COMPRESSED_TEXT_KEY in doc.metadata:
+            return self.text_codec.decompress(doc.metadata[COMPRESSED_TEXT_KEY])
+        return self._decode_text(doc.page_content)
+
+    def get_text_compression_stats(self) -> dict:
+        ratio = self._text_raw_bytes / self._text_stored_bytes if self._text_stored_bytes else 1.0
+        return {
+            "enabled": self.text_codec.enabled,
+            "dictionary_size": self.text_codec.dictionary_size(),
+            "raw_text_bytes": self._text_raw_bytes,
+            "stored_text_bytes": self._text_stored_bytes,
+            "compression_ratio": round(ratio, 2)
+        }
+
+    @staticmethod
+    def _add_duplicate_source(doc: Document, duplicate: Document):
+        """근사 중복 청크(duplicate)의 출처를 doc에 추가한다. 나중에 이어받을 수 있도록 출처별 머리말도 남긴다."""
+        headers = dict(duplicate.metadata.get("duplicate_headers") or {})
+        source = duplicate.metadata.get("source")
+        header_chars = duplicate.metadata.get("header_chars")
+        if source and header_chars is not None and COMPRESSED_TEXT_KEY not in duplicate.metadata:
+            headers[source] = duplicate.page_content[:header_chars]
+
+        for duplicate_source in [source] + list(duplicate.metadata.get("duplicate_sources") or []):
+            if not duplicate_source or duplicate_source == doc.metadata.get("source"):
+                continue
+            sources = doc.metadata.setdefault("duplicate_sources", [])
+            if duplicate_source not in sources:
+                sources.append(duplicate_source)
+            if duplicate_source in headers:
+                doc.metadata.setdefault("duplicate_headers", {})[duplicate_source] = headers[duplicate_source]
 
     def get_document_chunks(self, file_path: str) -> List[str]:
         """
@@ -91,8 +282,8 @@ class FAISS_VECTOR_STORE:
         """
         chunks = []
         for doc in self.vectorstore.docstore._dict.values():
-            if doc.metadata.get("source") == file_path:
-                chunks.append(self._decode_text(doc.page_content))
+            if doc.metadata.get("source") == file_path or file_path in doc.metadata.get("duplicate_sources", ()):
+                chunks.append(self._chunk_text(doc))
         return chunks
 
     def delete_all(self):
@@ -100,25 +291,232 @@ class FAISS_VECTOR_STORE:
         new_index = faiss.IndexFlatL2(self.dimension)
         new_docstore = InMemoryDocstore()
         self.vectorstore = FAISS(self.embedding, new_index, new_docstore, {})
+        self.near_duplicates = NearDuplicateIndex(config.NEAR_DUPLICATE_THRESHOLD)
+        self._text_raw_bytes = 0
+        self._text_stored_bytes = 0
+        self.tombstones = set()
+        self.raw_embeddings.clear()
     
-    def delete_files(self, file_paths):
+    def delete_files(self, file_paths) -> Dict[str, int]:
         """
         지정된 파일 경로에 해당하는 모든 문서를 벡터스토어에서 삭제합니다.
+        근사 중복으로 같은 청크를 참조하는 다른 파일이 남아 있으면 첫 번째 파일이 청크를 이어받습니다.
         
         :param file_paths: 삭제할 파일 경로 리스트
+        :return: 청크를 이어받은 파일 경로 -> 이어받은 청크 수
         """
         # 삭제할 문서 ID 리스트
         ids_to_delete = []
+        file_paths = set(file_paths)
+        promoted_docs = []
+        promoted = {}
         
         # 각 문서의 메타데이터를 확인하여 삭제할 문서 ID 수집
         for doc_id, doc in self.vectorstore.docstore._dict.items():
-            if doc.metadata.get('source') in file_paths:
+            duplicate_sources = doc.metadata.get("duplicate_sources")
+            if duplicate_sources:
+                doc.metadata["duplicate_sources"] = [source for source in duplicate_sources if source not in file_paths]
+                headers = doc.metadata.get("duplicate_headers")
+                if headers:
+                    doc.metadata["duplicate_headers"] = {source: header for source, header in headers.items()
+                                                         if source not in file_paths}
+            if doc.metadata.get('source') not in file_paths:
+                continue
+            if not doc.metadata.get("duplicate_sources"):
                 ids_to_delete.append(doc_id)
+                continue
+
+            # 같은 내용을 참조하는 다른 파일이 남아 있으면 그 파일을 대표 출처로 바꾸고 청크는 유지
+            new_source = doc.metadata["duplicate_sources"].pop(0)
+            header = (doc.metadata.get("duplicate_headers") or {}).pop(new_source, None)
+            if header is None or doc.metadata.get("header_chars") is None:
+                # 머리말 정보가 없는 예전 청크는 출처만 바꾼다
+                doc.metadata["source"] = new_source
+                promoted[new_source] = promoted.get(new_source, 0) + 1
+                continue
+
+            # 본문과 벡터에 삭제된 파일의 머리말이 남지 않도록 새 출처의 머리말로 바꿔 다시 임베딩한다
+            # (인덱스는 위치 기반이므로 기존 청크는 삭제하고 새 id로 추가)
+            body = self._chunk_text(doc)[doc.metadata["header_chars"]:]
+            metadata = {key: value for key, value in doc.metadata.items()
+                        if key not in (COMPRESSED_TEXT_KEY, TEXT_BYTES_KEY)}
+            metadata.update(source=new_source, header_chars=len(header))
+            promoted_docs.append(Document(page_content=header + body, metadata=metadata))
+            ids_to_delete.append(doc_id)
         
-        # 수집된 ID에 해당하는 문서들을 벡터스토어에서 삭제
-        if ids_to_delete:
-            self.vectorstore.delete(ids_to_delete)
+        self.delete_ids(ids_to_delete)
+        if promoted_docs:
+            docstore = self.vectorstore.docstore._dict
+            # 다른 청크와 근사 중복으로 합쳐진 청크는 여전히 중복 참조로 남는다
+            for doc_id in self.add_documents(promoted_docs):
+                source = docstore[doc_id].metadata.get("source")
+                promoted[source] = promoted.get(source, 0) + 1
+        return promoted
+
+    def delete_ids(self, doc_ids: List[str]):
+        """
+        지정된 id의 문서(청크)를 논리 삭제합니다. 이미 삭제된 id는 무시합니다.
+        (FAISS.delete는 호출마다 인덱스 전체를 옮기고 index_to_docstore_id를 다시 만들므로, 벡터 제거는 compact에서 한꺼번에 한다)
+        """
+        docstore = self.vectorstore.docstore._dict
+        ids_to_delete = [doc_id for doc_id in doc_ids if doc_id in docstore]
+        if not ids_to_delete:
+            return
+        for doc_id in ids_to_delete:
+            raw_size, stored_size = self._text_sizes(docstore[doc_id])
+            self._text_raw_bytes -= raw_size
+            self._text_stored_bytes -= stored_size
+        # 검색 스레드가 docstore에 없는 id를 tombstone 없이 보지 않도록 tombstone을 먼저 기록한다
+        self.tombstones.update(ids_to_delete)
+        self.vectorstore.docstore.delete(ids_to_delete)
+        for doc_id in ids_to_delete:
+            self.near_duplicates.remove(doc_id)
+
+    def get_tombstone_ratio(self) -> float:
+        """인덱스 벡터 중 논리 삭제된 벡터의 비율"""
+        total = self.vectorstore.index.ntotal
+        return len(self.tombstones) / total if total else 0.0
+
+    def compact(self, progress_callback: Optional[Callable[[int, int], None]] = None) -> int:
+        """
+        논리 삭제된 벡터를 뺀 새 인덱스를 만들어 교체합니다.
+        호출자는 쓰기 락을 잡고 호출해야 하며, 검색은 교체 전까지 기존 인덱스를 그대로 사용합니다.
+
+        :param progress_callback: (처리한 벡터 수, 전체 벡터 수)를 받는 함수
+        :return: 제거한 벡터 수
+        """
+        vectorstore = self.vectorstore
+        if not self.tombstones:
+            return 0
+
+        old_index = vectorstore.index
+        total = old_index.ntotal
+        new_index = faiss.clone_index(old_index)
+        new_index.reset()
+        new_mapping = {}
+        for start in range(0, total, COMPACTION_BATCH_SIZE):
+            end = min(total, start + COMPACTION_BATCH_SIZE)
+            live = [position for position in range(start, end)
+                    if vectorstore.index_to_docstore_id[position] not in self.tombstones]
+            if live:
+                doc_ids = [vectorstore.index_to_docstore_id[position] for position in live]
+                # 원본 벡터가 있으면 그것을 사용 (양자화 인덱스에서 복원한 벡터는 원본과 다르다)
+                if all(doc_id in self.raw_embeddings for doc_id in doc_ids):
+                    vectors = self.raw_embeddings.get(doc_ids)
+                else:
+                    vectors = old_index.reconstruct_n(start, end - start)[np.array(live) - start]
+                for doc_id in doc_ids:
+                    new_mapping[len(new_mapping)] = doc_id
+                new_index.add(vectors)
+            if progress_callback:
+                progress_callback(end, total)
+
+        self._swap_index(vectorstore, new_index, new_mapping)
+        return total - new_index.ntotal
+
+    def rebuild_index(self, index_factory: str = "Flat", progress_callback: Optional[Callable[[int, int], None]] = None) -> int:
+        """
+        보관된 원본 벡터로 지정한 종류의 인덱스를 새로 만들어 교체합니다. (다시 임베딩하지 않음)
+        논리 삭제된 청크는 함께 빠지며, 호출자는 쓰기 락을 잡고 호출해야 합니다.
+
+        :param index_factory: faiss.index_factory 문자열 (예: "Flat", "HNSW32", "IVF1024,PQ64")
+        :param progress_callback: (처리한 벡터 수, 전체 벡터 수)를 받는 함수
+        :return: 새 인덱스의 벡터 수
+        """
+        # 원본 벡터가 빠진 청크가 있으면 (Flat 인덱스인 경우) 먼저 인덱스에서 복원한다
+        self._backfill_raw_embeddings()
+        vectorstore = self.vectorstore
+        live_ids = self.live_doc_ids()
+        missing = sum(1 for doc_id in live_ids if doc_id not in self.raw_embeddings)
+        if missing:
+            raise ValueError(f"{missing} chunks have no stored raw embedding, the index cannot be rebuilt without re-embedding")
+
+        new_index = faiss.index_factory(self.raw_embeddings.dimension or vectorstore.index.d, index_factory)
+        if not new_index.is_trained:
+            sample = live_ids if len(live_ids) <= INDEX_TRAIN_SAMPLE_SIZE \
+                else random.Random(0).sample(live_ids, INDEX_TRAIN_SAMPLE_SIZE)
+            new_index.train(self.raw_embeddings.get(sample))
+
+        new_mapping = {}
+        for start in range(0, len(live_ids), COMPACTION_BATCH_SIZE):
+            doc_ids = live_ids[start:start + COMPACTION_BATCH_SIZE]
+            new_index.add(self.raw_embeddings.get(doc_ids))
+            for doc_id in doc_ids:
+                new_mapping[len(new_mapping)] = doc_id
+            if progress_callback:
+                progress_callback(start + len(doc_ids), len(live_ids))
+
+        self._configure_search_params(new_index)
+        self._swap_index(vectorstore, new_index, new_mapping)
+        return new_index.ntotal
+
+    def live_doc_ids(self) -> List[str]:
+        """인덱스 순서대로 논리 삭제되지 않은 청크 id. 호출자는 쓰기 락을 잡고 호출해야 합니다."""
+        vectorstore = self.vectorstore
+        return [doc_id for _, doc_id in sorted(vectorstore.index_to_docstore_id.items())
+                if doc_id in vectorstore.docstore._dict]
+
+    def get_chunk_texts(self, doc_ids: List[str]):
+        """doc_ids 중 삭제되지 않은 청크의 (id 리스트, 본문 리스트). 임베딩 모델을 바꿀 때 다시 임베딩할 본문입니다."""
+        docstore = self.vectorstore.docstore._dict
+        found_ids, texts = [], []
+        for doc_id in doc_ids:
+            doc = docstore.get(doc_id)
+            if doc is not None:
+                found_ids.append(doc_id)
+                texts.append(self._chunk_text(doc))
+        return found_ids, texts
+
+    def adopt_documents(self, docstore: InMemoryDocstore, doc_ids: List[str], index_factory: str = "Flat",
+                        progress_callback: Optional[Callable[[int, int], None]] = None) -> int:
+        """
+        다른 벡터스토어의 docstore를 그대로 가져와, 이 저장소에 보관된 원본 벡터(새 임베딩 모델로 계산한 벡터)로 인덱스를 만듭니다.
+        doc_ids의 청크는 모두 원본 벡터가 있어야 하며, 청크 본문 압축 사전은 미리 이 저장소 폴더에 복사되어 있어야 합니다.
+
+        :return: 새 인덱스의 벡터 수
+        """
+        self.vectorstore = FAISS(
+            embedding_function=self.embedding,
+            index=faiss.IndexFlatL2(self.dimension),
+            docstore=docstore,
+            index_to_docstore_id=dict(enumerate(doc_ids))
+        )
+        count = self.rebuild_index(index_factory, progress_callback)
+        self._rebuild_near_duplicates()
+        self._recount_text_sizes()
+        return count
+
+    def relocate(self, store_path: str):
+        """저장소 폴더가 옮겨졌을 때 사전/원본 벡터 파일 경로를 바꿉니다."""
+        self.text_codec.store_path = store_path
+        self.raw_embeddings.store_path = store_path
+
+    def _swap_index(self, vectorstore, new_index, new_mapping: dict):
+        # FAISS 객체를 통째로 바꿔 검색 스레드가 새 인덱스와 예전 매핑을 섞어 보지 않게 한다
+        self.vectorstore = FAISS(
+            embedding_function=self.embedding,
+            index=new_index,
+            docstore=vectorstore.docstore,
+            index_to_docstore_id=new_mapping
+        )
+        self.tombstones = set()
+        # 원본 벡터 파일도 인덱스와 같은 순서로 남은 청크만 다시 쓴다
+        if len(self.raw_embeddings) > 0:
+            self.raw_embeddings.rewrite(new_mapping[position] for position in range(len(new_mapping)))
     
+    def rename_source(self, old_path: str, new_path: str):
+        """old_path 출처의 청크를 new_path 출처로 바꿉니다. (같은 내용의 대표 파일이 바뀔 때 사용)"""
+        for doc in self.vectorstore.docstore._dict.values():
+            if doc.metadata.get("source") == old_path:
+                doc.metadata["source"] = new_path
+            duplicate_sources = doc.metadata.get("duplicate_sources")
+            if duplicate_sources and old_path in duplicate_sources:
+                doc.metadata["duplicate_sources"] = [new_path if source == old_path else source
+                                                     for source in duplicate_sources]
+            headers = doc.metadata.get("duplicate_headers")
+            if headers and old_path in headers:
+                headers[new_path] = headers.pop(old_path)
+
     def search(self, query: str, filter: dict = None, k: int = 4):
         """
         유사도 검색을 수행합니다.
@@ -137,8 +535,8 @@ class FAISS_VECTOR_STORE:
                 }
             }
         """
-        # 기존 유사도 검색 결과를 가져옴
-        results = self.vectorstore.similarity_search_with_score(query, filter=filter, k=k)
+        # 기존 유사도 검색 결과를 가져옴 (논리 삭제된 청크는 건너뜀)
+        results = self._similarity_search_with_score(query, filter=filter, k=k)
         
         # 결과를 반환할 리스트
         enhanced_results = []
@@ -152,9 +550,10 @@ class FAISS_VECTOR_STORE:
             processed_metadata = {
                 key: value.decode('utf-8') if isinstance(value, bytes) else value
                 for key, value in doc.metadata.items()
+                if key not in (COMPRESSED_TEXT_KEY, TEXT_BYTES_KEY, "duplicate_headers")
             }
             enhanced_doc = {
-                "content": self._decode_text(doc.page_content),
+                "content": self._chunk_text(doc),
                 "score": float(similarity),
                 "keywords": [],
                 "file_path": processed_metadata.get("source", ""),
@@ -164,25 +563,50 @@ class FAISS_VECTOR_STORE:
         
         return enhanced_results
 
+    def _similarity_search_with_score(self, query: str, filter: dict = None, k: int = 4):
+        # 검색 중 compact로 교체되어도 같은 인덱스/매핑을 사용
+        # (tombstone 유무와 관계없이 docstore에 없는 id를 건너뛰는 방식으로 검색한다. 교체 직후 tombstones가 비워진 뒤에도
+        #  이전 인덱스에는 삭제된 벡터가 남아 있어 langchain 검색은 없는 id에서 예외를 낸다)
+        vectorstore = self.vectorstore
+        total = vectorstore.index.ntotal
+        # 빈 인덱스(모든 파일 삭제 후 압축 등)에서 index.search(k=0)를 호출하면 FAISS가 예외를 낸다
+        if total == 0 or k <= 0:
+            return []
+        embedding = np.array([vectorstore.embedding_function.embed_query(query)], dtype=np.float32)
+        # 가까운 벡터가 논리 삭제된 것일 수 있으므로 k개가 모일 때까지 후보를 늘려 가며 찾는다
+        fetch_k = min(total, k * 2 + 10) if filter is None else total
+        while True:
+            distances, positions = vectorstore.index.search(embedding, fetch_k)
+            results = []
+            for distance, position in zip(distances[0], positions[0]):
+                if position == -1:
+                    continue
+                doc = vectorstore.docstore._dict.get(vectorstore.index_to_docstore_id.get(int(position)))
+                if doc is None or not self._matches_filter(doc, filter):
+                    continue
+                results.append((doc, float(distance)))
+                if len(results) >= k:
+                    return results
+            if fetch_k >= total:
+                return results
+            fetch_k = min(total, fetch_k * 4)
+
+    @staticmethod
+    def _matches_filter(doc: Document, filter) -> bool:
+        if filter is None:
+            return True
+        if callable(filter):
+            return filter(doc.metadata)
+        return all(doc.metadata.get(key) == value for key, value in filter.items())
+
     def _decode_text(self, text):
         if isinstance(text, str):
             return text
 
-        encodings = ['utf-8', 'iso-8859-1', 'euc-kr', 'cp949']
-        
-        for encoding in encodings:
-            try:
-                decoded = text.decode(encoding)
-                return unicodedata.normalize('NFC', decoded)
-            except UnicodeDecodeError:
-                continue
-
-        # If all known encodings fail, use chardet to detect encoding
-        detected = chardet.detect(text)
         try:
-            decoded = text.decode(detected['encoding'])
+            decoded = text.decode(encoding_detector.detect_bytes(text), errors='replace')
             return unicodedata.normalize('NFC', decoded)
-        except:
+        except Exception:
             # If all else fails, return the original text
             return text
 
@@ -199,12 +623,14 @@ class FAISS_VECTOR_STORE:
             os.makedirs(save_path, exist_ok=True)
             
             # FAISS 인덱스 저장
-            faiss.write_index(self.vectorstore.index, os.path.join(save_path, "index.faiss"))
+            vectorstore = self.vectorstore
+            faiss.write_index(vectorstore.index, os.path.join(save_path, "index.faiss"))
             
             # 나머지 데이터 저장
             store_data = {
-                "docstore": self.vectorstore.docstore,
-                "index_to_docstore_id": self.vectorstore.index_to_docstore_id
+                "docstore": vectorstore.docstore,
+                "index_to_docstore_id": vectorstore.index_to_docstore_id,
+                "tombstones": list(self.tombstones)
             }
             
             with open(os.path.join(save_path, "store.pkl"), "wb") as f:
@@ -228,7 +654,11 @@ class FAISS_VECTOR_STORE:
     
     # 벡터 스토어에 저장된 unique한 file_path 목록 반환
     def get_unique_file_paths(self) -> List[str]:
-        return list(set([doc.metadata.get("source", "") for doc in self.vectorstore.docstore._dict.values()]))
+        file_paths = set()
+        for doc in self.vectorstore.docstore._dict.values():
+            file_paths.add(doc.metadata.get("source", ""))
+            file_paths.update(doc.metadata.get("duplicate_sources", ()))
+        return list(file_paths)
 
 
 
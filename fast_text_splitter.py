@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+# 빠른 재귀 문자 분할기
+# langchain RecursiveCharacterTextSplitter(keep_separator=True, strip_whitespace=True 기본 설정)와 같은 결과를 내지만,
+# 분할 조각을 부분 문자열 대신 원문 안의 (시작, 끝) 위치로 다루어 정규식 분할과 문자열 결합을 하지 않는다.
+# 구분자는 생성 시 한 번만 준비하고, 청크는 원문 위치(start, end)를 가진 TextChunk로 돌려준다.
+
+from collections import deque
+from typing import Callable, List, Optional, Tuple
+
+from langchain.docstore.document import Document
+
+DEFAULT_SEPARATORS = ["\n\n", "\n", " ", ""]
+
+
+class TextChunk:
+    """분할된 청크. start/end는 원문에서의 위치이다 (text == 원문[start:end])."""
+    __slots__ = ("text", "start", "end")
+
+    def __init__(self, text: str, start: int, end: int):
+        self.text = text
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return f"TextChunk({self.text!r}, {self.start}, {self.end})"
+
+
+class FastTextSplitter:
+    def __init__(self, chunk_size: int = 4000, chunk_overlap: int = 200, separators: Optional[List[str]] = None,
+                 length_function: Callable[[str], int] = len):
+        if chunk_overlap > chunk_size:
+            raise ValueError(f"Got a larger chunk overlap ({chunk_overlap}) than chunk size ({chunk_size}), should be smaller.")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = tuple(separators or DEFAULT_SEPARATORS)
+        self.length_function = length_function
+        # 글자 수 기준이면 부분 문자열을 만들지 않고 위치 차이로 길이를 계산한다
+        self._char_length = length_function is len
+        # 구분자를 조각 앞에 붙여 두므로 병합 시 사이에 넣는 구분자는 빈 문자열이다
+        self._join_length = length_function("")
+
+    def split_text(self, text: str) -> List[str]:
+        return [chunk.text for chunk in self.split_chunks(text)]
+
+    def split_chunks(self, text: str) -> List[TextChunk]:
+        chunks = []
+        self._split(text, 0, len(text), 0, chunks)
+        return chunks
+
+    def split_documents(self, documents: List[Document]) -> List[Document]:
+        return [Document(page_content=chunk.text, metadata=dict(doc.metadata))
+                for doc in documents for chunk in self.split_chunks(doc.page_content)]
+
+    def _length(self, text: str, start: int, end: int) -> int:
+        return end - start if self._char_length else self.length_function(text[start:end])
+
+    def _split(self, text: str, start: int, end: int, separator_index: int, chunks: List[TextChunk]):
+        separators = self.separators
+        separator = separators[-1]
+        next_index = len(separators)
+        for i in range(separator_index, len(separators)):
+            candidate = separators[i]
+            if candidate == "":
+                separator = candidate
+                break
+            if text.find(candidate, start, end) != -1:
+                separator = candidate
+                next_index = i + 1
+                break
+
+        if not separator and self._char_length and 1 < self.chunk_size and self.chunk_overlap < self.chunk_size:
+            self._merge_characters(text, start, end, chunks)
+            return
+
+        good_splits = []
+        for split_start, split_end in self._split_ranges(text, start, end, separator):
+            length = self._length(text, split_start, split_end)
+            if length < self.chunk_size:
+                good_splits.append((split_start, split_end, length))
+                continue
+
+            if good_splits:
+                self._merge(text, good_splits, chunks)
+                good_splits = []
+            if next_index >= len(separators):
+                chunks.append(TextChunk(text[split_start:split_end], split_start, split_end))
+            else:
+                self._split(text, split_start, split_end, next_index, chunks)
+
+        if good_splits:
+            self._merge(text, good_splits, chunks)
+
+    @staticmethod
+    def _split_ranges(text: str, start: int, end: int, separator: str) -> List[Tuple[int, int]]:
+        """구분자 위치에서 나눈 조각 범위. 구분자는 뒤 조각의 앞에 붙고, 빈 조각은 버린다."""
+        if not separator:
+            return [(i, i + 1) for i in range(start, end)]
+
+        ranges = []
+        separator_len = len(separator)
+        piece_start = start
+        position = text.find(separator, start, end)
+        while position != -1:
+            if position > piece_start:
+                ranges.append((piece_start, position))
+            piece_start = position
+            position = text.find(separator, position + separator_len, end)
+        if end > piece_start:
+            ranges.append((piece_start, end))
+        return ranges
+
+    def _merge(self, text: str, splits: List[Tuple[int, int, int]], chunks: List[TextChunk]):
+        join_length = self._join_length
+        current = deque()
+        total = 0
+        for split in splits:
+            length = split[2]
+            if total + length + (join_length if current else 0) > self.chunk_size:
+                if current:
+                    self._emit(text, current[0][0], current[-1][1], chunks)
+                    while total > self.chunk_overlap or (
+                            total + length + (join_length if current else 0) > self.chunk_size and total > 0):
+                        total -= current[0][2] + (join_length if len(current) > 1 else 0)
+                        current.popleft()
+            current.append(split)
+            total += length + (join_length if len(current) > 1 else 0)
+        if current:
+            self._emit(text, current[0][0], current[-1][1], chunks)
+
+    def _merge_characters(self, text: str, start: int, end: int, chunks: List[TextChunk]):
+        """글자 단위 조각을 병합한 결과와 같다: chunk_size 길이 창을 (chunk_size - chunk_overlap) 간격으로 이동한다."""
+        step = self.chunk_size - self.chunk_overlap
+        window_start = start
+        while window_start + self.chunk_size < end:
+            self._emit(text, window_start, window_start + self.chunk_size, chunks)
+            window_start += step
+        self._emit(text, window_start, end, chunks)
+
+    @staticmethod
+    def _emit(text: str, start: int, end: int, chunks: List[TextChunk]):
+        # 병합된 조각은 원문에서 연속된 범위이므로 앞뒤 공백만 제외한 위치를 계산한다
+        raw = text[start:end]
+        stripped = raw.strip()
+        if not stripped:
+            return
+        chunk_start = start + len(raw) - len(raw.lstrip())
+        chunks.append(TextChunk(stripped, chunk_start, chunk_start + len(stripped)))
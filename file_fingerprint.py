@@ -0,0 +1,37 @@
+import hashlib
+import os
+from typing import Dict, Optional
+
+# 해시 계산 시 한 번에 읽는 크기
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def compute_content_hash(file_path: str, length: Optional[int] = None) -> str:
+    """파일 내용의 BLAKE2b(128bit) 해시를 계산한다.
+
+    length가 주어지면 파일 앞부분 length 바이트만 해시한다. (이어쓰기 감지용)
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    remaining = length
+    with open(file_path, 'rb') as f:
+        while remaining is None or remaining > 0:
+            read_size = HASH_CHUNK_SIZE if remaining is None else min(HASH_CHUNK_SIZE, remaining)
+            block = f.read(read_size)
+            if not block:
+                break
+            hasher.update(block)
+            if remaining is not None:
+                remaining -= len(block)
+    return hasher.hexdigest()
+
+
+def get_file_fingerprint(file_path: str, with_hash: bool = True) -> Dict:
+    """indexed_files에 저장하는 파일 지문(크기, 수정 시각, 내용 해시)을 반환한다."""
+    stat = os.stat(file_path)
+    fingerprint = {
+        "file_size": stat.st_size,
+        "file_mtime": stat.st_mtime,
+    }
+    if with_hash:
+        fingerprint["content_hash"] = compute_content_hash(file_path)
+    return fingerprint
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+# 백그라운드 인덱스 압축
+# 삭제는 논리 삭제(tombstone)로 처리되므로 인덱스에는 삭제된 벡터가 남는다.
+# 주기적으로 로드된 RAG를 확인하여 다음 경우에 삭제된 벡터를 뺀 인덱스로 교체한다.
+#   - 업로드 큐가 비어 있고 INDEX_COMPACTION_IDLE_SECONDS 동안 쓰기가 없었을 때 (삭제된 벡터가 있으면)
+#   - 삭제된 벡터 비율이 INDEX_COMPACTION_TOMBSTONE_RATIO 이상일 때
+#   - 관리자 요청(request)이 있을 때
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import config
+import logger_util
+
+logger = logger_util.get_logger()
+
+
+class IndexCompactor:
+    def __init__(self, get_stores: Callable[[], Dict[str, Any]], is_busy: Callable[[], bool]):
+        """
+        :param get_stores: 로드된 RAG 이름 -> VectorStore를 반환하는 함수
+        :param is_busy: 업로드 처리 중이면 True를 반환하는 함수
+        """
+        self.get_stores = get_stores
+        self.is_busy = is_busy
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._lock = threading.Lock()
+        self._requested = set()
+        # RAG 이름 -> 진행 상태 / 마지막 결과
+        self._progress: Dict[str, Dict[str, Any]] = {}
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="index-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread:
+            self._thread.join(timeout=5.0)
+
+    def request(self, rag_name: Optional[str] = None):
+        """다음 확인 때까지 기다리지 않고 해당 RAG의 인덱스를 압축하도록 요청한다."""
+        with self._lock:
+            self._requested.add(rag_name or "default")
+        self._wake_event.set()
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            progress = {name: dict(state) for name, state in self._progress.items()}
+            requested = sorted(self._requested)
+        stores = {}
+        for name, store in self.get_stores().items():
+            stores[name] = dict(store.get_tombstone_stats(), **progress.get(name, {"state": "idle"}))
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "requested": requested,
+            "stores": stores
+        }
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wake_event.wait(config.INDEX_COMPACTION_CHECK_INTERVAL)
+            self._wake_event.clear()
+            if self._stop_event.is_set():
+                break
+            for name, store in self.get_stores().items():
+                try:
+                    if self._should_compact(name, store):
+                        self._compact(name, store)
+                except Exception as e:
+                    logger.exception(f"[IndexCompactor] Compaction failed for {name}: {e}")
+                    self._set_progress(name, state="failed", error=str(e))
+
+    def _should_compact(self, name: str, store) -> bool:
+        with self._lock:
+            requested = name in self._requested
+            self._requested.discard(name)
+        if store.vector_store is None or not store.vector_store.tombstones:
+            return False
+        if requested:
+            return True
+        if store.vector_store.get_tombstone_ratio() >= config.INDEX_COMPACTION_TOMBSTONE_RATIO:
+            return True
+        idle_seconds = time.time() - store.last_write_time
+        return idle_seconds >= config.INDEX_COMPACTION_IDLE_SECONDS and not self.is_busy()
+
+    def _compact(self, name: str, store):
+        started = time.time()
+        self._set_progress(name, state="running", started_at=int(started), processed=0, total=None)
+        removed = store.compact_index(
+            progress_callback=lambda processed, total: self._set_progress(name, processed=processed, total=total))
+        duration = round(time.time() - started, 2)
+        self._set_progress(name, state="idle", last_finished_at=int(time.time()),
+                           last_removed=removed, last_duration_sec=duration)
+        logger.info(f"[IndexCompactor] {name}: removed {removed} deleted vectors in {duration}s")
+
+    def _set_progress(self, name: str, **values):
+        with self._lock:
+            self._progress.setdefault(name, {}).update(values)
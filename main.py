@@ -5,13 +5,14 @@ import os
 import logging
 import threading
 import queue
+import multiprocessing
 from typing import List, Dict, Any
 
 from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Body, Depends, WebSocket, WebSocketDisconnect
 from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 
-from upload_queue_manager import UploadQueueManager
+from upload_queue_manager import UploadQueueManager, PRIORITY_INTERACTIVE, PRIORITY_BULK
 
 import config
 import logger_util
@@ -19,13 +20,22 @@ import logger_util
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
 from document_reader import DocumentReader
+import ocr_util
+from extraction_cache import extraction_cache
+from extraction_worker import ExtractionError
+from extractor_registry import extractor_registry
+from index_compactor import IndexCompactor
+from embedding_migration import EmbeddingMigrator
 import platform
 from ip_middleware import IPRestrictionMiddleware
 from rag_manager import rag_manager
 
 
+# 추출용 자식 프로세스(spawn)는 이 모듈을 __mp_main__으로 다시 import하므로, 그때는 서버 초기화(임베딩 모델 로드, 큐 워커 시작)를 하지 않는다
+IS_SERVER_PROCESS = __name__ != "__mp_main__"
+
 # VectorStore 인스턴스는 rag_manager에서 필요 시 가져온다.
-default_vector_store = rag_manager.get_store(None)
+default_vector_store = rag_manager.get_store(None) if IS_SERVER_PROCESS else None
 document_reader = DocumentReader()
 
 logger = logger_util.get_logger()
@@ -37,17 +47,47 @@ app = FastAPI()
 
 pubsub_event_type = "upload_status"
 
-# 업로드 큐 매니저 생성
-upload_queue_manager = UploadQueueManager(max_queue_size=10000)
+# 업로드 큐 매니저 생성 (메모리에는 최대 10,000개, 나머지는 디스크 꼬리에 보관)
+upload_queue_manager = UploadQueueManager(
+    max_queue_size=10000,
+    num_workers=config.UPLOAD_QUEUE_WORKERS,
+    spill_dir=os.path.join(os.path.dirname(os.path.abspath(__file__)), "store", "upload_queue_spill")
+)
 
 def process_file_callback(file_info: Dict[str, Any]) -> Dict[str, Any]:
     """파일 처리 콜백 함수"""
     try:
-        rag_name = None
-        vector_store = rag_manager.get_store(rag_name)
+        vector_store = rag_manager.get_store(file_info.get("rag_name"))
+
+        # 인덱싱된 내용과 같은 파일이면 추출/임베딩을 건너뛴다
+        unchanged, fingerprint = vector_store.check_unchanged(file_info["file_path"])
+        if unchanged:
+            return {
+                "status": "success",
+                "unchanged": True,
+                "message": f"File {file_info['file_name']} is unchanged"
+            }
+
+        # 다른 경로에 같은 내용의 파일이 인덱싱되어 있으면 추출/임베딩 없이 참조로만 등록한다
+        linked = vector_store.link_same_content(file_info["file_path"], file_info["file_name"], fingerprint)
+        if linked:
+            vector_store.save_indexed_files_and_vector_db()
+            return linked
         
-        # 파일 내용 읽기
-        contents = document_reader.get_contents_on_pc(file_info["file_path"])
+        # 로그/회의록처럼 뒤에만 내용이 추가된 파일은 새로 추가된 뒷부분(+겹침 구간)만 읽어 청크를 추가한다
+        append_offset = vector_store.get_append_offset(file_info["file_path"], fingerprint)
+        if append_offset is not None:
+            contents = document_reader.get_text_tail_contents(
+                file_info["file_path"], start=max(0, append_offset - config.APPEND_OVERLAP_BYTES),
+                end=fingerprint["file_size"], max_start=append_offset
+            )
+        else:
+            # 파일 내용 읽기 (지문이 같은 추출 결과가 캐시에 있으면 추출을 건너뛴다)
+            # 형식별 동시 실행 한도 안에서 추출하며, PDF/Office/Excel/이메일은 감독 워커 프로세스에서 추출한다
+            contents = extraction_cache.get_or_extract(
+                file_info["file_path"], fingerprint,
+                lambda: extractor_registry.extract(file_info["file_path"])
+            )
         
         # 새로운 이벤트 루프 생성하여 비동기 처리
         loop = asyncio.new_event_loop()
@@ -57,7 +97,9 @@ def process_file_callback(file_info: Dict[str, Any]) -> Dict[str, Any]:
                 vector_store.upload(
                     file_path=file_info["file_path"],
                     file_name=file_info["file_name"],
-                    contents=contents
+                    contents=contents,
+                    fingerprint=fingerprint,
+                    append=append_offset is not None
                 )
             )
         finally:
@@ -68,6 +110,13 @@ def process_file_callback(file_info: Dict[str, Any]) -> Dict[str, Any]:
         
         return result
         
+    except ExtractionError as e:
+        logger.error(f"파일 추출 실패 ({e.error_type}): {file_info['file_path']} - {e}")
+        return {
+            "status": "failed",
+            "error_type": e.error_type,
+            "message": str(e)
+        }
     except Exception as e:
         logger.exception(f"파일 처리 중 오류 발생: {file_info['file_path']}")
         return {
@@ -77,7 +126,24 @@ def process_file_callback(file_info: Dict[str, Any]) -> Dict[str, Any]:
 
 # 파일 처리 콜백 설정 및 워커 시작
 upload_queue_manager.set_processing_callback(process_file_callback)
-upload_queue_manager.start_worker()
+if IS_SERVER_PROCESS:
+    # 이전 실행의 꼬리 파일 정리는 서버 프로세스에서만 한다 (추출 자식 프로세스의 재import 시 실행 중인 꼬리를 지우지 않도록)
+    upload_queue_manager.discard_stale_spills()
+    upload_queue_manager.start_worker()
+
+# 논리 삭제된 벡터를 유휴 시간(또는 삭제 비율 초과 시)에 인덱스에서 제거하는 백그라운드 압축기
+index_compactor = IndexCompactor(
+    get_stores=rag_manager.get_loaded_stores,
+    is_busy=lambda: upload_queue_manager.get_queue_size() > 0 or bool(upload_queue_manager.get_processing_files())
+)
+if IS_SERVER_PROCESS:
+    index_compactor.start()
+
+# 검색을 멈추지 않고 RAG별로 임베딩 모델을 교체하는 백그라운드 작업 관리자
+embedding_migrator = EmbeddingMigrator(
+    get_stores=rag_manager.get_loaded_stores,
+    is_busy=lambda: upload_queue_manager.get_queue_size() > 0 or bool(upload_queue_manager.get_processing_files())
+)
 
 # IP 제한 미들웨어 추가
 private_devbot_version = config.private_devbot_version
@@ -112,21 +178,37 @@ async def upload_file(
     rag_name: str | None = Form(None)
 ):
     vector_store = rag_manager.get_store(rag_name)
+    result = {"status": "failed", "message": f"Failed to process {file.filename}"}
 
     try:
         logger.debug(f"[DEBUG] Upload request - Path: {file_path}")
 
-        success, file_name = await _process_file(file, file_path, vector_store)
+        # 서버에서 접근 가능한 경로이고 인덱싱된 내용과 같으면 추출/임베딩을 건너뛴다
+        unchanged, fingerprint = vector_store.check_unchanged(file_path)
+        if unchanged:
+            result = {
+                "status": "unchanged",
+                "message": f"{file.filename} is unchanged",
+            }
+        elif vector_store.link_same_content(file_path, file.filename, fingerprint):
+            # 다른 경로에 같은 내용의 파일이 인덱싱되어 있어 참조로만 등록
+            result = {
+                "status": "success",
+                "message": f"Processed {file.filename}",
+            }
+        else:
+            success, file_name = await _process_file(file, file_path, vector_store, fingerprint)
 
-        result = {
-            "status": "success" if success else "failed",
-            "message": f"Processed {file_name}",
-        }
+            result = {
+                "status": "success" if success else "failed",
+                "message": f"Processed {file_name}",
+            }
     except Exception as e:
         logger.exception(f"[ERROR] Upload failed: {str(e)}")
         raise HTTPException(500, detail=f"Upload failed: {str(e)}")
     finally:
-        vector_store.save_indexed_files_and_vector_db()
+        if result["status"] != "unchanged":
+            vector_store.save_indexed_files_and_vector_db()
         return JSONResponse(content=result)
 
 @app.post("/upload_file_contents")
@@ -175,17 +257,20 @@ async def upload_file_contents(request: FileContentsRequest):
 @app.post("/upload_file_path")
 async def upload_file_path(
     file_path: str = Form(...),
-    rag_name: str | None = Form(None)
+    rag_name: str | None = Form(None),
+    priority: str = Form(PRIORITY_INTERACTIVE)
 ):
     try:
-        logger.debug(f"[DEBUG] Upload by file path request - Path: {file_path}")
+        logger.debug(f"[DEBUG] Upload by file path request - Path: {file_path}, RAG: {rag_name}, Priority: {priority}")
         
-        result = upload_queue_manager.add_file(file_path)
+        result = upload_queue_manager.add_file(file_path, priority=priority, rag_name=rag_name)
         
         if result["success"]:
             return JSONResponse(content={
                 "status": "queued",
                 "message": result["message"],
+                "priority": result.get("priority", priority),
+                "position": result.get("position"),
                 "remaining_capacity": result["remaining_capacity"]
             })
         else:
@@ -203,15 +288,24 @@ async def upload_file_path(
 @app.post("/upload_file_paths")
 async def upload_file_paths(
     file_paths: List[str] = Body(...),
-    rag_name: str | None = None
+    rag_name: str | None = None,
+    priority: str = PRIORITY_BULK
 ):
-    """여러 파일을 한번에 업로드 큐에 추가"""
+    """여러 파일을 한번에 업로드 큐에 추가 (기본 우선순위: bulk)"""
     try:
-        logger.debug(f"[DEBUG] Upload multiple file paths request - Count: {len(file_paths)}")
+        logger.debug(f"[DEBUG] Upload multiple file paths request - Count: {len(file_paths)}, RAG: {rag_name}, Priority: {priority}")
         
-        result = upload_queue_manager.add_files(file_paths)
+        result = upload_queue_manager.add_files(file_paths, priority=priority, rag_name=rag_name)
         
         if result["success"]:
+            # 이미지가 여러 개면 큐 처리 전에 배치 OCR로 캐시를 미리 채운다 (변경되지 않은 파일은 제외)
+            vector_store = rag_manager.get_store(rag_name)
+            failed_files = {failed["file_path"] for failed in result["failed_files"]}
+            ocr_util.prefetch_image_files(
+                [file_path for file_path in file_paths if file_path not in failed_files],
+                should_skip=lambda file_path: vector_store.check_unchanged(file_path, update=False)[0]
+            )
+
             return JSONResponse(content={
                 "status": "queued",
                 "message": result["message"],
@@ -270,12 +364,17 @@ async def upload_files(
             "failed_files": failed_files
         }  
     
-async def _process_file(file: UploadFile, file_path:str, vector_store):
+async def _process_file(file: UploadFile, file_path:str, vector_store, fingerprint: Dict[str, Any] | None = None):
+    spooled_path = None
     try:
-        file_contents = await document_reader.get_contents(file, file_path)
+        # 업로드 내용을 청크 단위로 임시 파일에 저장한 뒤, 텍스트/PDF는 조각 단위로 추출하여 분할기에 흘려보낸다
+        spooled_path = await document_reader.spool_upload(file)
+        # 스풀 파일은 원본 확장자를 유지하므로 형식별 추출기가 그대로 선택된다
+        # 추출은 형식별 동시 실행 한도와 워커 프로세스를 기다리는 블로킹 호출이므로, 이벤트 루프(검색 등)를 막지 않도록 스레드에서 실행한다
+        file_contents = await asyncio.to_thread(extractor_registry.extract, spooled_path)
 
         result = await vector_store.upload(file_path=file_path, file_name=file.filename,
-                    contents=file_contents)
+                    contents=file_contents, fingerprint=fingerprint)
         if result['status'] != 'success':
             return False, file.filename
         
@@ -283,6 +382,9 @@ async def _process_file(file: UploadFile, file_path:str, vector_store):
     except Exception as e:
         print(f"Error processing {file.filename}: {str(e)}")
         return False, file.filename
+    finally:
+        if spooled_path and os.path.exists(spooled_path):
+            os.remove(spooled_path)
 
 @app.post("/search")
 async def search_documents(request: SearchRequest):
@@ -493,6 +595,7 @@ async def get_status(rag_name: str | None = None):
             "document_count": document_count,
             "index_size_mb": round(index_size, 2),
             "index_path": vector_store.get_vector_db_path(),
+            "text_compression": vector_store.get_text_compression_stats(),
             "os_name": os_name
         }
         
@@ -562,6 +665,73 @@ async def upload_queue_status():
     status = upload_queue_manager.get_status()
     return JSONResponse(content=status)
 
+# 인덱스 압축 상태 조회 엔드포인트 (RAG별 삭제된 벡터 비율과 진행 상황)
+@app.get("/admin/compaction")
+async def compaction_status():
+    return JSONResponse(content=index_compactor.get_status())
+
+# 인덱스 압축 요청 엔드포인트
+@app.post("/admin/compaction")
+async def request_compaction(rag_name: str | None = Form(None)):
+    index_compactor.request(rag_name)
+    return JSONResponse(content={"status": "success", "message": f"Compaction requested for {rag_name or 'default'}"})
+
+# 인덱스 재구성 엔드포인트 (보관된 원본 벡터로 인덱스 종류 변경, 예: Flat, HNSW32, IVF1024,PQ64)
+@app.post("/admin/rebuild_index")
+def rebuild_index(
+    rag_name: str | None = Form(None),
+    index_factory: str = Form("Flat")
+):
+    vector_store = rag_manager.get_store(rag_name)
+    try:
+        count = vector_store.rebuild_index(index_factory)
+        return JSONResponse(content={"status": "success", "vector_count": count,
+                                     "message": f"Index rebuilt as {index_factory}"})
+    except Exception as e:
+        logger.exception(f"[ERROR] Index rebuild failed: {e}")
+        return JSONResponse(content={"status": "failed", "message": str(e)}, status_code=400)
+
+# 임베딩 모델 교체 상태 조회 엔드포인트 (RAG별 사용 중인 모델과 진행 상황)
+@app.get("/admin/embedding_migration")
+async def embedding_migration_status():
+    return JSONResponse(content=embedding_migrator.get_status())
+
+# 임베딩 모델 교체 시작 엔드포인트 (예: model_name=intfloat/multilingual-e5-large-instruct)
+# 교체가 끝날 때까지 검색/업로드는 기존 모델로 계속되며, index_factory로 새 인덱스 종류를 지정할 수 있다
+# 새 모델의 최대 길이가 기존 모델보다 짧으면 긴 청크가 잘리므로 allow_truncation=true일 때만 교체한다
+@app.post("/admin/embedding_migration")
+async def start_embedding_migration(
+    rag_name: str | None = Form(None),
+    model_name: str = Form(...),
+    index_factory: str = Form("Flat"),
+    allow_truncation: bool = Form(False)
+):
+    vector_store = rag_manager.get_store(rag_name)
+    result = embedding_migrator.start(rag_name, vector_store, model_name, index_factory, allow_truncation)
+    return JSONResponse(content=result, status_code=200 if result["status"] == "success" else 400)
+
+# 임베딩 모델 교체 취소 엔드포인트 (이미 임베딩한 청크는 남아 같은 모델로 다시 시작하면 이어서 진행)
+@app.post("/admin/embedding_migration/cancel")
+async def cancel_embedding_migration(rag_name: str | None = Form(None)):
+    if not embedding_migrator.cancel(rag_name):
+        return JSONResponse(content={"status": "fail", "message": f"No embedding migration for {rag_name or 'default'}"},
+                            status_code=404)
+    return JSONResponse(content={"status": "success", "message": f"Embedding migration of {rag_name or 'default'} cancelled"})
+
+# RAG별 업로드 스케줄링 가중치 설정 엔드포인트
+@app.post("/upload_queue_rag_weight")
+async def upload_queue_rag_weight(
+    rag_name: str | None = Form(None),
+    weight: int = Form(...)
+):
+    """weight가 클수록 해당 RAG의 파일을 차례마다 더 많이 연속 처리합니다."""
+    try:
+        upload_queue_manager.set_rag_weight(rag_name, weight)
+        return JSONResponse(content={"status": "success", "rag_weights": upload_queue_manager.rag_weights})
+    except Exception as e:
+        logger.error(f"[ERROR] Upload queue weight update failed: {e}")
+        return JSONResponse(content={"status": "failed", "message": str(e)}, status_code=400)
+
 # 업로드 큐의 모든 파일 정보 조회 엔드포인트
 @app.get("/upload_queue_files")
 async def upload_queue_files():
@@ -686,6 +856,9 @@ def _run_on_cmd(port: int):
     uvicorn.run(app, host="0.0.0.0", port=port)
 
 if __name__ == "__main__":
+    # PDF 병렬 추출 등 프로세스 풀을 쓰므로, 패키징된 실행 파일(Windows)에서 자식 프로세스가 서버를 다시 띄우지 않도록 한다
+    multiprocessing.freeze_support()
+
     # 명령 프롬프트에서 실행 시 port가 포함되어 있는지 확인
     port = _get_port_from_cmd()
 
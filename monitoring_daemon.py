@@ -235,9 +235,9 @@ class MonitoringDaemon:
                     self.monitoring_result["added_files"].append(path)
                     monitoring_logger.info(f"[모니터링] 새 파일 감지: {path}")
                     
-                    # 새 파일을 바로 업로드
+                    # 새 파일을 업로드 큐에 monitoring 우선순위로 등록 (사용자가 직접 올린 파일보다 뒤에 처리)
                     try:
-                        result = self.main_frame_ref.api_client.upload_file(path)
+                        result = self.main_frame_ref.api_client.upload_file_path(path, priority="monitoring")
                         if not result.get("error"):
                             # 업로드 성공한 파일의 registered_at 정보 업데이트
                             for file in files:
@@ -247,7 +247,6 @@ class MonitoringDaemon:
                                     monitoring_logger.info(f"[모니터링] 새 파일 업로드 성공: {path}")
                         else:
                             monitoring_logger.error(f"[모니터링] 새 파일 업로드 실패: {path}, 오류: {result.get('error')}")
-                        time.sleep(0.5)  # 업로드 후 딜레이 추가
                     except Exception as e:
                         monitoring_logger.exception(f"[모니터링] 새 파일 업로드 중 오류: {e}")
             
@@ -286,8 +285,8 @@ class MonitoringDaemon:
                             monitoring_logger.info(f"  - 마지막 등록: {last_registered_dt}")
                             monitoring_logger.info(f"  - 수정 시간: {mtime}")
                             
-                            # 파일 업로드
-                            result = self.main_frame_ref.api_client.upload_file(path)
+                            # 업로드 큐에 monitoring 우선순위로 등록
+                            result = self.main_frame_ref.api_client.upload_file_path(path, priority="monitoring")
                             if not result.get("error"):
                                 file['registered_at'] = datetime.now().isoformat()
                                 updated = True
@@ -297,7 +296,6 @@ class MonitoringDaemon:
                                 monitoring_logger.info(f"[모니터링] 파일 업로드 성공: {path}")
                             else:
                                 monitoring_logger.error(f"[모니터링] 파일 업로드 실패: {path}, 오류: {result.get('error')}")
-                            time.sleep(0.5)  # 업로드 후 딜레이 추가
                     except Exception as e:
                         monitoring_logger.exception(f"[모니터링] 파일 변경 확인 중 오류({path}): {e}")
             
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+# 청크 근사 중복 검출 (SimHash + 밴딩)
+# 메일 스레드의 인용문, 반복되는 머리말/꼬리말처럼 거의 같은 청크를 인덱싱 시점에 찾아 한 번만 저장하기 위해 사용한다.
+#   - 메일 인용 표시(">")와 공백을 정리한 본문의 단어 3-gram마다 64bit 해시를 만들고, 비트별 다수결로 64bit SimHash 서명을 만든다
+#     (글자 n-gram은 숫자만 다른 정형 문서(사양서 항목, 로그 줄)를 중복으로 보는 경우가 많아 단어 단위를 사용한다)
+#   - 서명의 유사도는 1 - (해밍 거리 / 64)이며, 허용 거리가 d이면 서명을 d+1개 밴드로 나눈다
+#     (거리가 d 이하인 두 서명은 비둘기집 원리에 의해 적어도 한 밴드가 완전히 같으므로 그 밴드의 후보만 비교하면 된다)
+
+import hashlib
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+SIGNATURE_BITS = 64
+SHINGLE_SIZE = 3
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_QUOTE_PREFIX = re.compile(r"^[ \t]*(?:>[ \t]*)+", re.MULTILINE)
+
+
+def simhash(text: str) -> int:
+    """본문의 64bit SimHash 서명. 메일 인용 표시, 공백, 대소문자 차이는 무시한다."""
+    tokens = _TOKEN.findall(_QUOTE_PREFIX.sub("", text).lower())
+    if not tokens:
+        return 0
+    shingles = [" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(max(1, len(tokens) - SHINGLE_SIZE + 1))]
+
+    # 프로세스마다 달라지는 hash() 대신 고정된 해시를 사용해야 저장된 서명과 비교할 수 있다
+    hashes = np.frombuffer(b"".join(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest()
+                                    for shingle in shingles), dtype=np.uint8)
+    bits = np.unpackbits(hashes).reshape(len(shingles), SIGNATURE_BITS)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 > len(shingles)
+    return int.from_bytes(np.packbits(votes).tobytes(), "big")
+
+
+def similarity(signature_a: int, signature_b: int) -> float:
+    return 1.0 - bin(signature_a ^ signature_b).count("1") / SIGNATURE_BITS
+
+
+class NearDuplicateIndex:
+    """SimHash 서명 -> 청크(doc_id) 검색용 밴드 인덱스. 유사도가 threshold 이상인 기존 청크를 찾는다."""
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.max_distance = max(0, min(SIGNATURE_BITS - 1, int(round((1.0 - threshold) * SIGNATURE_BITS, 6))))
+        band_count = self.max_distance + 1
+        # 64bit를 band_count개의 (시작 비트, 비트 수) 구간으로 나눈다
+        widths = [SIGNATURE_BITS // band_count + (1 if i < SIGNATURE_BITS % band_count else 0) for i in range(band_count)]
+        self._bands: List[Tuple[int, int]] = []
+        start = 0
+        for width in widths:
+            self._bands.append((start, (1 << width) - 1))
+            start += width
+        self._buckets: List[Dict[int, List[Tuple[int, str]]]] = [defaultdict(list) for _ in self._bands]
+        self._signatures: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def _keys(self, signature: int):
+        for band, (shift, mask) in enumerate(self._bands):
+            yield band, (signature >> shift) & mask
+
+    def find(self, signature: int) -> Optional[str]:
+        """유사도가 threshold 이상인 청크 중 가장 가까운 것의 doc_id. 없으면 None."""
+        best_id, best_distance = None, self.max_distance + 1
+        for band, key in self._keys(signature):
+            for candidate, doc_id in self._buckets[band].get(key, ()):
+                distance = bin(signature ^ candidate).count("1")
+                if distance < best_distance:
+                    best_id, best_distance = doc_id, distance
+                    if distance == 0:
+                        return best_id
+        return best_id
+
+    def add(self, signature: int, doc_id: str):
+        self._signatures[doc_id] = signature
+        for band, key in self._keys(signature):
+            self._buckets[band][key].append((signature, doc_id))
+
+    def remove(self, doc_id: str):
+        signature = self._signatures.pop(doc_id, None)
+        if signature is None:
+            return
+        for band, key in self._keys(signature):
+            bucket = self._buckets[band].get(key)
+            if bucket is None:
+                continue
+            bucket[:] = [entry for entry in bucket if entry[1] != doc_id]
+            if not bucket:
+                del self._buckets[band][key]
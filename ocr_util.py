@@ -0,0 +1,403 @@
+# -*- coding: utf-8 -*-
+
+# 이미지/스캔 PDF 페이지 OCR
+# easyocr reader를 공유하고, 인식 결과는 이미지 내용 해시를 키로 메모리와 디스크에 캐시한다.
+# 여러 이미지를 한 번의 reader 호출로 처리하는 배치 모드를 제공한다.
+
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import easyocr
+import cv2
+import numpy as np
+from PIL import Image
+# Pillow 10.0부터 Image.ANTIALIAS 상수가 제거되었으므로, 하위 호환을 위해 존재하지 않으면 추가
+if not hasattr(Image, "ANTIALIAS"):
+    # Resampling 대체 상수를 사용하여 ANTIALIAS 이름으로 재지정
+    try:
+        from PIL import Image as _PIL_Image
+        Image.ANTIALIAS = _PIL_Image.Resampling.LANCZOS  # type: ignore
+    except Exception:
+        # Resampling 모듈이 없는 구버전 Pillow 환경 등 예외는 무시
+        pass
+
+import config
+import logger_util
+from file_fingerprint import compute_content_hash
+from pdf_extractor import extract_page_images
+
+logger = logger_util.get_logger()
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp')
+
+# 동시에 OCR을 수행하는 스레드 수 (easyocr 모델은 메모리를 많이 쓰므로 작게 유지)
+OCR_WORKERS = 2
+# 이 값 이상의 신뢰도를 가진 인식 결과만 사용
+OCR_MIN_CONFIDENCE = 0.5
+# 메모리에 유지하는 OCR 결과 최대 항목 수 (디스크 캐시는 별도)
+OCR_MEMORY_CACHE_MAX_ENTRIES = 1024
+# 디스크 캐시 삭제를 시작하면 전체 크기를 최대 크기의 이 비율까지 줄인다
+OCR_CACHE_EVICTION_TARGET_RATIO = 0.9
+
+_reader = None
+_reader_lock = threading.Lock()
+
+_ocr_pool = None
+_prefetch_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_ocr_reader():
+    """easyocr reader를 한 번만 초기화하여 공유한다."""
+    global _reader
+    with _reader_lock:
+        if _reader is None:
+            _reader = easyocr.Reader(['ko', 'en'])  # 한글, 영어 지원
+        return _reader
+
+
+def _get_ocr_pool() -> ThreadPoolExecutor:
+    global _ocr_pool
+    with _pool_lock:
+        if _ocr_pool is None:
+            _ocr_pool = ThreadPoolExecutor(max_workers=OCR_WORKERS, thread_name_prefix="ocr")
+        return _ocr_pool
+
+
+def _get_prefetch_pool() -> ThreadPoolExecutor:
+    global _prefetch_pool
+    with _pool_lock:
+        if _prefetch_pool is None:
+            _prefetch_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr-prefetch")
+        return _prefetch_pool
+
+
+def is_image_file(file_path: str) -> bool:
+    return file_path.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def to_rgb_array(img: Image.Image):
+    """PIL 이미지를 OCR 입력용 RGB numpy 배열로 변환한다."""
+    img_np = np.array(img)
+
+    # RGB가 아닌 경우 변환
+    if len(img_np.shape) == 2:  # 흑백 이미지
+        img_np = cv2.cvtColor(img_np, cv2.COLOR_GRAY2RGB)
+    elif len(img_np.shape) == 3 and img_np.shape[2] == 4:  # RGBA 이미지
+        img_np = cv2.cvtColor(img_np, cv2.COLOR_RGBA2RGB)
+    return img_np
+
+
+def _scaled_size(width: int, height: int) -> Tuple[int, int]:
+    """config.OCR_MAX_IMAGE_SIDE에 맞춰 비율을 유지한 축소 크기를 계산한다. 0이면 축소하지 않는다."""
+    max_side = config.OCR_MAX_IMAGE_SIDE
+    if not max_side or max(width, height) <= max_side:
+        return width, height
+    ratio = max_side / max(width, height)
+    return max(int(width * ratio), 1), max(int(height * ratio), 1)
+
+
+def _prepare_image(img: Image.Image):
+    size = _scaled_size(*img.size)
+    if size != img.size:
+        img = img.resize(size, Image.LANCZOS)
+    return to_rgb_array(img)
+
+
+def _summarize(result: list) -> Dict:
+    """readtext 결과를 캐시에 저장할 형태({text, confidence, count})로 요약한다."""
+    return {
+        "text": "\n".join(text for _, text, conf in result if conf > OCR_MIN_CONFIDENCE),
+        "confidence": sum(conf for _, _, conf in result) / len(result) if result else 0.0,
+        "count": len(result),
+    }
+
+
+class _OcrCache:
+    """OCR 결과 캐시. 최근 항목은 메모리(LRU)에, 전체는 디스크(JSON 파일)에 보관한다.
+    디스크 캐시가 max_bytes를 넘으면 가장 오래 사용하지 않은 파일부터 삭제한다."""
+
+    def __init__(self, cache_dir: str, max_bytes: int, max_memory_entries: int = OCR_MEMORY_CACHE_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_memory_entries = max_memory_entries
+        self._total_bytes = None  # 최초 기록 시 디렉터리를 스캔해서 계산
+        self._memory = OrderedDict()  # type: OrderedDict[str, Dict]
+        self._inflight = {}  # type: Dict[str, Future]
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _remember(self, key: str, value: Dict):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                return value
+
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            # 최근 사용 시각을 갱신하여 삭제 순서에 반영
+            os.utime(path)
+        except OSError:
+            pass
+
+        with self._lock:
+            self._remember(key, value)
+        return value
+
+    def put(self, key: str, value: Dict):
+        with self._lock:
+            self._remember(key, value)
+
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(value, f, ensure_ascii=False)
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(temp_path, path)
+            new_size = os.path.getsize(path)
+        except OSError as e:
+            logger.error(f"[OCR] Failed to write OCR cache {path}: {e}")
+            return
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._list_entries())
+            else:
+                self._total_bytes += new_size - old_size
+            if self._total_bytes > self.max_bytes:
+                self._evict_locked()
+
+    def _list_entries(self):
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _evict_locked(self):
+        target = int(self.max_bytes * OCR_CACHE_EVICTION_TARGET_RATIO)
+        entries = self._list_entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._total_bytes = total
+        logger.info(f"[OCR] Evicted old OCR cache entries, cache size is now {total} bytes")
+
+    def claim(self, key: str) -> Tuple[Future, bool]:
+        """같은 이미지를 동시에 두 번 OCR하지 않도록 진행 중인 작업을 등록한다. (future, 직접 처리해야 하는지)를 반환한다."""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            return future, True
+
+    def finish(self, key: str, future: Future, value: Optional[Dict] = None, error: Optional[Exception] = None):
+        if value is not None:
+            self.put(key, value)
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(value)
+
+
+_cache = _OcrCache(config.OCR_CACHE_PATH, config.OCR_CACHE_MAX_BYTES)
+
+
+def _cache_key(content_hash: str) -> str:
+    # 축소 설정이 바뀌면 인식 결과도 달라지므로 키에 포함한다
+    return f"{content_hash}_{config.OCR_MAX_IMAGE_SIDE or 0}"
+
+
+def ocr_image_file(file_path: str) -> Dict:
+    """이미지 파일 1개를 OCR하여 {text, confidence, count}를 반환한다. 같은 내용의 이미지는 캐시 결과를 사용한다."""
+    key = _cache_key(compute_content_hash(file_path))
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    future, owner = _cache.claim(key)
+    if not owner:
+        return future.result()
+
+    try:
+        with Image.open(file_path) as img:
+            value = _summarize(get_ocr_reader().readtext(_prepare_image(img)))
+    except Exception as e:
+        _cache.finish(key, future, error=e)
+        raise
+    _cache.finish(key, future, value=value)
+    return value
+
+
+def ocr_image_files(file_paths: Iterable[str], batch_size: Optional[int] = None) -> Dict[str, Dict]:
+    """여러 이미지를 배치로 OCR하여 {파일 경로: {text, confidence, count}}를 반환한다.
+
+    캐시에 없는 이미지만 축소 후 크기가 같은 것끼리 묶어 readtext_batched 한 번으로 처리한다.
+    읽을 수 없는 이미지는 결과에서 제외된다.
+    """
+    batch_size = batch_size or config.OCR_BATCH_SIZE
+    results = {}
+    claimed = {}  # key -> (future, [file_path, ...])
+    groups = {}  # 축소 후 크기 -> [key, ...]
+
+    for file_path in file_paths:
+        try:
+            key = _cache_key(compute_content_hash(file_path))
+            cached = _cache.get(key)
+            if cached is not None:
+                results[file_path] = cached
+                continue
+
+            if key in claimed:
+                claimed[key][1].append(file_path)
+                continue
+
+            with Image.open(file_path) as img:
+                size = _scaled_size(*img.size)
+        except Exception as e:
+            logger.error(f"[OCR] Failed to read image {file_path}: {e}")
+            continue
+
+        future, owner = _cache.claim(key)
+        if not owner:
+            # 다른 스레드가 처리 중인 이미지는 그 결과를 기다린다
+            try:
+                results[file_path] = future.result()
+            except Exception:
+                pass
+            continue
+        claimed[key] = (future, [file_path])
+        groups.setdefault(size, []).append(key)
+
+    reader = get_ocr_reader()
+    for keys in groups.values():
+        for start in range(0, len(keys), batch_size):
+            batch_keys = keys[start:start + batch_size]
+            try:
+                images = []
+                for key in batch_keys:
+                    with Image.open(claimed[key][1][0]) as img:
+                        images.append(_prepare_image(img))
+                batch_results = reader.readtext_batched(images, batch_size=len(images))
+            except Exception as e:
+                logger.error(f"[OCR] Batched OCR failed: {e}")
+                for key in batch_keys:
+                    _cache.finish(key, claimed[key][0], error=e)
+                continue
+
+            for key, result in zip(batch_keys, batch_results):
+                value = _summarize(result)
+                _cache.finish(key, claimed[key][0], value=value)
+                for file_path in claimed[key][1]:
+                    results[file_path] = value
+
+    return results
+
+
+def prefetch_image_files(file_paths: List[str], should_skip: Optional[Callable[[str], bool]] = None):
+    """업로드 큐에 들어간 이미지들을 백그라운드에서 배치 OCR하여 캐시를 미리 채운다.
+
+    큐 워커가 이미지를 처리할 때는 캐시(또는 진행 중인 배치 결과)를 사용하게 된다.
+    """
+    image_paths = [file_path for file_path in file_paths if is_image_file(file_path)]
+    if len(image_paths) < 2:
+        return
+
+    def _run():
+        try:
+            targets = [file_path for file_path in image_paths
+                       if os.path.isfile(file_path) and not (should_skip and should_skip(file_path))]
+            ocr_image_files(targets)
+        except Exception as e:
+            logger.error(f"[OCR] Image prefetch failed: {e}")
+
+    _get_prefetch_pool().submit(_run)
+
+
+def _hash_page_images(images: List[bytes]) -> str:
+    hasher = hashlib.blake2b(digest_size=16)
+    for data in images:
+        hasher.update(len(data).to_bytes(8, "little"))
+        hasher.update(data)
+    return hasher.hexdigest()
+
+
+def _ocr_page(page_no: int, images: List[bytes]) -> str:
+    key = _cache_key(_hash_page_images(images))
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached["text"]
+
+    future, owner = _cache.claim(key)
+    if not owner:
+        try:
+            return future.result()["text"]
+        except Exception:
+            return ""
+
+    try:
+        reader = get_ocr_reader()
+        result = []
+        for data in images:
+            with Image.open(io.BytesIO(data)) as img:
+                result.extend(reader.readtext(_prepare_image(img)))
+        value = _summarize(result)
+    except Exception as e:
+        logger.error(f"[OCR] page {page_no} OCR failed: {e}")
+        _cache.finish(key, future, error=e)
+        return ""
+
+    _cache.finish(key, future, value=value)
+    return value["text"]
+
+
+def ocr_pdf_pages(filepath: str, page_numbers: List[int]) -> Dict[int, str]:
+    """텍스트 레이어가 없는 페이지들을 OCR하여 {페이지 번호: 텍스트}를 반환한다. 이미지가 없는 페이지는 제외된다."""
+    if not page_numbers:
+        return {}
+
+    page_images = extract_page_images(filepath, page_numbers)
+    pool = _get_ocr_pool()
+    futures = {
+        page_no: pool.submit(_ocr_page, page_no, images)
+        for page_no, images in page_images.items() if images
+    }
+    return {page_no: future.result() for page_no, future in futures.items()}
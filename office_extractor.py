@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+# MS Office 문서 텍스트 추출
+# docx는 document.xml을 스트리밍 파싱하고, pptx는 python-pptx로 슬라이드별로 읽는다.
+# 레거시 형식(.doc, .ppt)이나 파싱에 실패한 파일만 textract로 처리한다.
+# 추출은 공용 워커 프로세스 풀에서 실행되며, 결과는 {"text", "metadata"} segment 목록이다.
+
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Dict, List
+
+from extraction_pool import get_extraction_pool, use_extraction_pool
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+W_P = W_NS + "p"
+W_T = W_NS + "t"
+W_TAB = W_NS + "tab"
+W_BR = W_NS + "br"
+W_CR = W_NS + "cr"
+W_PPR = W_NS + "pPr"
+W_PSTYLE = W_NS + "pStyle"
+W_OUTLINE_LVL = W_NS + "outlineLvl"
+W_STYLE = W_NS + "style"
+W_NAME = W_NS + "name"
+W_VAL = W_NS + "val"
+W_STYLE_ID = W_NS + "styleId"
+W_TYPE = W_NS + "type"
+
+# 스타일 이름이 이 접두어로 시작하면 제목(섹션 구분) 문단으로 본다
+HEADING_STYLE_PREFIXES = ("heading", "title", "제목")
+
+
+def _read_heading_style_ids(zf: zipfile.ZipFile) -> set:
+    """styles.xml에서 제목 문단 스타일의 styleId 목록을 읽는다."""
+    try:
+        styles_xml = zf.read("word/styles.xml")
+    except KeyError:
+        return set()
+
+    heading_ids = set()
+    for style in ET.fromstring(styles_xml).iter(W_STYLE):
+        if style.get(W_TYPE) != "paragraph":
+            continue
+        name = style.find(W_NAME)
+        style_name = (name.get(W_VAL) if name is not None else "") or ""
+        ppr = style.find(W_PPR)
+        if style_name.lower().startswith(HEADING_STYLE_PREFIXES) \
+                or (ppr is not None and _has_outline_level(ppr)):
+            heading_ids.add(style.get(W_STYLE_ID))
+    return heading_ids
+
+
+def _has_outline_level(ppr) -> bool:
+    # 개요 수준 9는 본문 수준이다
+    outline = ppr.find(W_OUTLINE_LVL)
+    return outline is not None and outline.get(W_VAL) != "9"
+
+
+def _paragraph_text(paragraph) -> str:
+    parts = []
+    for elem in paragraph.iter():
+        if elem.tag == W_T:
+            parts.append(elem.text or "")
+        elif elem.tag == W_TAB:
+            parts.append("\t")
+        elif elem.tag in (W_BR, W_CR):
+            parts.append("\n")
+    return "".join(parts)
+
+
+def _is_heading(paragraph, heading_ids: set) -> bool:
+    ppr = paragraph.find(W_PPR)
+    if ppr is None:
+        return False
+    if _has_outline_level(ppr):
+        return True
+    style = ppr.find(W_PSTYLE)
+    return style is not None and style.get(W_VAL) in heading_ids
+
+
+def extract_docx_segments(filepath: str) -> List[Dict]:
+    """docx를 제목 문단 기준 섹션 단위 segment로 추출한다. metadata의 section은 섹션 제목이다."""
+    segments = []
+    section = None
+    paragraphs = []
+
+    def _flush():
+        text = "\n".join(paragraphs)
+        if text.strip():
+            segments.append({"text": text, "metadata": {"section": section} if section else {}})
+
+    with zipfile.ZipFile(filepath) as zf:
+        heading_ids = _read_heading_style_ids(zf)
+        with zf.open("word/document.xml") as document_xml:
+            for _, elem in ET.iterparse(document_xml, events=("end",)):
+                if elem.tag != W_P:
+                    continue
+
+                text = _paragraph_text(elem)
+                if _is_heading(elem, heading_ids) and text.strip():
+                    _flush()
+                    section = text.strip()
+                    paragraphs = [text]
+                elif text.strip():
+                    paragraphs.append(text)
+                # 처리한 문단은 비워서 문서 전체가 메모리에 쌓이지 않게 한다 (텍스트 상자 등 중첩 문단의 중복 추출도 방지)
+                elem.clear()
+
+    _flush()
+    return segments
+
+
+def _shape_texts(shapes) -> List[str]:
+    texts = []
+    for shape in shapes:
+        if getattr(shape, "shapes", None) is not None:  # 그룹 도형
+            texts.extend(_shape_texts(shape.shapes))
+        elif getattr(shape, "has_table", False) and shape.has_table:
+            for row in shape.table.rows:
+                texts.append("\t".join(cell.text for cell in row.cells))
+        elif getattr(shape, "has_text_frame", False) and shape.has_text_frame:
+            if shape.text_frame.text.strip():
+                texts.append(shape.text_frame.text)
+    return texts
+
+
+def extract_pptx_segments(filepath: str) -> List[Dict]:
+    """pptx를 슬라이드 단위 segment로 추출한다. metadata에는 슬라이드 번호와 제목이 들어간다."""
+    from pptx import Presentation
+
+    segments = []
+    for slide_no, slide in enumerate(Presentation(filepath).slides, start=1):
+        texts = _shape_texts(slide.shapes)
+        if slide.has_notes_slide and slide.notes_slide.notes_text_frame is not None:
+            notes = slide.notes_slide.notes_text_frame.text
+            if notes.strip():
+                texts.append(notes)
+
+        text = "\n".join(texts)
+        if not text.strip():
+            continue
+
+        metadata = {"slide": slide_no}
+        title_shape = slide.shapes.title
+        if title_shape is not None and title_shape.text.strip():
+            metadata["title"] = title_shape.text.strip()
+        segments.append({"text": text, "metadata": metadata})
+    return segments
+
+
+def extract_legacy_segments(filepath: str) -> List[Dict]:
+    """.doc/.ppt 등 레거시 형식은 textract로 추출한다."""
+    import textract
+
+    text = textract.process(filepath).decode('utf-8')
+    return [{"text": text, "metadata": {}}] if text.strip() else []
+
+
+def extract_office_segments(filepath: str) -> List[Dict]:
+    """파일 내용(zip 구조)으로 형식을 판별하여 segment 목록을 추출한다. 워커 프로세스에서 실행된다."""
+    if zipfile.is_zipfile(filepath):
+        with zipfile.ZipFile(filepath) as zf:
+            names = set(zf.namelist())
+        try:
+            if "word/document.xml" in names:
+                return extract_docx_segments(filepath)
+            if "ppt/presentation.xml" in names:
+                return extract_pptx_segments(filepath)
+        except Exception:
+            # 손상되었거나 비표준인 문서는 textract로 한 번 더 시도
+            pass
+    return extract_legacy_segments(filepath)
+
+
+def extract_office_file(filepath: str) -> List[Dict]:
+    """Office 문서를 워커 프로세스 풀에서 추출한다. (감독 워커 안에서는 바로 추출)"""
+    if not use_extraction_pool():
+        return extract_office_segments(filepath)
+    return get_extraction_pool().submit(extract_office_segments, filepath).result()
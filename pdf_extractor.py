@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+# PDF 페이지 텍스트 추출을 프로세스 풀로 병렬 처리한다.
+# 워커 프로세스가 document_reader의 무거운 의존성(textract, pandas 등)을 import하지 않도록 별도 모듈로 둔다.
+
+from typing import Dict, List, Tuple
+
+from PyPDF2 import PdfReader
+
+from extraction_pool import EXTRACT_WORKERS, get_extraction_pool, use_extraction_pool
+
+# 이 페이지 수 미만이면 프로세스를 띄우는 비용이 더 커서 현재 프로세스에서 순차 처리한다
+PARALLEL_MIN_PAGES = 16
+
+
+def extract_page_range(filepath: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """[start, end) 범위 페이지의 (페이지 번호(1부터), 텍스트) 목록을 반환한다. 워커 프로세스에서 실행된다.
+
+    텍스트 레이어가 없는 페이지(스캔 페이지)는 OCR 대상을 알 수 있도록 빈 문자열로 포함한다.
+    """
+    reader = PdfReader(filepath)
+    pages = []
+    for index in range(start, min(end, len(reader.pages))):
+        page_text = reader.pages[index].extract_text() or ""
+        pages.append((index + 1, page_text))
+    return pages
+
+
+def extract_page_images(filepath: str, page_numbers: List[int]) -> Dict[int, List[bytes]]:
+    """지정한 페이지들에 포함된 이미지의 원본 바이트를 페이지 번호별로 반환한다.
+
+    스캔 PDF는 페이지 전체가 하나의 이미지로 들어 있으므로, 별도 렌더러 없이 이 이미지를 OCR에 사용한다.
+    """
+    reader = PdfReader(filepath)
+    images = {}
+    for page_no in page_numbers:
+        try:
+            images[page_no] = [image.data for image in reader.pages[page_no - 1].images]
+        except Exception:
+            # 지원하지 않는 이미지 필터 등은 해당 페이지만 건너뛴다
+            images[page_no] = []
+    return images
+
+
+def extract_pdf_pages(filepath: str) -> List[Tuple[int, str]]:
+    """PDF의 페이지별 텍스트를 (페이지 번호, 텍스트) 목록으로 반환한다. 텍스트가 없는 페이지는 빈 문자열이다.
+
+    페이지가 많으면 워커 수의 2배 정도로 페이지 범위를 나눠 프로세스 풀에서 병렬 추출한다.
+    감독 워커 안에서는 순차 추출한다. (파일 단위 병렬 처리는 감독 워커 수로 이미 하고 있다)
+    """
+    page_count = len(PdfReader(filepath).pages)
+    if page_count < PARALLEL_MIN_PAGES or EXTRACT_WORKERS <= 1 or not use_extraction_pool():
+        return extract_page_range(filepath, 0, page_count)
+
+    range_size = max(page_count // (EXTRACT_WORKERS * 2), 1)
+    pool = get_extraction_pool()
+    futures = [
+        pool.submit(extract_page_range, filepath, start, start + range_size)
+        for start in range(0, page_count, range_size)
+    ]
+
+    pages = []
+    for future in futures:
+        pages.extend(future.result())
+    return pages
@@ -34,6 +34,10 @@ class RAGManager:  # pragma: no cover (단순 싱글턴)
             self._stores[key] = store
         return self._stores[key]
 
+    def get_loaded_stores(self) -> Dict[str, VectorStore]:
+        """지금까지 로드된 RAG 이름 -> VectorStore (새로 로드하지 않음)"""
+        return dict(self._stores)
+
 
 # 전역 싱글턴 객체
 rag_manager = RAGManager() 
\ No newline at end of file
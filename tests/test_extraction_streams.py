@@ -0,0 +1,75 @@
+import gc
+import os
+
+from extraction_cache import ExtractionCache
+from extraction_worker import ExtractionSupervisor, _write_contents
+
+
+def _write_segments(tmp_path, count=4):
+    output_path = str(tmp_path / "extract.jsonl")
+    segments = [{"text": f"segment {i}", "metadata": {}} for i in range(count)]
+    _write_contents({"contents": None, "contents_type": "PDF", "segments": segments}, output_path)
+    return output_path
+
+
+def _cache_files(cache_dir):
+    return [name for _, _, names in os.walk(cache_dir) for name in names]
+
+
+def test_worker_stream_removes_output_when_read_to_end(tmp_path):
+    output_path = _write_segments(tmp_path)
+    contents = ExtractionSupervisor()._read_contents(output_path)
+
+    assert [segment["text"] for segment in contents["segments"]] == [f"segment {i}" for i in range(4)]
+    assert not os.path.exists(output_path)
+
+
+def test_worker_stream_removes_output_when_closed_halfway(tmp_path):
+    output_path = _write_segments(tmp_path)
+    segments = ExtractionSupervisor()._read_contents(output_path)["segments"]
+
+    next(segments)
+    next(segments)
+    segments.close()
+
+    assert not os.path.exists(output_path)
+
+
+def test_worker_stream_removes_output_when_dropped_unread(tmp_path):
+    output_path = _write_segments(tmp_path)
+    contents = ExtractionSupervisor()._read_contents(output_path)
+
+    del contents
+    gc.collect()
+
+    assert not os.path.exists(output_path)
+
+
+def test_cache_write_through_closed_halfway_leaves_no_files(tmp_path):
+    output_path = _write_segments(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+    cache = ExtractionCache(cache_dir, max_bytes=1024 * 1024)
+    fingerprint = {"file_size": 1, "file_mtime": 1, "content_hash": "h"}
+
+    contents = cache.get_or_extract("/doc.pdf", fingerprint, lambda: ExtractionSupervisor()._read_contents(output_path))
+    segments = contents["segments"]
+    next(segments)
+    next(segments)
+    segments.close()
+
+    # 캐시 임시 파일과 워커 결과 파일이 모두 지워지고, 중단된 결과는 캐시되지 않는다
+    assert _cache_files(cache_dir) == []
+    assert not os.path.exists(output_path)
+    assert cache.get("/doc.pdf", fingerprint) is None
+
+
+def test_cache_write_through_read_to_end_is_cached(tmp_path):
+    output_path = _write_segments(tmp_path)
+    cache = ExtractionCache(str(tmp_path / "cache"), max_bytes=1024 * 1024)
+    fingerprint = {"file_size": 1, "file_mtime": 1, "content_hash": "h"}
+
+    contents = cache.get_or_extract("/doc.pdf", fingerprint, lambda: ExtractionSupervisor()._read_contents(output_path))
+    assert len(list(contents["segments"])) == 4
+
+    cached = cache.get("/doc.pdf", fingerprint)
+    assert [segment["text"] for segment in cached["segments"]] == [f"segment {i}" for i in range(4)]
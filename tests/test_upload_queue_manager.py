@@ -0,0 +1,178 @@
+from upload_queue_manager import (
+    PRIORITY_BULK,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_MONITORING,
+    UploadQueueManager,
+)
+
+
+def _make_files(tmp_path, *names):
+    paths = []
+    for name in names:
+        path = tmp_path / name
+        path.write_text(name, encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+
+def _drain(manager):
+    dispatched = []
+    while True:
+        file_info = manager._get_next_file(timeout=0)
+        if file_info is None:
+            return dispatched
+        dispatched.append(file_info)
+
+
+def _names(file_infos):
+    return [file_info['file_name'] for file_info in file_infos]
+
+
+def test_interactive_files_are_dispatched_before_lower_priorities(tmp_path):
+    manager = UploadQueueManager(max_queue_size=100)
+    bulk, monitoring, interactive = _make_files(tmp_path, "bulk.txt", "monitoring.txt", "interactive.txt")
+    manager.add_file(bulk, priority=PRIORITY_BULK)
+    manager.add_file(monitoring, priority=PRIORITY_MONITORING)
+    manager.add_file(interactive, priority=PRIORITY_INTERACTIVE)
+
+    assert _names(_drain(manager)) == ["interactive.txt", "monitoring.txt", "bulk.txt"]
+
+
+def test_lower_priorities_get_a_turn_after_the_skip_threshold(tmp_path):
+    manager = UploadQueueManager(max_queue_size=100,
+                                 starvation_limits={PRIORITY_MONITORING: 2, PRIORITY_BULK: 3})
+    interactive = _make_files(tmp_path, *[f"i{i}.txt" for i in range(6)])
+    monitoring, bulk = _make_files(tmp_path, "m.txt", "b.txt")
+    for file_path in interactive:
+        manager.add_file(file_path, priority=PRIORITY_INTERACTIVE)
+    manager.add_file(monitoring, priority=PRIORITY_MONITORING)
+    manager.add_file(bulk, priority=PRIORITY_BULK)
+
+    # monitoring은 2번, bulk는 3번 건너뛰어진 뒤 interactive보다 먼저 차례를 받는다
+    assert _names(_drain(manager)) == ["i0.txt", "i1.txt", "m.txt", "b.txt", "i2.txt", "i3.txt", "i4.txt", "i5.txt"]
+
+
+def test_select_priority_counts_skips_only_for_waiting_lower_lanes(tmp_path):
+    manager = UploadQueueManager(max_queue_size=100)
+    interactive, bulk = _make_files(tmp_path, "i.txt", "b.txt")
+    manager.add_file(interactive, priority=PRIORITY_INTERACTIVE)
+    manager.add_file(bulk, priority=PRIORITY_BULK)
+
+    with manager._queue_cond:
+        assert manager._select_priority_locked() == PRIORITY_INTERACTIVE
+    assert manager._skip_counts == {PRIORITY_INTERACTIVE: 0, PRIORITY_MONITORING: 0, PRIORITY_BULK: 1}
+
+
+def _add_rag_files(manager, tmp_path, rag_name, count, priority=PRIORITY_BULK):
+    results = []
+    for file_path in _make_files(tmp_path, *[f"{rag_name}{i}.txt" for i in range(1, count + 1)]):
+        results.append(manager.add_file(file_path, priority=priority, rag_name=rag_name))
+    return results
+
+
+def test_weighted_round_robin_between_rags(tmp_path):
+    manager = UploadQueueManager(max_queue_size=100, rag_weights={"a": 3})
+    manager.set_rag_weight("b", 1)
+    _add_rag_files(manager, tmp_path, "a", 5)
+    _add_rag_files(manager, tmp_path, "b", 3)
+
+    # a는 차례마다 3개, b는 1개씩 처리한다
+    assert _names(_drain(manager)) == ["a1.txt", "a2.txt", "a3.txt", "b1.txt", "a4.txt", "a5.txt", "b2.txt", "b3.txt"]
+
+
+def test_emptied_rag_does_not_take_a_turn(tmp_path):
+    manager = UploadQueueManager(max_queue_size=100)
+    _add_rag_files(manager, tmp_path, "a", 1)
+    _add_rag_files(manager, tmp_path, "b", 3)
+    _add_rag_files(manager, tmp_path, "c", 2)
+
+    dispatched = [manager._get_next_file(timeout=0) for _ in range(4)]
+    assert _names(dispatched) == ["a1.txt", "b1.txt", "c1.txt", "b2.txt"]
+    assert "a" not in manager._lanes[PRIORITY_BULK].queues
+
+    # 비었던 RAG에 다시 추가된 파일은 순환의 맨 뒤에서 차례를 받는다
+    late = _make_files(tmp_path, "a_late.txt")[0]
+    manager.add_file(late, priority=PRIORITY_BULK, rag_name="a")
+    assert _names(_drain(manager)) == ["c2.txt", "b3.txt", "a_late.txt"]
+
+
+def test_status_reports_per_rag_sizes_and_positions(tmp_path):
+    manager = UploadQueueManager(max_queue_size=100)
+    results_a = _add_rag_files(manager, tmp_path, "a", 2)
+    results_b = _add_rag_files(manager, tmp_path, "b", 3)
+
+    assert [result["position"] for result in results_a] == [1, 2]
+    assert [result["position"] for result in results_b] == [1, 2, 3]
+    assert manager.get_status()["queue_size_by_rag"] == {"a": 2, "b": 3}
+
+    positions = {file_info['file_name']: (file_info['rag_name'], file_info['position'])
+                 for file_info in manager.get_all_pending_files()}
+    assert positions == {"a1.txt": ("a", 1), "a2.txt": ("a", 2),
+                         "b1.txt": ("b", 1), "b2.txt": ("b", 2), "b3.txt": ("b", 3)}
+
+    manager._get_next_file(timeout=0)
+    assert manager.get_status()["queue_size_by_rag"] == {"a": 1, "b": 3}
+
+
+def _spill_files(spill_dir):
+    return sorted(path.name for path in spill_dir.iterdir() if path.suffix == ".jsonl")
+
+
+def test_overflow_spills_to_disk_and_refills_in_fifo_order(tmp_path):
+    spill_dir = tmp_path / "spill"
+    manager = UploadQueueManager(max_queue_size=2, spill_dir=str(spill_dir))
+    _add_rag_files(manager, tmp_path, "a", 6)
+
+    assert manager.get_queue_size() == 6
+    assert manager.get_spilled_size_by_priority()[PRIORITY_BULK] == 4
+    assert len(_spill_files(spill_dir)) == 1
+
+    # 머리에서 하나 꺼낸 뒤 추가한 파일도 꼬리 뒤에 붙어 순서가 유지된다
+    assert _names([manager._get_next_file(timeout=0)]) == ["a1.txt"]
+    late = _make_files(tmp_path, "a7.txt")[0]
+    manager.add_file(late, priority=PRIORITY_BULK, rag_name="a")
+
+    assert _names(_drain(manager)) == [f"a{i}.txt" for i in range(2, 8)]
+    assert manager.get_queue_size() == 0
+    assert _spill_files(spill_dir) == []
+
+
+def test_readding_spilled_file_at_higher_priority_moves_it(tmp_path):
+    spill_dir = tmp_path / "spill"
+    manager = UploadQueueManager(max_queue_size=2, spill_dir=str(spill_dir))
+    _add_rag_files(manager, tmp_path, "a", 5)
+    spilled_path = str(tmp_path / "a4.txt")
+
+    # 같은 우선순위로 다시 추가하면 중복 추가하지 않는다
+    manager.add_file(spilled_path, priority=PRIORITY_BULK, rag_name="a")
+    assert manager.get_queue_size() == 5
+
+    result = manager.add_file(spilled_path, priority=PRIORITY_INTERACTIVE, rag_name="a")
+    assert result["success"] and result["priority"] == PRIORITY_INTERACTIVE
+    assert manager.get_queue_size() == 5
+    assert manager.get_queue_size_by_priority() == {PRIORITY_INTERACTIVE: 1, PRIORITY_MONITORING: 0, PRIORITY_BULK: 4}
+    assert manager.get_spilled_size_by_priority()[PRIORITY_BULK] == 2
+
+    # 승격된 파일이 먼저 처리되고, 꼬리에 남은 기록은 다시 읽을 때 버려진다
+    assert _names(_drain(manager)) == ["a4.txt", "a1.txt", "a2.txt", "a3.txt", "a5.txt"]
+    assert _spill_files(spill_dir) == []
+
+
+def test_stale_spill_files_are_removed_only_at_server_start(tmp_path):
+    spill_dir = tmp_path / "spill"
+    spill_dir.mkdir()
+    (spill_dir / "bulk_a_stale.jsonl").write_text('{"file_path": "old"}\n', encoding="utf-8")
+
+    manager = UploadQueueManager(max_queue_size=1, spill_dir=str(spill_dir))
+    _add_rag_files(manager, tmp_path, "a", 3)
+    live_files = [name for name in _spill_files(spill_dir) if name != "bulk_a_stale.jsonl"]
+    assert len(live_files) == 1
+
+    # 추출용 자식 프로세스가 main을 다시 import하며 만드는 큐 매니저는 기존 파일을 지우지 않는다
+    UploadQueueManager(max_queue_size=1, spill_dir=str(spill_dir))
+    assert _spill_files(spill_dir) == sorted(live_files + ["bulk_a_stale.jsonl"])
+
+    # 서버 시작 시에는 이전 실행의 파일만 지우고 살아 있는 꼬리 파일은 남긴다
+    manager.discard_stale_spills()
+    assert _spill_files(spill_dir) == live_files
+    assert _names(_drain(manager)) == ["a1.txt", "a2.txt", "a3.txt"]
@@ -95,7 +95,7 @@ class ApiClient:
                 if params is not None:
                     params = dict(params)
                     params['rag_name'] = rag_name
-                if json_data is not None:
+                if isinstance(json_data, dict):
                     json_data = dict(json_data)
                     json_data['rag_name'] = rag_name
                 if data is not None:
@@ -185,8 +185,8 @@ class ApiClient:
                 if params is not None:
                     params = dict(params)  # copy
                     params['rag_name'] = rag_name
-                # POST JSON
-                if json_data is not None:
+                # POST JSON (리스트 본문은 그대로 두고 params로 전달)
+                if isinstance(json_data, dict):
                     json_data = dict(json_data)
                     json_data['rag_name'] = rag_name
                 # multipart/form-data
@@ -279,12 +279,17 @@ class ApiClient:
             "vector_store_path": "N/A"
         }
     
-    def upload_file_path(self, file_path):
-        """파일 경로만 서버에 전달하여 업로드 요청을 보냅니다."""
+    def upload_file_path(self, file_path, priority=None):
+        """파일 경로만 서버에 전달하여 업로드 요청을 보냅니다.
+
+        priority: interactive | monitoring | bulk (생략 시 서버 기본값 interactive)
+        """
         if not os.path.exists(file_path):
             return {"error": "file_not_found", "details": f"파일을 찾을 수 없습니다: {file_path}"}
         try:
             data = {'file_path': file_path, 'rag_name': self.current_rag_name}
+            if priority:
+                data['priority'] = priority
             result = self._make_request('post', '/upload_file_path', data=data, timeout=600)
             if result and not (isinstance(result, dict) and "error" in result):
                 try:
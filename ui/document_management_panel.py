@@ -560,7 +560,7 @@ class DocManagementPanel(wx.Panel):
                 # 서버에서 큐 상태 확인
                 try:
                     remaining = self._get_queue_remaining_capacity()
-                    if len(file_paths) > remaining:
+                    if remaining is not None and len(file_paths) > remaining:
                         wx.MessageBox(
                             f"업로드 가능한 파일 수를 초과했습니다.\n현재 업로드 가능한 파일 수: {remaining}건",
                             "업로드 제한",
@@ -571,7 +571,8 @@ class DocManagementPanel(wx.Panel):
                     wx.MessageBox(f"서버 상태 확인 실패: {e}", "오류", wx.OK | wx.ICON_ERROR)
                     return
                     
-                self._start_upload_job(file_paths, "파일 업로드")
+                # 사용자가 직접 고른 파일은 대량 백필보다 먼저 처리되도록 interactive로 요청
+                self._start_upload_job(file_paths, "파일 업로드", priority="interactive")
 
     def on_upload_folder(self, event):
         """폴더를 선택하고 그 안의 모든 파일을 업로드합니다."""
@@ -641,7 +642,8 @@ class DocManagementPanel(wx.Panel):
                     
             try:
                 remaining = self._get_queue_remaining_capacity()
-                if len(file_paths) > remaining:
+                # None이면 서버 대기열이 디스크로 넘겨 무제한으로 받는다
+                if remaining is not None and len(file_paths) > remaining:
                     wx.CallAfter(wx.MessageBox,
                                 f"업로드 가능한 파일 수를 초과했습니다.\n"
                                 f"수집된 파일: {len(file_paths)}건\n"
@@ -662,7 +664,7 @@ class DocManagementPanel(wx.Panel):
         finally:
             wx.CallAfter(self.overlay.hide)
 
-    def _start_upload_job(self, file_paths, job_desc: str = "파일 업로드"):
+    def _start_upload_job(self, file_paths, job_desc: str = "파일 업로드", priority: str = "bulk"):
         """선택한(또는 수집한) 파일을 백그라운드 스레드에서 업로드한다."""
         if not file_paths:
             wx.MessageBox("업로드할 파일이 없습니다.", "알림", wx.OK | wx.ICON_INFORMATION)
@@ -673,7 +675,7 @@ class DocManagementPanel(wx.Panel):
 
         def _task():
             try:
-                result = self._upload_files_to_queue(file_paths)
+                result = self._upload_files_to_queue(file_paths, priority=priority)
                 success_cnt = result.get('added_count', 0)
                 failed_files = result.get('failed_files', [])
                 failed_cnt = len(failed_files)
@@ -697,8 +699,8 @@ class DocManagementPanel(wx.Panel):
 
         threading.Thread(target=_task, daemon=True).start()
 
-    def _get_queue_remaining_capacity(self) -> int:
-        """서버에서 업로드 큐의 남은 용량을 조회합니다."""
+    def _get_queue_remaining_capacity(self):
+        """서버에서 업로드 큐의 남은 용량을 조회합니다. 제한이 없으면 None을 반환합니다."""
         try:
             result = self.api_client._make_request('GET', 'upload_queue_status')
             
@@ -719,12 +721,13 @@ class DocManagementPanel(wx.Panel):
             ui_logger.error(f"큐 상태 조회 실패: {e}")
             raise
 
-    def _upload_files_to_queue(self, file_paths: list) -> dict:
+    def _upload_files_to_queue(self, file_paths: list, priority: str = "bulk") -> dict:
         """여러 파일을 서버 업로드 큐에 추가합니다."""
         try:
             result = self.api_client._make_request(
                 'POST',
                 'upload_file_paths',
+                params={'rag_name': self.api_client.get_rag_name(), 'priority': priority},
                 json_data=file_paths
             )
             
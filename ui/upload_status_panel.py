@@ -481,14 +481,15 @@ class UploadStatusPanel(wx.Panel):
                     remaining = data.get('remaining_capacity', 0)
                     worker_active = data.get('worker_active', False)
                     
-                    status_text = f"대기 중인 파일: {queue_size}건, 남은 용량: {remaining}건"
+                    remaining_text = "제한 없음" if remaining is None else f"{remaining}건"
+                    status_text = f"대기 중인 파일: {queue_size}건, 남은 용량: {remaining_text}"
                     if not worker_active:
                         status_text += " (워커 중단됨)"
                     
                     wx.CallAfter(self.status_label.SetLabel, status_text)
                     
                     # 용량 부족 시 색상 변경
-                    if remaining <= 100:
+                    if remaining is not None and remaining <= 100:
                         wx.CallAfter(self.status_label.SetForegroundColour, wx.Colour(255, 0, 0))
                     else:
                         wx.CallAfter(self.status_label.SetForegroundColour, MODERN_COLORS['text'])
@@ -1,83 +1,411 @@
 import threading
-import queue
 import os
+import re
+import json
+import uuid
 import time
 import asyncio
+from collections import deque, OrderedDict
 from typing import Callable, Dict, Any, List, Optional
 from datetime import datetime
 import logging
 
+# 업로드 우선순위 클래스 (앞에 있을수록 먼저 처리)
+PRIORITY_INTERACTIVE = "interactive"  # UI에서 사용자가 직접 올린 파일
+PRIORITY_MONITORING = "monitoring"    # 모니터링 데몬이 감지한 변경 파일
+PRIORITY_BULK = "bulk"                # 폴더 가져오기 등 대량 백필
+PRIORITY_CLASSES = [PRIORITY_INTERACTIVE, PRIORITY_MONITORING, PRIORITY_BULK]
+
+# 기아 방지: 대기 중인 하위 우선순위 큐가 연속으로 건너뛰어질 수 있는 최대 횟수
+DEFAULT_STARVATION_LIMITS = {
+    PRIORITY_MONITORING: 4,
+    PRIORITY_BULK: 8,
+}
+
+# 대기열이 bulk/monitoring 파일로 가득 차도 interactive 파일은 이만큼 더 받을 수 있다
+DEFAULT_INTERACTIVE_RESERVE = 100
+
+DEFAULT_RAG_NAME = "default"
+
+
+def _rag_key(rag_name: Optional[str]) -> str:
+    """rag_manager와 동일하게 rag_name이 없으면 "default"를 사용한다."""
+    return rag_name or DEFAULT_RAG_NAME
+
+
+class _SpillFile:
+    """대기열의 꼬리 부분을 JSON Lines 파일로 디스크에 보관하고, 앞에서부터 순서대로 다시 읽어 온다."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._writer = None
+        self._read_offset = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, file_info: Dict[str, Any]):
+        if self._writer is None:
+            self._writer = open(self.path, 'ab')
+        self._writer.write(json.dumps(file_info, ensure_ascii=False).encode('utf-8') + b"\n")
+        self._writer.flush()
+        self._count += 1
+
+    def read(self, limit: int) -> List[Dict[str, Any]]:
+        """앞에서부터 최대 limit개를 읽어 오고, 모두 읽으면 파일을 삭제한다."""
+        items = []
+        with open(self.path, 'rb') as f:
+            f.seek(self._read_offset)
+            while len(items) < limit:
+                line = f.readline()
+                if not line:
+                    break
+                items.append(json.loads(line))
+            self._read_offset = f.tell()
+        self._count -= len(items)
+        if self._count <= 0:
+            self.clear()
+        return items
+
+    def clear(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._read_offset = 0
+        self._count = 0
+
+
+class _FairLane:
+    """한 우선순위 안에서 RAG별 대기열을 가중 라운드로빈으로 꺼내는 큐.
+
+    한 RAG는 차례가 오면 최대 weight개까지 연속으로 처리되고, 그 다음 RAG로 넘어간다.
+    spill_dir이 주어지면 RAG별 대기열은 메모리 머리(head)와 디스크 꼬리(tail)로 나뉘고,
+    머리가 비면 꼬리에서 refill_size개씩 다시 읽어 온다.
+    꼬리에 있는 항목은 spilled_index에 (우선순위, spill_id)로 기록하며, 승격되어 꼬리에서 빠진 항목은
+    파일에서 지우지 않고 다시 읽을 때 spill_id가 맞지 않는 것으로 보고 버린다.
+    """
+
+    def __init__(self, name: str, weights: Dict[str, int], pending_index: Dict[tuple, Dict[str, Any]],
+                 spill_dir: Optional[str] = None, refill_size: int = 256,
+                 spilled_index: Optional[Dict[tuple, tuple]] = None):
+        self.name = name
+        self.weights = weights
+        self.pending_index = pending_index
+        self.spilled_index = spilled_index if spilled_index is not None else {}
+        self.spill_dir = spill_dir
+        self.refill_size = refill_size
+        self.queues: "OrderedDict[str, deque]" = OrderedDict()
+        self.spills: Dict[str, _SpillFile] = {}
+        # RAG별로 꼬리 파일에 남아 있지만 승격되어 버릴 항목 수
+        self._stale: Dict[str, int] = {}
+        self._burst = 0
+        self._size = 0
+        self.memory_size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def spilled_size(self) -> int:
+        return self._size - self.memory_size
+
+    def append(self, file_info: Dict[str, Any], spill: bool = False) -> bool:
+        """파일을 추가한다. 메모리에 올라갔으면 True, 디스크로 넘어갔으면 False를 반환한다."""
+        rag_name = file_info['rag_name']
+        rag_queue = self.queues.setdefault(rag_name, deque())
+        rag_spill = self.spills.get(rag_name)
+        self._size += 1
+        # 이미 디스크 꼬리가 있는 RAG는 순서 유지를 위해 계속 꼬리에 붙인다
+        if self.spill_dir and (spill or (rag_spill is not None and len(rag_spill) > 0)):
+            if rag_spill is None:
+                safe_name = re.sub(r"[^A-Za-z0-9_\-]", "_", rag_name)
+                rag_spill = _SpillFile(os.path.join(self.spill_dir, f"{self.name}_{safe_name}_{uuid.uuid4().hex}.jsonl"))
+                self.spills[rag_name] = rag_spill
+            spill_id = uuid.uuid4().hex
+            rag_spill.append(dict(file_info, spill_id=spill_id))
+            self.spilled_index[(rag_name, file_info['file_path'])] = (self.name, spill_id)
+            return False
+        rag_queue.append(file_info)
+        self.memory_size += 1
+        return True
+
+    def remove(self, file_info: Dict[str, Any]):
+        """메모리 머리에 있는 항목만 제거할 수 있다."""
+        rag_queue = self.queues[file_info['rag_name']]
+        rag_queue.remove(file_info)
+        self._size -= 1
+        self.memory_size -= 1
+        if not rag_queue and self.spill_size_of(file_info['rag_name']) == 0:
+            self._drop_rag(file_info['rag_name'])
+
+    def discard_spilled(self, rag_name: str, file_path: str):
+        """디스크 꼬리에 있는 항목을 대기열에서 뺀다. (파일의 기록은 다시 읽을 때 버린다)"""
+        self.spilled_index.pop((rag_name, file_path), None)
+        self._stale[rag_name] = self._stale.get(rag_name, 0) + 1
+        self._size -= 1
+        if self.size_of(rag_name) == 0:
+            self._drop_rag(rag_name)
+
+    def popleft(self) -> Dict[str, Any]:
+        rag_name, rag_queue = next(iter(self.queues.items()))
+        if not rag_queue:
+            self._refill(rag_name, rag_queue)
+        file_info = rag_queue.popleft()
+        self._size -= 1
+        self.memory_size -= 1
+        self._burst += 1
+        if not rag_queue and self.spill_size_of(rag_name) == 0:
+            self._drop_rag(rag_name)
+        elif self._burst >= max(self.weights.get(rag_name, 1), 1):
+            self.queues.move_to_end(rag_name)
+            self._burst = 0
+        return file_info
+
+    def size_of(self, rag_name: str) -> int:
+        return len(self.queues.get(rag_name, ())) + self.spill_size_of(rag_name)
+
+    def spill_size_of(self, rag_name: str) -> int:
+        rag_spill = self.spills.get(rag_name)
+        return len(rag_spill) - self._stale.get(rag_name, 0) if rag_spill is not None else 0
+
+    def sizes(self) -> Dict[str, int]:
+        return {rag_name: self.size_of(rag_name) for rag_name in self.queues}
+
+    def clear(self):
+        for rag_spill in self.spills.values():
+            rag_spill.clear()
+        self.spills.clear()
+        self._stale.clear()
+        self.queues.clear()
+        self._burst = 0
+        self._size = 0
+        self.memory_size = 0
+
+    def _refill(self, rag_name: str, rag_queue: deque):
+        rag_spill = self.spills[rag_name]
+        while not rag_queue and len(rag_spill) > 0:
+            for file_info in rag_spill.read(self.refill_size):
+                key = (rag_name, file_info['file_path'])
+                if self.spilled_index.get(key) != (self.name, file_info.pop('spill_id', None)):
+                    # 승격되어 다른 곳에 다시 들어간 항목
+                    self._stale[rag_name] -= 1
+                    continue
+                del self.spilled_index[key]
+                rag_queue.append(file_info)
+                self.memory_size += 1
+                self.pending_index.setdefault(key, file_info)
+        if len(rag_spill) == 0:
+            del self.spills[rag_name]
+            self._stale.pop(rag_name, None)
+
+    def _drop_rag(self, rag_name: str):
+        # 맨 앞 RAG가 비면 다음 RAG가 새로 차례를 시작한다
+        if next(iter(self.queues)) == rag_name:
+            self._burst = 0
+        del self.queues[rag_name]
+        rag_spill = self.spills.pop(rag_name, None)
+        if rag_spill is not None:
+            # 남은 기록은 모두 승격되어 버릴 항목이다
+            rag_spill.clear()
+        self._stale.pop(rag_name, None)
+
+
 class UploadQueueManager:
-    def __init__(self, max_queue_size: int = 10000):
+    """우선순위/RAG별 업로드 대기열.
+
+    max_queue_size는 메모리에 올려 두는 대기 파일 수의 상한이다. spill_dir을 지정하면
+    그 이상의 파일은 디스크 꼬리로 넘겨 논리적으로 무제한(max_total_files 지정 시 그 값까지) 받고,
+    지정하지 않으면 기존처럼 max_queue_size를 넘는 요청을 거절한다.
+    num_workers개의 워커 스레드가 동시에 파일을 처리하며, 형식별 동시 추출 수는 extractor_registry가 제한한다.
+    """
+
+    def __init__(self, max_queue_size: int = 10000,
+                 starvation_limits: Optional[Dict[str, int]] = None,
+                 interactive_reserve: int = DEFAULT_INTERACTIVE_RESERVE,
+                 rag_weights: Optional[Dict[str, int]] = None,
+                 spill_dir: Optional[str] = None,
+                 max_total_files: Optional[int] = None,
+                 num_workers: int = 1):
         self.max_queue_size = max_queue_size
-        self.upload_queue = queue.Queue(maxsize=max_queue_size)
+        self.num_workers = max(int(num_workers), 1)
+        self.max_total_files = max_total_files
+        self.spill_dir = spill_dir
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+        self.interactive_reserve = interactive_reserve
+        self.starvation_limits = dict(DEFAULT_STARVATION_LIMITS)
+        if starvation_limits:
+            self.starvation_limits.update(starvation_limits)
+        # RAG별 가중치 (없으면 1 = 순수 라운드로빈)
+        self.rag_weights: Dict[str, int] = dict(rag_weights or {})
+        # 우선순위별 대기열과 연속으로 건너뛴 횟수
+        self._pending_index: Dict[tuple, Dict[str, Any]] = {}  # (rag_name, file_path) -> 메모리에 있는 대기 file_info
+        self._spilled_index: Dict[tuple, tuple] = {}  # (rag_name, file_path) -> 디스크 꼬리에 있는 대기 항목의 (우선순위, spill_id)
+        # interactive 큐는 항상 메모리에 둔다
+        self._lanes: Dict[str, _FairLane] = {
+            priority: _FairLane(priority, self.rag_weights, self._pending_index,
+                                spill_dir=spill_dir if priority != PRIORITY_INTERACTIVE else None,
+                                spilled_index=self._spilled_index)
+            for priority in PRIORITY_CLASSES
+        }
+        self._skip_counts: Dict[str, int] = {priority: 0 for priority in PRIORITY_CLASSES}
+        self._queue_cond = threading.Condition()
         self.subscribers: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {}
         self._lock = threading.Lock()
         self._stop_event = threading.Event()
-        self._worker_thread = None
+        self._worker_threads: List[threading.Thread] = []
         self._processing_callback = None
-        self.current_processing_file = None  # 현재 처리 중인 파일 정보
-        self.pending_files = []  # 대기 중인 파일들을 별도로 관리
+        self._processing_files: Dict[int, Dict[str, Any]] = {}  # 워커 스레드 id -> 처리 중인 파일 정보
+        self._processing_cond = threading.Condition(self._lock)
         self.completed_files = []  # 완료된 파일들을 추적
         self.failed_files = []  # 실패한 파일들을 추적
         self.logger = logging.getLogger(__name__)
         
+    def discard_stale_spills(self):
+        """이전 실행에서 남은 디스크 꼬리 파일을 지운다. 서버 프로세스가 시작할 때 워커 시작 전에 한 번만 호출한다.
+
+        (생성자에서 지우면 추출용 자식 프로세스가 main 모듈을 다시 import할 때 실행 중인 서버의 꼬리 파일까지 지운다)
+        """
+        if not self.spill_dir:
+            return
+        with self._queue_cond:
+            live_paths = {rag_spill.path for lane in self._lanes.values() for rag_spill in lane.spills.values()}
+            for fname in os.listdir(self.spill_dir):
+                path = os.path.join(self.spill_dir, fname)
+                if fname.endswith('.jsonl') and path not in live_paths:
+                    os.remove(path)
+
     def set_processing_callback(self, callback: Callable[[Dict[str, Any]], Dict[str, Any]]):
         """파일 처리 콜백 함수를 설정합니다."""
         self._processing_callback = callback
         
     def start_worker(self):
         """백그라운드 워커 스레드를 시작합니다."""
-        if self._worker_thread is None or not self._worker_thread.is_alive():
+        if not self._is_worker_active():
             self._stop_event.clear()
-            self._worker_thread = threading.Thread(target=self._process_queue, daemon=True)
-            self._worker_thread.start()
-            self.logger.info("업로드 큐 워커 스레드가 시작되었습니다.")
+            self._worker_threads = [
+                threading.Thread(target=self._process_queue, name=f"upload-queue-worker-{i}", daemon=True)
+                for i in range(self.num_workers)
+            ]
+            for worker_thread in self._worker_threads:
+                worker_thread.start()
+            self.logger.info(f"업로드 큐 워커 스레드 {self.num_workers}개가 시작되었습니다.")
     
     def stop_worker(self):
         """백그라운드 워커 스레드를 중지합니다."""
-        if self._worker_thread and self._worker_thread.is_alive():
+        if self._is_worker_active():
             self._stop_event.set()
-            self._worker_thread.join(timeout=3)
+            with self._queue_cond:
+                self._queue_cond.notify_all()
+            for worker_thread in self._worker_threads:
+                worker_thread.join(timeout=3)
             self.logger.info("업로드 큐 워커 스레드가 중지되었습니다.")
+
+    def _is_worker_active(self) -> bool:
+        return any(worker_thread.is_alive() for worker_thread in self._worker_threads)
+
+    @property
+    def current_processing_file(self) -> Optional[Dict[str, Any]]:
+        """가장 최근에 처리를 시작한 파일 정보 (여러 워커가 처리 중이면 processing_files 참고)"""
+        with self._lock:
+            if not self._processing_files:
+                return None
+            return max(self._processing_files.values(), key=lambda info: info['processing_time']).copy()
+
+    def get_processing_files(self) -> List[Dict[str, Any]]:
+        """모든 워커가 처리 중인 파일 정보를 처리 시작 순서로 반환합니다."""
+        with self._lock:
+            return sorted((info.copy() for info in self._processing_files.values()),
+                          key=lambda info: info['processing_time'])
     
-    def add_file(self, file_path: str) -> Dict[str, Any]:
-        """파일을 업로드 큐에 추가합니다."""
+    def set_rag_weight(self, rag_name: Optional[str], weight: int):
+        """RAG의 스케줄링 가중치를 설정합니다. 차례마다 weight개의 파일을 연속으로 처리합니다."""
+        with self._queue_cond:
+            self.rag_weights[_rag_key(rag_name)] = max(int(weight), 1)
+
+    def add_file(self, file_path: str, priority: str = PRIORITY_INTERACTIVE,
+                 rag_name: Optional[str] = None) -> Dict[str, Any]:
+        """파일을 업로드 큐에 추가합니다. 처리 시 rag_name의 벡터 스토어에 저장됩니다."""
+        rag_name = _rag_key(rag_name)
         try:
-            if not os.path.exists(file_path):
+            if priority not in self._lanes:
                 return {
                     "success": False,
-                    "message": f"파일을 찾을 수 없습니다: {file_path}",
+                    "message": f"지원하지 않는 우선순위입니다: {priority} (사용 가능: {', '.join(PRIORITY_CLASSES)})",
                     "remaining_capacity": self.get_remaining_capacity()
                 }
-            
-            if self.upload_queue.full():
+
+            if not os.path.exists(file_path):
                 return {
                     "success": False,
-                    "message": f"업로드 대기열이 가득 찼습니다. 현재 업로드 가능한 파일 개수: {self.get_remaining_capacity()}개",
+                    "message": f"파일을 찾을 수 없습니다: {file_path}",
                     "remaining_capacity": self.get_remaining_capacity()
                 }
             
             last_modified = os.path.getmtime(file_path)
-            file_info = {
-                'file_path': file_path,
-                'file_name': os.path.basename(file_path),
-                'status': 'pending',
-                'added_time': datetime.now().timestamp(),
-                'last_modified': last_modified
-            }
-            
-            self.upload_queue.put_nowait(file_info)
-            
-            # pending_files 리스트에도 추가
-            with self._lock:
-                self.pending_files.append(file_info.copy())
-            
-            self._notify_subscribers('file_added', file_info)
+            with self._queue_cond:
+                queued = self._pending_index.get((rag_name, file_path))
+                if queued is not None:
+                    # 이미 대기 중이면 중복 추가하지 않고, 더 높은 우선순위로 요청된 경우에만 승격
+                    if PRIORITY_CLASSES.index(priority) < PRIORITY_CLASSES.index(queued['priority']):
+                        self._lanes[queued['priority']].remove(queued)
+                        queued['priority'] = priority
+                        if not self._lanes[priority].append(queued):
+                            self._pending_index.pop((rag_name, file_path), None)
+                        self._queue_cond.notify()
+                    queued['last_modified'] = last_modified
+                    return {
+                        "success": True,
+                        "message": f"이미 업로드 대기열에 있는 파일입니다. (우선순위: {queued['priority']})",
+                        "remaining_capacity": self._remaining_capacity_locked()
+                    }
+
+                # 디스크 꼬리에 있는 파일도 중복 추가하지 않고, 더 높은 우선순위로 요청된 경우에만 꼬리에서 빼고 새로 추가한다
+                spilled = self._spilled_index.get((rag_name, file_path))
+                if spilled is not None:
+                    spilled_priority = spilled[0]
+                    if PRIORITY_CLASSES.index(priority) >= PRIORITY_CLASSES.index(spilled_priority):
+                        return {
+                            "success": True,
+                            "message": f"이미 업로드 대기열에 있는 파일입니다. (우선순위: {spilled_priority})",
+                            "remaining_capacity": self._remaining_capacity_locked()
+                        }
+                    self._lanes[spilled_priority].discard_spilled(rag_name, file_path)
+
+                if spilled is None and self._is_full_locked(priority):
+                    return {
+                        "success": False,
+                        "message": f"업로드 대기열이 가득 찼습니다. 현재 업로드 가능한 파일 개수: {self._remaining_capacity_locked()}개",
+                        "remaining_capacity": self._remaining_capacity_locked()
+                    }
+
+                file_info = {
+                    'file_path': file_path,
+                    'file_name': os.path.basename(file_path),
+                    'status': 'pending',
+                    'rag_name': rag_name,
+                    'priority': priority,
+                    'added_time': datetime.now().timestamp(),
+                    'last_modified': last_modified
+                }
+                # 메모리 머리가 가득 차면 디스크 꼬리로 넘긴다 (spill_dir이 없는 큐는 항상 메모리)
+                spill = self._memory_size_locked() >= self.max_queue_size
+                if self._lanes[priority].append(file_info, spill=spill):
+                    self._pending_index[(rag_name, file_path)] = file_info
+                self._queue_cond.notify()
+                event_info = file_info.copy()
+                event_info['position'] = self._lanes[priority].size_of(rag_name)
+
+            self._notify_subscribers('file_added', event_info)
             
             return {
                 "success": True,
                 "message": f"파일이 업로드 대기열에 추가되었습니다.",
+                "priority": priority,
+                "position": event_info['position'],
                 "remaining_capacity": self.get_remaining_capacity()
             }
             
@@ -86,6 +414,8 @@ class UploadQueueManager:
                 'file_path': file_path,
                 'file_name': os.path.basename(file_path),
                 'status': 'failed',
+                'rag_name': rag_name,
+                'priority': priority,
                 'error': str(e),
                 'failed_time': datetime.now().timestamp()
             }
@@ -101,9 +431,11 @@ class UploadQueueManager:
                 "remaining_capacity": self.get_remaining_capacity()
             }
     
-    def add_files(self, file_paths: List[str]) -> Dict[str, Any]:
+    def add_files(self, file_paths: List[str], priority: str = PRIORITY_BULK,
+                  rag_name: Optional[str] = None) -> Dict[str, Any]:
         """여러 파일을 업로드 큐에 추가합니다."""
-        if len(file_paths) > self.get_remaining_capacity():
+        remaining_capacity = self.get_remaining_capacity()
+        if priority != PRIORITY_INTERACTIVE and remaining_capacity is not None and len(file_paths) > remaining_capacity:
             return {
                 "success": False,
                 "message": f"추가하려는 파일 개수({len(file_paths)}개)가 남은 용량({self.get_remaining_capacity()}개)을 초과합니다.",
@@ -114,7 +446,7 @@ class UploadQueueManager:
         failed_files = []
         
         for file_path in file_paths:
-            result = self.add_file(file_path)
+            result = self.add_file(file_path, priority=priority, rag_name=rag_name)
             if result["success"]:
                 added_count += 1
             else:
@@ -130,20 +462,68 @@ class UploadQueueManager:
     
     def get_queue_size(self) -> int:
         """현재 큐의 크기를 반환합니다."""
-        return self.upload_queue.qsize()
+        with self._queue_cond:
+            return self._queue_size_locked()
     
-    def get_remaining_capacity(self) -> int:
-        """남은 큐 용량을 반환합니다."""
-        return self.max_queue_size - self.upload_queue.qsize()
+    def get_queue_size_by_priority(self) -> Dict[str, int]:
+        """우선순위별 대기 중인 파일 수를 반환합니다."""
+        with self._queue_cond:
+            return {priority: len(lane) for priority, lane in self._lanes.items()}
+    
+    def get_queue_size_by_rag(self) -> Dict[str, int]:
+        """RAG별 대기 중인 파일 수를 반환합니다."""
+        with self._queue_cond:
+            sizes: Dict[str, int] = {}
+            for lane in self._lanes.values():
+                for rag_name, size in lane.sizes().items():
+                    sizes[rag_name] = sizes.get(rag_name, 0) + size
+            return sizes
+    
+    def get_remaining_capacity(self) -> Optional[int]:
+        """남은 큐 용량을 반환합니다. 디스크 꼬리를 쓰고 상한이 없으면 None(무제한)을 반환합니다."""
+        with self._queue_cond:
+            return self._remaining_capacity_locked()
+    
+    def _queue_size_locked(self) -> int:
+        return sum(len(lane) for lane in self._lanes.values())
+    
+    def _memory_size_locked(self) -> int:
+        return sum(lane.memory_size for lane in self._lanes.values())
+    
+    def _remaining_capacity_locked(self) -> Optional[int]:
+        if self.spill_dir:
+            if self.max_total_files is None:
+                return None
+            return max(self.max_total_files - self._queue_size_locked(), 0)
+        return max(self.max_queue_size - self._queue_size_locked(), 0)
+    
+    def _is_full_locked(self, priority: str) -> bool:
+        """interactive 파일은 디스크로 넘기지 않고, 예약 용량만큼 메모리에 추가로 받을 수 있다."""
+        if priority == PRIORITY_INTERACTIVE:
+            return self._memory_size_locked() >= self.max_queue_size + self.interactive_reserve
+        if self.spill_dir:
+            return self.max_total_files is not None and self._queue_size_locked() >= self.max_total_files
+        return self._queue_size_locked() >= self.max_queue_size
+    
+    def get_spilled_size_by_priority(self) -> Dict[str, int]:
+        """우선순위별로 디스크 꼬리에 있는 파일 수를 반환합니다."""
+        with self._queue_cond:
+            return {priority: lane.spilled_size for priority, lane in self._lanes.items()}
     
     def get_status(self) -> Dict[str, Any]:
         """큐 상태 정보를 반환합니다."""
         return {
             "queue_size": self.get_queue_size(),
+            "queue_size_by_priority": self.get_queue_size_by_priority(),
+            "queue_size_by_rag": self.get_queue_size_by_rag(),
+            "spilled_size_by_priority": self.get_spilled_size_by_priority(),
+            "spill_enabled": bool(self.spill_dir),
             "remaining_capacity": self.get_remaining_capacity(),
             "max_capacity": self.max_queue_size,
-            "worker_active": self._worker_thread is not None and self._worker_thread.is_alive(),
-            "current_processing_file": self.current_processing_file
+            "worker_active": self._is_worker_active(),
+            "num_workers": self.num_workers,
+            "current_processing_file": self.current_processing_file,
+            "processing_files": self.get_processing_files()
         }
     
     def get_current_processing_file(self) -> Optional[Dict[str, Any]]:
@@ -151,22 +531,40 @@ class UploadQueueManager:
         return self.current_processing_file
     
     def get_all_pending_files(self) -> List[Dict[str, Any]]:
-        """큐에 있는 모든 대기 중인 파일 목록을 반환합니다."""
-        with self._lock:
-            return [file_info.copy() for file_info in self.pending_files]
+        """큐에 있는 모든 대기 중인 파일 목록을 우선순위 순서로 반환합니다.
+
+        각 항목의 position은 같은 우선순위, 같은 RAG 대기열 안에서의 순번(1부터)이다.
+        디스크 꼬리에 있는 파일은 목록에 포함하지 않고 개수만 get_spilled_size_by_priority로 제공한다.
+        """
+        with self._queue_cond:
+            pending_files = []
+            for priority in PRIORITY_CLASSES:
+                for rag_queue in self._lanes[priority].queues.values():
+                    for position, file_info in enumerate(rag_queue, start=1):
+                        pending_info = file_info.copy()
+                        pending_info['position'] = position
+                        pending_files.append(pending_info)
+            return pending_files
     
     def get_all_files_info(self) -> Dict[str, Any]:
         """현재 처리 중인 파일과 대기 중인 파일들의 모든 정보를 반환합니다."""
+        pending_files = self.get_all_pending_files()
+        current_processing_file = self.current_processing_file
+        processing_files = self.get_processing_files()
         with self._lock:
             return {
-                "current_processing_file": self.current_processing_file,
-                "pending_files": [file_info.copy() for file_info in self.pending_files],
+                "current_processing_file": current_processing_file,
+                "processing_files": processing_files,
+                "pending_files": pending_files,
                 "completed_files": [file_info.copy() for file_info in self.completed_files[-50:]],  # 최근 50개만
                 "failed_files": [file_info.copy() for file_info in self.failed_files[-50:]],  # 최근 50개만
                 "queue_size": self.get_queue_size(),
+                "spilled_size_by_priority": self.get_spilled_size_by_priority(),
+                "queue_size_by_priority": self.get_queue_size_by_priority(),
+                "queue_size_by_rag": self.get_queue_size_by_rag(),
                 "remaining_capacity": self.get_remaining_capacity(),
                 "max_capacity": self.max_queue_size,
-                "worker_active": self._worker_thread is not None and self._worker_thread.is_alive()
+                "worker_active": self._is_worker_active()
             }
     
     def subscribe(self, event_type: str, callback: Callable[[Dict[str, Any]], None]):
@@ -194,32 +592,67 @@ class UploadQueueManager:
             except Exception as e:
                 self.logger.error(f"이벤트 알림 오류 ({event_type}): {e}")
     
+    def _get_next_file(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """다음에 처리할 파일을 꺼냅니다. 대기 중인 파일이 없으면 timeout 후 None을 반환합니다."""
+        with self._queue_cond:
+            if self._queue_size_locked() == 0:
+                self._queue_cond.wait(timeout)
+            priority = self._select_priority_locked()
+            if priority is None:
+                return None
+            file_info = self._lanes[priority].popleft()
+            self._pending_index.pop((file_info['rag_name'], file_info['file_path']), None)
+            return file_info
+
+    def _select_priority_locked(self) -> Optional[str]:
+        """기본은 엄격한 우선순위지만, 너무 오래 건너뛴 하위 큐가 있으면 그 큐를 먼저 처리합니다."""
+        waiting = [priority for priority in PRIORITY_CLASSES if self._lanes[priority]]
+        if not waiting:
+            return None
+
+        selected = waiting[0]
+        for priority in waiting[1:]:
+            if self._skip_counts[priority] >= self.starvation_limits.get(priority, 0) > 0:
+                selected = priority
+                break
+
+        # 선택된 큐보다 낮은 우선순위로 대기 중인 큐만 건너뛴 것으로 센다
+        selected_rank = PRIORITY_CLASSES.index(selected)
+        for priority in waiting:
+            if PRIORITY_CLASSES.index(priority) > selected_rank:
+                self._skip_counts[priority] += 1
+        self._skip_counts[selected] = 0
+        return selected
+
+    def _claim_processing(self, file_info: Dict[str, Any]):
+        key = (file_info['rag_name'], file_info['file_path'])
+        with self._processing_cond:
+            while any((info['rag_name'], info['file_path']) == key for info in self._processing_files.values()):
+                self._processing_cond.wait(0.5)
+            # 대기 중 다른 워커가 같은 파일을 집지 않도록 자리를 먼저 잡아 둔다
+            self._processing_files[threading.get_ident()] = dict(file_info, status='processing',
+                                                                 processing_time=datetime.now().timestamp())
+
     def _process_queue(self):
         """백그라운드에서 큐를 처리합니다."""
         self.logger.info("업로드 큐 처리 시작")
         
         while not self._stop_event.is_set():
-            try:
-                file_info = self.upload_queue.get(timeout=0.5)
-            except queue.Empty:
+            file_info = self._get_next_file(timeout=0.5)
+            if file_info is None:
                 continue
             
+            # 같은 파일을 다른 워커가 처리 중이면 끝날 때까지 기다린다 (같은 RAG에 동시에 쓰지 않도록)
+            self._claim_processing(file_info)
             try:
-                self.logger.debug(f"파일 처리 시작: {file_info['file_path']}")
-                
-                # pending_files에서 해당 파일 제거
-                with self._lock:
-                    self.pending_files = [f for f in self.pending_files if f['file_path'] != file_info['file_path']]
-                
-                # 현재 처리 중인 파일 정보 업데이트
-                self.current_processing_file = file_info.copy()
-                self.current_processing_file['status'] = 'processing'
-                self.current_processing_file['processing_time'] = datetime.now().timestamp()
+                self.logger.debug(f"파일 처리 시작: {file_info['file_path']} (RAG: {file_info['rag_name']}, 우선순위: {file_info['priority']})")
                 
                 # 파일 처리 시작 이벤트 발행
                 processing_info = file_info.copy()
                 processing_info['status'] = 'processing'
                 processing_info['processing_time'] = datetime.now().timestamp()
+                with self._lock:
+                    self._processing_files[threading.get_ident()] = processing_info.copy()
                 self._notify_subscribers('file_processing', processing_info)
                 
                 # 실제 파일 처리 (콜백 함수 사용)
@@ -242,6 +675,9 @@ class UploadQueueManager:
                         failed_info = file_info.copy()
                         failed_info['status'] = 'failed'
                         failed_info['error'] = result.get('message', '알 수 없는 오류')
+                        # 추출 시간/메모리 초과, 워커 비정상 종료 등 실패 원인 구분 (있는 경우)
+                        if result.get('error_type'):
+                            failed_info['error_type'] = result['error_type']
                         failed_info['failed_time'] = datetime.now().timestamp()
                         
                         # failed_files 리스트에 추가
@@ -277,8 +713,9 @@ class UploadQueueManager:
                 self._notify_subscribers('file_failed', failed_info)
                 self.logger.exception(f"파일 처리 중 예외 발생: {file_info['file_path']}")
             finally:
-                # 현재 처리 중인 파일 정보 초기화
-                self.current_processing_file = None
-                self.upload_queue.task_done()
+                # 처리 중인 파일 정보 초기화
+                with self._processing_cond:
+                    self._processing_files.pop(threading.get_ident(), None)
+                    self._processing_cond.notify_all()
         
         self.logger.info("업로드 큐 처리 종료")
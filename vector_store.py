@@ -1,21 +1,88 @@
+import json
 import os
 import pickle
+import shutil
 import tempfile
-from typing import List, Dict
+import threading
+from typing import List, Dict, Optional, Tuple
 from langchain.docstore.document import Document
 from document_splitter import DocumentSplitter
 from faiss_vector_store import FAISS_VECTOR_STORE, DummyEmbeddings
+from chunk_compression import DICTIONARY_FILE_NAME
+from embedding_store import RawEmbeddingStore
 from langchain_huggingface import HuggingFaceEmbeddings
 from sentence_transformers import SentenceTransformer
 import config
 import logger_util
 import datetime
+import time
+from file_fingerprint import get_file_fingerprint, compute_content_hash
+from near_duplicate import simhash
 
 # 전역 임베딩 캐시: 모델 경로(또는 모델 이름)를 키로 하여 재사용
 _EMBEDDING_MODEL_CACHE = {}  # type: dict[str, HuggingFaceEmbeddings]
 
 logger = logger_util.get_logger()
 
+# 업로드 시 한 번에 임베딩/인덱싱하는 청크 수
+UPLOAD_BATCH_SIZE = 256
+# 저장소가 사용하는 임베딩 모델 이름 (없으면 config.MODEL_NAME)
+EMBEDDING_MODEL_FILE_NAME = "embedding_model.json"
+# 임베딩 모델 교체용 임시 폴더의 상태 파일 (대상 모델 이름, 교체 준비 완료 여부)
+MIGRATION_FILE_NAME = "migration.json"
+
+
+def get_embedding_model_path(model_name: str) -> str:
+    """모델 이름(예: "nlpai-lab/KURE-v1")의 로컬 저장 경로"""
+    if model_name == config.MODEL_NAME:
+        return config.EMBEDDING_MODEL_PATH
+    # 모델 이름이 그대로 경로가 되고 허브에서 내려받으므로 설정에 등록된 모델만 허용한다
+    if model_name not in config.EMBEDDING_MODELS:
+        raise ValueError(f"Unknown embedding model: {model_name}")
+    return os.path.join(config.EMBEDDING_MODEL_ROOT, *model_name.split("/"))
+
+
+def load_embedding_model(model_name: str) -> Tuple[HuggingFaceEmbeddings, int]:
+    """임베딩 모델을 로드한다 (로컬에 없으면 내려받아 저장). (임베딩 객체, 차원)을 반환한다."""
+    model_path = get_embedding_model_path(model_name)
+    # 전역 캐시 확인 -> 이미 로드된 경우 즉시 반환하여 중복 로딩 방지
+    cached = _EMBEDDING_MODEL_CACHE.get(model_path)
+    if cached is not None:
+        logger.debug(f"[VectorStore] Reusing cached embeddings for {model_path}")
+        return cached, len(cached.embed_query("Hello"))
+
+    try:
+        if not os.path.exists(model_path):
+            embeddings = HuggingFaceEmbeddings(model_name=model_name)
+            os.makedirs(model_path, exist_ok=True)
+            model = SentenceTransformer(model_name)
+            model.save(model_path)
+        else:
+            message = f"[DEBUG] Loading the saved embedding mode: {model_path}"
+            logger.info(message)
+            embeddings = HuggingFaceEmbeddings(model_name=model_path)
+
+        emb = embeddings.embed_query("Hello")
+        dimension = len(emb) if len(emb) <= 1536 else 1536
+
+        # 캐시에 저장하여 재사용
+        _EMBEDDING_MODEL_CACHE[model_path] = embeddings
+        return embeddings, dimension
+    except Exception as e:
+        logger.error(f"Error initializing embedding model: {str(e)}")
+        raise
+
+
+def get_max_seq_length(embeddings) -> Optional[int]:
+    """임베딩 모델이 한 번에 인코딩하는 최대 토큰 수 (알 수 없으면 None). 이보다 긴 입력은 인코더가 잘라낸다."""
+    return getattr(getattr(embeddings, "_client", None), "max_seq_length", None)
+
+
+def release_embedding_model(model_name: str):
+    """캐시에서 모델을 내린다. (교체가 끝나 더 이상 쓰는 저장소가 없는 모델의 메모리 해제)"""
+    if _EMBEDDING_MODEL_CACHE.pop(get_embedding_model_path(model_name), None) is not None:
+        logger.info(f"[VectorStore] Released embedding model {model_name}")
+
 class VectorStore:
     def __init__(self, rag_name: str | None = None, chunk_size=500, chunk_overlap=100):
         self.splitter = DocumentSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
@@ -27,12 +94,25 @@ class VectorStore:
         base_store_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "store")
         rag_name = rag_name or "default"
         self.store_path = os.path.join(base_store_path, rag_name)
+        # 임베딩 모델 교체 시 새 모델의 벡터와 교체할 저장소를 만드는 임시 폴더
+        self.migration_path = os.path.join(config.EMBEDDING_MIGRATION_PATH, rag_name)
+        self._recover_interrupted_model_swap()
         os.makedirs(self.store_path, exist_ok=True)
+        self.embedding_model_name = self._load_embedding_model_name()
 
         self.vector_store = None
 
         self.indexed_files = dict()
         self.load_indexed_files_if_exist()
+        # 내용 해시 -> 그 내용을 실제로 인덱싱한 대표 파일 경로
+        # 같은 내용의 다른 경로는 indexed_files에 canonical_path로 대표 파일을 가리키는 참조로만 등록된다 (대표 파일의 references)
+        self._content_index = {}
+        self._rebuild_content_index()
+        # 업로드 큐 워커 여러 개가 같은 RAG에 동시에 쓰므로 인덱스/파일 목록 변경과 저장은 이 락 안에서 한다
+        # (추출과 분할은 락 밖에서 진행되어 병렬로 처리된다)
+        self._write_lock = threading.RLock()
+        # 마지막으로 청크를 추가/삭제한 시각 (인덱스 압축기가 유휴 상태 판단에 사용)
+        self.last_write_time = time.time()
     
     def initialize_embedding_model_and_vectorstore(self):
         """임베딩/벡터스토어를 초기화한다. 이미 초기화된 경우 재사용한다."""
@@ -40,15 +120,31 @@ class VectorStore:
         if self.embeddings is None:
             self.embeddings = self._get_embedding_model()
 
-        # 2) VectorStore 객체 재사용
+        # 2) 토큰 단위 청크 설정 (임베딩 모델의 토크나이저와 최대 길이 사용)
+        if config.CHUNK_LENGTH_UNIT == "token" and self.splitter.tokenizer is None:
+            self._configure_token_budget()
+
+        # 3) VectorStore 객체 재사용
         if self.vector_store is None:
             self.vector_store = FAISS_VECTOR_STORE(embedding=self.embeddings, store_path=self.store_path, dimension=self.dimension)
 
+    def _configure_token_budget(self):
+        tokenizer = getattr(getattr(self.embeddings, "_client", None), "tokenizer", None)
+        max_seq_length = get_max_seq_length(self.embeddings)
+        if tokenizer is None or not max_seq_length:
+            logger.error("[VectorStore] Embedding model has no tokenizer/max_seq_length, chunking by characters")
+            return
+        self.splitter.use_token_budget(tokenizer, max_seq_length, max_chunk_tokens=config.CHUNK_MAX_TOKENS,
+                                       chunk_overlap_tokens=config.CHUNK_OVERLAP_TOKENS)
+        logger.info(f"[VectorStore] Token-based chunking: {self.splitter.chunk_size} tokens per chunk "
+                    f"(model max_seq_length {max_seq_length})")
+
     def sync_indexed_files_and_vector_db(self):
-        file_list = self.vector_store.get_unique_file_paths()
+        file_list = set(self.vector_store.get_unique_file_paths())
         no_existing_file_list = []
-        for file_path in self.indexed_files.keys():
-            if file_path not in file_list:
+        for file_path, info in self.indexed_files.items():
+            # 같은 내용 참조는 대표 파일의 청크가 있으면 유지
+            if (info.get("canonical_path") or file_path) not in file_list:
                 no_existing_file_list.append(file_path)
 
         for file_path in no_existing_file_list:
@@ -60,40 +156,139 @@ class VectorStore:
         
 
     def _get_embedding_model(self):
-        # 전역 캐시 확인 -> 이미 로드된 경우 즉시 반환하여 중복 로딩 방지
-        cached = _EMBEDDING_MODEL_CACHE.get(config.EMBEDDING_MODEL_PATH)
-        if cached is not None:
-            # dimension은 최초 계산된 값으로 세팅
-            self.dimension = len(cached.embed_query("Hello"))
-            logger.debug(f"[VectorStore] Reusing cached embeddings for {config.EMBEDDING_MODEL_PATH}")
-            return cached
+        embeddings, self.dimension = load_embedding_model(self.embedding_model_name)
+        return embeddings
+
+    def _load_embedding_model_name(self) -> str:
+        model_file = os.path.join(self.store_path, EMBEDDING_MODEL_FILE_NAME)
+        if os.path.exists(model_file):
+            with open(model_file, "r", encoding="utf-8") as f:
+                return json.load(f)["model_name"]
+        return config.MODEL_NAME
+
+    def check_unchanged(self, file_path: str, update: bool = True) -> Tuple[bool, Optional[Dict]]:
+        """인덱싱된 파일과 현재 파일이 같은지 확인한다.
+
+        크기와 수정 시각이 같으면 해시 계산 없이 같은 파일로 보고, 수정 시각만 다르면
+        내용 해시를 비교한다. (변경 여부, 현재 파일 지문)을 반환하며, 파일이 없으면 (False, None)이다.
+        update가 False이면 수정 시각만 바뀐 경우에도 indexed_files를 고치지 않는다. (업로드 처리 밖의 스레드에서 사용)
+        """
+        if not os.path.isfile(file_path):
+            return False, None
+
+        indexed = self.indexed_files.get(file_path)
+        fingerprint = get_file_fingerprint(file_path, with_hash=False)
+        if indexed and indexed.get("content_hash") \
+                and indexed.get("file_size") == fingerprint["file_size"] \
+                and indexed.get("file_mtime") == fingerprint["file_mtime"]:
+            fingerprint["content_hash"] = indexed["content_hash"]
+            return True, fingerprint
+
+        fingerprint["content_hash"] = compute_content_hash(file_path)
+        if indexed and indexed.get("content_hash") == fingerprint["content_hash"] \
+                and indexed.get("file_size") == fingerprint["file_size"]:
+            # 내용은 같고 수정 시각만 바뀐 경우: 다음 검사부터 해시를 건너뛰도록 시각만 갱신
+            if update:
+                with self._write_lock:
+                    # 해시를 계산하는 동안 삭제/재인덱싱된 항목은 건드리지 않는다
+                    if self.indexed_files.get(file_path) is not indexed:
+                        return True, fingerprint
+                    indexed["file_mtime"] = fingerprint["file_mtime"]
+                    # 벡터 DB는 바뀌지 않았으므로 indexed_files만 저장한다 (재시작 후 다시 해시를 계산하지 않도록)
+                    self.save_indexed_files()
+            return True, fingerprint
+
+        return False, fingerprint
+
+    def get_append_offset(self, file_path: str, fingerprint: Optional[Dict]) -> Optional[int]:
+        """파일이 인덱싱된 내용 뒤에 이어 쓰기만 되었으면 인덱싱된 바이트 길이를 반환한다.
+
+        저장된 크기만큼의 앞부분 해시가 저장된 내용 해시와 같아야 하며(인덱싱 당시 파일 전체의 해시이므로),
+        APPEND_INDEX_EXTENSIONS 형식의 파일만 대상이다. 이어 쓰기가 아니면 None이다.
+        """
+        if not fingerprint or os.path.splitext(file_path)[1].lower() not in config.APPEND_INDEX_EXTENSIONS:
+            return None
+
+        indexed = self.indexed_files.get(file_path)
+        if not indexed or not indexed.get("content_hash") or not indexed.get("file_size"):
+            return None
+        # 다른 경로와 청크를 공유하는 파일은 이어 쓰기분만 추가하면 다른 경로의 내용까지 바뀌므로 전체를 다시 인덱싱한다
+        if indexed.get("canonical_path") or indexed.get("references"):
+            return None
+
+        indexed_size = indexed["file_size"]
+        # 겹침 구간보다 작은 파일은 뒷부분만 읽어도 전체를 다시 읽게 되므로 전체를 다시 인덱싱한다
+        if indexed_size <= config.APPEND_OVERLAP_BYTES or fingerprint["file_size"] <= indexed_size:
+            return None
+        if compute_content_hash(file_path, indexed_size) != indexed["content_hash"]:
+            return None
+        return indexed_size
+
+    def _rebuild_content_index(self):
+        self._content_index = {}
+        for file_path, info in self.indexed_files.items():
+            if info.get("content_hash") and not info.get("canonical_path"):
+                self._content_index.setdefault(info["content_hash"], file_path)
+
+    def link_same_content(self, file_path: str, file_name: str, fingerprint: Optional[Dict]) -> Optional[Dict]:
+        """다른 경로에 같은 내용의 파일이 인덱싱되어 있으면 추출/임베딩 없이 그 파일의 참조로 등록한다.
+
+        참조로 등록했으면 업로드 결과를, 같은 내용의 파일이 없으면 None을 반환한다.
+        """
+        if not config.FILE_DEDUPE_ENABLED or not fingerprint or not fingerprint.get("content_hash"):
+            return None
 
-        try:
-            if not os.path.exists(config.EMBEDDING_MODEL_PATH):
-                embeddings = HuggingFaceEmbeddings(model_name=config.MODEL_NAME)
-                os.makedirs(config.EMBEDDING_MODEL_PATH, exist_ok=True)
-                model = SentenceTransformer(config.MODEL_NAME)
-                model.save(config.EMBEDDING_MODEL_PATH)
-            else:
-                message = f"[DEBUG] Loading the saved embedding mode: {config.EMBEDDING_MODEL_PATH}"
-                logger.info(message)
-                embeddings = HuggingFaceEmbeddings(model_name=config.EMBEDDING_MODEL_PATH)
+        with self._write_lock:
+            canonical_path = self._content_index.get(fingerprint["content_hash"])
+            if canonical_path is None or canonical_path == file_path:
+                return None
 
-            emb = embeddings.embed_query("Hello")
-            self.dimension = len(emb) if len(emb) <= 1536 else 1536
+            # 이 경로에 예전 내용이 인덱싱되어 있으면 먼저 제거 (다른 파일의 대표였다면 참조 파일이 대표를 이어받음)
+            if file_path in self.indexed_files:
+                self.delete_documents([file_path])
+            canonical = self.indexed_files[canonical_path]
+            canonical.setdefault("references", []).append(file_path)
 
-            # 캐시에 저장하여 재사용
-            _EMBEDDING_MODEL_CACHE[config.EMBEDDING_MODEL_PATH] = embeddings
-            return embeddings
-            
-            if self.embeddings is None:
-                raise ValueError("Failed to initialize embeddings")
-        except Exception as e:
-            logger.error(f"Error initializing embedding model: {str(e)}")
-            raise
+            file_metadata = {
+                "file_name": file_name,
+                "file_type": os.path.splitext(file_path)[1].lower(),
+                "file_path": file_path,
+                "last_updated": int(datetime.datetime.now().timestamp()),
+                "chunk_count": canonical.get("chunk_count", 0),
+                "canonical_path": canonical_path
+            }
+            file_metadata.update(fingerprint)
+            self.indexed_files[file_path] = file_metadata
+
+        return {"status": "success", "linked_to": canonical_path,
+                "message": f"File {file_name} has the same content as {canonical_path}, indexed as a reference"}
+
+    def _promote_reference(self, file_path: str, info: Dict):
+        """대표 파일이 삭제될 때 첫 번째 참조 파일이 청크와 나머지 참조를 이어받는다. 이어받은 경로를 반환한다."""
+        references = [path for path in info.get("references", []) if path in self.indexed_files]
+        if not references:
+            return None
+
+        new_path = references[0]
+        self.vector_store.rename_source(file_path, new_path)
+        promoted = self.indexed_files[new_path]
+        promoted.pop("canonical_path", None)
+        promoted["references"] = references[1:]
+        promoted["chunk_count"] = info.get("chunk_count", 0)
+        promoted["duplicate_chunk_count"] = info.get("duplicate_chunk_count", 0)
+        for reference in promoted["references"]:
+            self.indexed_files[reference]["canonical_path"] = new_path
+        if info.get("content_hash"):
+            self._content_index[info["content_hash"]] = new_path
+        return new_path
 
     # 파일 1건 업로드
-    async def upload(self, file_path: str, file_name: str, contents: dict) -> Dict:
+    async def upload(self, file_path: str, file_name: str, contents: dict, fingerprint: Optional[Dict] = None,
+                     append: bool = False) -> Dict:
+        """파일 내용을 분할/임베딩하여 인덱싱한다.
+
+        append가 True이면 기존 청크를 지우지 않고 contents(이어 쓰기된 뒷부분)의 청크를 추가한다.
+        """
         # 벡터 스토어가 아직 초기화되지 않은 경우(예: 초기 임베딩 모델 로드 실패 후 재시도 시)
         # 여기서 Lazy 초기화를 시도하여 업로드 실패 확률을 최소화한다.
         if self.vector_store is None:
@@ -102,39 +297,68 @@ class VectorStore:
             except Exception as e:
                 logger.exception(f"[VectorStore] Failed to initialise vector store lazily: {e}")
                 return {"status": "fail", "message": f"Vector store initialisation failed: {e}"}
+        # 이번 업로드에서 추가한 청크 id (실패하면 지운다)
+        added_ids = []
         try:
             # 지원되지 않는 파일 타입은 제거
             if not self.splitter.is_supported_file_type(file_path):
                 return {"status": "fail", "message": f"File {file_name} is not supported file type"}
             
-            # 동일 파일 존재 시 벡터스토어 및 파일 목록에서 삭제
-            if file_path in self.indexed_files.keys():
+            # 동일 파일 존재 시 벡터스토어 및 파일 목록에서 삭제 (이어 쓰기 인덱싱은 기존 청크 유지)
+            previous_chunk_count = 0
+            previous_duplicate_count = 0
+            previous_hash = None
+            if append and file_path in self.indexed_files:
+                previous_chunk_count = self.indexed_files[file_path].get("chunk_count", 0)
+                previous_duplicate_count = self.indexed_files[file_path].get("duplicate_chunk_count", 0)
+                previous_hash = self.indexed_files[file_path].get("content_hash")
+            elif file_path in self.indexed_files.keys():
                 self.delete_documents([file_path])
 
             _, file_extension = os.path.splitext(file_path)
             file_type = file_extension.lower()
-            chunks = self.splitter.split_document(file_extension=file_type, contents=contents['contents'], file_path=file_path)
+            if file_path not in self.indexed_files:
+                # 첫 배치가 추가되는 순간부터 검색 결과에 나올 수 있으므로 인덱싱 중인 파일로 먼저 등록한다
+                # (내용 해시가 없으므로 완료 전에는 변경 없음/이어 쓰기/같은 내용 판정에 쓰이지 않는다)
+                with self._write_lock:
+                    self.indexed_files[file_path] = {"file_name": file_name, "file_type": file_type,
+                                                     "file_path": file_path, "status": "indexing", "chunk_count": 0,
+                                                     "last_updated": int(datetime.datetime.now().timestamp())}
+            chunks = self.splitter.split_document(file_extension=file_type, contents=contents['contents'], file_path=file_path,
+                                                  segments=contents.get('segments'),
+                                                  header_for=lambda metadata: self._chunk_header(contents, file_name, metadata))
             
-            # 분할된 청크를 벡터 스토어에 추가
+            # 분할된 청크를 UPLOAD_BATCH_SIZE 단위로 벡터 스토어에 추가 (스트리밍 청크도 메모리에 모두 올리지 않음)
+            # 이미 저장된 청크와 근사 중복인 청크는 저장하지 않고 기존 청크에 출처만 남는다 (duplicate_count)
+            chunk_count = 0
+            duplicate_count = 0
+            batch = []
             for chunk in chunks:
                 chunk.page_content = chunk.page_content.strip()
                 if len(chunk.page_content) == 0:
                     continue
 
-                if contents['contents_type'] in ["EML", "MHT"]:
-                    if len(contents["to"]) > 50: # 수신자 목록이 너무 긴 경우 앞에 수신자를 중심으로만 남김
-                        contents["to"] = contents["to"][:50]
-
-                    chunk.page_content = f"""이메일 제목: {contents['title']}\n보낸사람:{contents["from"]}\n받는사람:{contents["to"]}\n날짜:{contents['date']}\n{chunk.page_content}"""
-                else:
-                    chunk.page_content = f"""문서명: {file_name}\n{chunk.page_content}"""
-
-
-                if len(chunk.page_content) > 5000:
-                    logger.error("[ERROR] Cut the size of contents under 5,000 due to performance : {file_path}")
-                    chunk.page_content = chunk.page_content[:4985] + "... (truncated)"
-                
-            self.vector_store.add_documents(chunks)
+                # 머리말(문서명/메일 헤더)을 붙이기 전의 본문으로 서명을 만들어 같은 본문이면 출처가 달라도 중복으로 본다
+                if config.NEAR_DUPLICATE_ENABLED and len(chunk.page_content) >= config.NEAR_DUPLICATE_MIN_CHARS:
+                    chunk.metadata["simhash"] = simhash(chunk.page_content)
+                self._decorate_chunk(chunk, file_path, file_name, contents)
+                batch.append(chunk)
+                if len(batch) >= UPLOAD_BATCH_SIZE:
+                    with self._write_lock:
+                        stored_ids = self.vector_store.add_documents(batch)
+                        self.last_write_time = time.time()
+                    added_ids.extend(stored_ids)
+                    chunk_count += len(stored_ids)
+                    duplicate_count += len(batch) - len(stored_ids)
+                    batch = []
+
+            if batch:
+                with self._write_lock:
+                    stored_ids = self.vector_store.add_documents(batch)
+                    self.last_write_time = time.time()
+                added_ids.extend(stored_ids)
+                chunk_count += len(stored_ids)
+                duplicate_count += len(batch) - len(stored_ids)
 
             # 인덱싱된 파일 추가
             file_metadata = {
@@ -142,24 +366,87 @@ class VectorStore:
                 "file_type": file_type,
                 "file_path": file_path,
                 "last_updated": int(datetime.datetime.now().timestamp()),
-                "chunk_count": len(chunks)
+                "chunk_count": previous_chunk_count + chunk_count,
+                "duplicate_chunk_count": previous_duplicate_count + duplicate_count
             }
-            self.indexed_files[file_path] = file_metadata
-
+            if fingerprint:
+                file_metadata.update(fingerprint)
+            with self._write_lock:
+                self.indexed_files[file_path] = file_metadata
+                if previous_hash and self._content_index.get(previous_hash) == file_path:
+                    del self._content_index[previous_hash]
+                if file_metadata.get("content_hash"):
+                    self._content_index.setdefault(file_metadata["content_hash"], file_path)
+
+            if append:
+                return {"status": "success", "appended_chunks": chunk_count,
+                        "message": f"File {file_name} appended content indexed successfully"}
             return {"status": "success", "message": f"File {file_name} uploaded and indexed successfully"}
         except Exception as e:
             logger.exception(f"Upload failed: {str(e)}")
+            if append:
+                # 이어 쓰기분 인덱싱이 실패하면 파일 정보(크기/해시)는 그대로이므로, 다시 시도할 때 중복되지 않도록 추가한 청크만 지운다
+                with self._write_lock:
+                    self.vector_store.delete_ids(added_ids)
+            else:
+                self._rollback_upload(file_path, added_ids)
             return {"status": "fail", "message": str(e)}
 
+    def _rollback_upload(self, file_path: str, added_ids: List[str]):
+        """업로드 도중 실패하면 이번에 추가한 청크와 근사 중복 출처, 인덱싱 중 등록을 지운다.
+        (파일 정보가 없는 청크가 남으면 그 청크가 검색될 때마다 결과에서 빠진다)"""
+        try:
+            with self._write_lock:
+                self.vector_store.delete_ids(added_ids)
+                self._apply_promoted_chunks(self.vector_store.delete_files([file_path]))
+                if self.indexed_files.get(file_path, {}).get("status") == "indexing":
+                    del self.indexed_files[file_path]
+                self.last_write_time = time.time()
+        except Exception as e:
+            logger.exception(f"Failed to roll back partial upload of {file_path}: {e}")
+
+    @staticmethod
+    def _chunk_header(contents: dict, file_name: str, metadata: dict) -> str:
+        """청크 앞에 붙이는 문서명 또는 이메일 헤더"""
+        if contents['contents_type'] == "MBOX":
+            # mbox는 메시지마다 헤더가 다르므로 청크 metadata의 메시지 헤더를 사용한다
+            header = metadata
+        elif contents['contents_type'] in ["EML", "MHT"]:
+            header = contents
+        else:
+            return f"""문서명: {file_name}\n"""
+
+        # 수신자 목록이 너무 긴 경우 앞에 수신자를 중심으로만 남김
+        return f"""이메일 제목: {header.get('title') or ''}\n보낸사람:{header.get('from') or ''}\n받는사람:{(header.get('to') or '')[:50]}\n날짜:{header.get('date') or ''}\n"""
+
+    def _decorate_chunk(self, chunk: Document, file_path: str, file_name: str, contents: dict):
+        """청크 앞에 문서명 또는 이메일 헤더를 붙이고, 너무 긴 청크는 자른다."""
+        header = self._chunk_header(contents, file_name, chunk.metadata)
+        # 근사 중복 청크를 다른 출처가 이어받을 때 머리말만 바꿔 끼울 수 있도록 길이를 남긴다
+        chunk.metadata["header_chars"] = len(header)
+        chunk.page_content = header + chunk.page_content
+        # 토큰 모드: 모델이 버릴 토큰은 임베딩하지 않도록 최대 길이에 맞춘다
+        chunk.page_content = self.splitter.fit_to_token_limit(chunk.page_content)
+
+        if len(chunk.page_content) > 5000:
+            logger.error(f"[ERROR] Cut the size of contents under 5,000 due to performance : {file_path}")
+            chunk.page_content = chunk.page_content[:4985] + "... (truncated)"
+
     def search(self, query: str, k: int = 5) -> List[Dict]:
         try:
             result = self.vector_store.search(query, k=k)
 
             added_result = []
             for data in result:
-                info = self.indexed_files[data['file_path']]
+                info = self.indexed_files.get(data['file_path'])
+                if info is None:
+                    # 파일 정보가 없는 청크(삭제 중인 파일 등)는 결과에서 빼고 나머지 결과는 그대로 반환한다
+                    logger.warning(f"[VectorStore] Skipping search hit from unknown file: {data['file_path']}")
+                    continue
                 for key, value in info.items():
                     data['metadata'][key] = value
+                # 같은 내용(참조)과 근사 중복 청크의 출처까지 이 결과에 해당하는 모든 파일 경로
+                data['file_paths'] = self._file_paths_for_hit(data)
                 added_result.append(data)              
 
             return added_result
@@ -167,6 +454,13 @@ class VectorStore:
             logger.exception(f"Search failed: {str(e)}")
             return []
 
+    def _file_paths_for_hit(self, data: Dict) -> List[str]:
+        file_paths = []
+        for file_path in [data['file_path']] + list(data['metadata'].get('duplicate_sources') or []):
+            file_paths.append(file_path)
+            file_paths.extend(self.indexed_files.get(file_path, {}).get("references", []))
+        return list(dict.fromkeys(file_paths))
+
     def get_documents(self) -> List[Dict]:
         return list(self.indexed_files.values()) if len(self.indexed_files) > 0 else []
     
@@ -177,7 +471,9 @@ class VectorStore:
         :param file_path: 문서의 파일 경로
         :return: 문서 청크 리스트
         """
-        return self.vector_store.get_document_chunks(file_path)
+        # 같은 내용 참조는 대표 파일의 청크를 반환
+        canonical_path = self.indexed_files.get(file_path, {}).get("canonical_path") or file_path
+        return self.vector_store.get_document_chunks(canonical_path)
 
     def get_indexed_file_count(self) -> int:
         file_count = len(self.indexed_files)
@@ -194,6 +490,146 @@ class VectorStore:
             return 0
         return self.vector_store.get_db_size()
 
+    def get_text_compression_stats(self) -> Dict:
+        """청크 본문 압축 현황 (원문/보관 크기와 압축률). 벡터 스토어가 초기화되지 않았으면 빈 dict."""
+        if self.vector_store is None:
+            return {}
+        return self.vector_store.get_text_compression_stats()
+
+    def get_tombstone_stats(self) -> Dict:
+        """논리 삭제된 벡터 수와 비율. 벡터 스토어가 초기화되지 않았으면 빈 dict."""
+        if self.vector_store is None:
+            return {}
+        return {
+            "tombstones": len(self.vector_store.tombstones),
+            "vectors": self.vector_store.vectorstore.index.ntotal,
+            "tombstone_ratio": round(self.vector_store.get_tombstone_ratio(), 4)
+        }
+
+    def compact_index(self, progress_callback=None) -> int:
+        """논리 삭제된 벡터를 인덱스에서 제거하고 저장한다. 제거한 벡터 수를 반환.
+
+        압축하는 동안 청크 추가/삭제는 기다리지만, 검색은 교체 전까지 기존 인덱스로 계속된다.
+        """
+        if self.vector_store is None:
+            return 0
+        with self._write_lock:
+            removed = self.vector_store.compact(progress_callback)
+            if removed:
+                self.save_indexed_files_and_vector_db()
+        return removed
+
+    def rebuild_index(self, index_factory: str = "Flat") -> int:
+        """보관된 원본 벡터로 인덱스 종류를 바꿔 다시 만들고 저장한다. (임베딩을 다시 계산하지 않음)"""
+        if self.vector_store is None:
+            raise ValueError("Vector store is not initialised")
+        with self._write_lock:
+            count = self.vector_store.rebuild_index(index_factory)
+            self.save_indexed_files_and_vector_db()
+        logger.info(f"[VectorStore] Rebuilt {self.store_path} index as {index_factory} ({count} vectors)")
+        return count
+
+    def get_live_chunk_ids(self) -> List[str]:
+        """삭제되지 않은 청크 id 목록 (인덱스 순서)"""
+        with self._write_lock:
+            return self.vector_store.live_doc_ids()
+
+    def _read_migration_state(self) -> Optional[Dict]:
+        state_path = os.path.join(self.migration_path, MIGRATION_FILE_NAME)
+        if not os.path.exists(state_path):
+            return None
+        with open(state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_migration_state(self, model_name: str, ready: bool):
+        os.makedirs(self.migration_path, exist_ok=True)
+        temp_path = os.path.join(self.migration_path, MIGRATION_FILE_NAME + ".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"model_name": model_name, "ready": ready}, f)
+        os.replace(temp_path, os.path.join(self.migration_path, MIGRATION_FILE_NAME))
+
+    def open_migration_shadow(self, model_name: str) -> RawEmbeddingStore:
+        """새 모델의 벡터를 모으는 임시 폴더를 연다. 같은 모델로 하다 중단된 작업이 있으면 이미 임베딩한 청크는 그대로 사용한다."""
+        state = self._read_migration_state()
+        if os.path.isdir(self.migration_path) and (state is None or state.get("model_name") != model_name):
+            shutil.rmtree(self.migration_path)
+        # 교체 직전에 중단된 경우 남은 인덱스 파일은 교체할 때 다시 만든다
+        for name in ("index.faiss", "store.pkl"):
+            if os.path.exists(os.path.join(self.migration_path, name)):
+                os.remove(os.path.join(self.migration_path, name))
+        self._write_migration_state(model_name, ready=False)
+        return RawEmbeddingStore(self.migration_path)
+
+    def swap_embedding_model(self, model_name: str, embeddings, dimension: int, shadow: RawEmbeddingStore,
+                             index_factory: str = "Flat") -> int:
+        """임시 폴더에 모은 새 모델의 벡터로 인덱스를 만들어 저장소를 교체한다. 교체된 인덱스의 벡터 수를 반환.
+
+        그동안 추가된 청크는 여기서 마저 임베딩한다. 교체하는 동안 청크 추가/삭제는 기다리지만,
+        검색은 교체 전까지 기존 모델과 인덱스로 계속된다.
+        """
+        with self._write_lock:
+            old_store = self.vector_store
+            live_ids = old_store.live_doc_ids()
+            missing = [doc_id for doc_id in live_ids if doc_id not in shadow]
+            for start in range(0, len(missing), UPLOAD_BATCH_SIZE):
+                doc_ids, texts = old_store.get_chunk_texts(missing[start:start + UPLOAD_BATCH_SIZE])
+                shadow.append(doc_ids, embeddings.embed_documents(texts))
+
+            # 청크(압축된 본문 포함)는 그대로 옮기므로 압축 사전도 함께 옮긴다
+            dictionary_path = os.path.join(self.store_path, DICTIONARY_FILE_NAME)
+            if os.path.exists(dictionary_path):
+                shutil.copy2(dictionary_path, self.migration_path)
+            new_store = FAISS_VECTOR_STORE(embedding=embeddings, store_path=self.migration_path, dimension=dimension)
+            count = new_store.adopt_documents(old_store.vectorstore.docstore, live_ids, index_factory)
+            new_store.save_local(self.migration_path)
+            with open(os.path.join(self.migration_path, "indexed_files.pickle"), "wb") as f:
+                pickle.dump(self.indexed_files, f)
+            with open(os.path.join(self.migration_path, EMBEDDING_MODEL_FILE_NAME), "w", encoding="utf-8") as f:
+                json.dump({"model_name": model_name}, f)
+            self._write_migration_state(model_name, ready=True)
+
+            self._replace_store_dir()
+            new_store.relocate(self.store_path)
+            # 검색은 self.vector_store를 한 번만 읽으므로 이 대입으로 새 모델/인덱스로 넘어간다
+            self.vector_store = new_store
+            self.embeddings = embeddings
+            self.dimension = dimension
+            self.embedding_model_name = model_name
+            if config.CHUNK_LENGTH_UNIT == "token":
+                self._configure_token_budget()
+            self.last_write_time = time.time()
+        logger.info(f"[VectorStore] Switched {self.store_path} to {model_name} ({count} vectors)")
+        return count
+
+    def _replace_store_dir(self):
+        """임시 폴더를 저장소 폴더로 바꾼다. 중간에 종료되면 다음 시작 시 _recover_interrupted_model_swap이 마무리한다."""
+        retired_path = self.migration_path + ".retired"
+        if os.path.isdir(retired_path):
+            shutil.rmtree(retired_path)
+        os.rename(self.store_path, retired_path)
+        try:
+            os.rename(self.migration_path, self.store_path)
+        except OSError:
+            os.rename(retired_path, self.store_path)
+            raise
+        os.remove(os.path.join(self.store_path, MIGRATION_FILE_NAME))
+        shutil.rmtree(retired_path, ignore_errors=True)
+
+    def _recover_interrupted_model_swap(self):
+        retired_path = self.migration_path + ".retired"
+        if not os.path.isdir(retired_path):
+            return
+        if not os.path.isdir(self.store_path):
+            # 두 폴더 이름을 바꾸는 사이에 종료된 경우: 새 저장소가 완성되어 있으면 그것을, 아니면 이전 저장소를 사용
+            state = self._read_migration_state()
+            if state and state.get("ready"):
+                os.rename(self.migration_path, self.store_path)
+                os.remove(os.path.join(self.store_path, MIGRATION_FILE_NAME))
+            else:
+                os.rename(retired_path, self.store_path)
+            logger.warning(f"[VectorStore] Recovered {self.store_path} after an interrupted embedding model swap")
+        shutil.rmtree(retired_path, ignore_errors=True)
+
     def get_vector_db_path(self) -> str:
         return self.store_path
 
@@ -201,19 +637,55 @@ class VectorStore:
         self.vector_store.save_local(self.store_path)
 
     def empty_vector_store(self):
-        self.vector_store.delete_all()
-        self.indexed_files = {}
+        with self._write_lock:
+            self.vector_store.delete_all()
+            self.indexed_files = {}
+            self._content_index = {}
 
     def delete_documents(self, file_paths: List[str]):
-        self.vector_store.delete_files(file_paths)
-        for file_path in file_paths:
-            if file_path in self.indexed_files:
-                del self.indexed_files[file_path]
+        """파일을 인덱스에서 삭제한다.
+
+        같은 내용의 참조 파일은 참조만 제거하고, 참조가 있는 대표 파일은 첫 번째 참조 파일이 청크를 이어받는다.
+        """
+        with self._write_lock:
+            vector_file_paths = []
+            for file_path in file_paths:
+                info = self.indexed_files.pop(file_path, None)
+                if info is None:
+                    vector_file_paths.append(file_path)
+                    continue
+
+                canonical_path = info.get("canonical_path")
+                if canonical_path:
+                    references = self.indexed_files.get(canonical_path, {}).get("references", [])
+                    if file_path in references:
+                        references.remove(file_path)
+                    continue
+
+                if self._promote_reference(file_path, info) is None:
+                    vector_file_paths.append(file_path)
+                    if self._content_index.get(info.get("content_hash")) == file_path:
+                        del self._content_index[info["content_hash"]]
+
+            if vector_file_paths:
+                self._apply_promoted_chunks(self.vector_store.delete_files(vector_file_paths))
+            self.last_write_time = time.time()
+
+    def _apply_promoted_chunks(self, promoted: Dict[str, int]):
+        """근사 중복으로만 참조하던 청크를 대표 출처로 이어받은 파일의 청크 수를 고친다."""
+        for file_path, count in promoted.items():
+            info = self.indexed_files.get(file_path)
+            if info is None:
+                continue
+            info["chunk_count"] = info.get("chunk_count", 0) + count
+            info["duplicate_chunk_count"] = max(0, info.get("duplicate_chunk_count", 0) - count)
         
 
     def delete_all_documents(self):
-        self.vector_store.delete_all()
-        self.indexed_files = {}
+        with self._write_lock:
+            self.vector_store.delete_all()
+            self.indexed_files = {}
+            self._content_index = {}
         
     def load_indexed_files_if_exist(self):
         indexed_files_path = os.path.join(self.store_path, "indexed_files.pickle")
@@ -222,11 +694,15 @@ class VectorStore:
             with open(indexed_files_path, 'rb') as f:
                 self.indexed_files = pickle.load(f)
     
-    def save_indexed_files_and_vector_db(self):
+    def save_indexed_files(self):
         os.makedirs(self.store_path, exist_ok=True)
         indexed_files_path = os.path.join(self.store_path, "indexed_files.pickle")
 
-        with open(indexed_files_path, 'wb') as f:
-            pickle.dump(self.indexed_files, f)
+        with self._write_lock:
+            with open(indexed_files_path, 'wb') as f:
+                pickle.dump(self.indexed_files, f)
 
-        self.vector_store.save_local(self.store_path)
\ No newline at end of file
+    def save_indexed_files_and_vector_db(self):
+        with self._write_lock:
+            self.save_indexed_files()
+            self.vector_store.save_local(self.store_path)
\ No newline at end of file